@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class PerformanceConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'performance'
+
+    def ready(self):
+        # connect rollup, reporting hierarchy, snapshot, cache invalidation, query profiling and audit receivers
+        from . import rollups, hierarchy, snapshots, cache, profiling, audit  # noqa: F401
@@ -0,0 +1,207 @@
+import asyncio
+import inspect
+import json
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+from django.db import connection
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions
+from rest_framework.exceptions import ValidationError
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from .models import User, Employee, Review, Goal
+from .authentication import hash_executor, issue_token, needs_rehash
+from .pagination import KeysetPagination
+from .profiling import query_budget
+from .serializers import ReviewSerializer, GoalSerializer
+from .services import get_performance_trend, summarize_department
+from .views import _num_cycles, MAX_TREND_CYCLES
+
+# Async views served under ASGI (see techcorp_performance/asgi_urls.py and
+# performance.middleware.AsgiUrlconfMiddleware). They mirror the DRF views in views.py
+# and keep their response shapes.
+
+def _request_data(request):
+    if request.content_type == 'application/json':
+        try:
+            return json.loads(request.body or b'{}')
+        except ValueError:
+            return None
+    return request.POST
+
+def _method_not_allowed(method):
+    return JsonResponse({'detail': f'Method "{method}" not allowed.'}, status=405)
+
+def _not_found(model):
+    return JsonResponse({'detail': f'No {model.__name__} matches the given query.'}, status=404)
+
+def _closing(fn):
+    # worker threads used for parallel queries own their connection; release it when done
+    def run():
+        try:
+            return fn()
+        finally:
+            connection.close()
+    return run
+
+async def gather_queries(*work):
+    """
+    Run independent pieces of work concurrently. Coroutines (async ORM calls) are awaited as-is;
+    plain callables run on their own worker thread and DB connection when
+    settings.PERFORMANCE_ASYNC_PARALLEL_QUERIES is on (otherwise on Django's shared sync thread).
+    """
+    parallel = getattr(settings, 'PERFORMANCE_ASYNC_PARALLEL_QUERIES', True)
+    aws = []
+    for w in work:
+        if inspect.isawaitable(w):
+            aws.append(w)
+        elif parallel:
+            aws.append(sync_to_async(_closing(w), thread_sensitive=False)())
+        else:
+            aws.append(sync_to_async(w)())
+    return await asyncio.gather(*aws)
+
+def _check_access(request):
+    # what APIView.initial does for the DRF views: authenticate (request.user also sets the
+    # Django request's user, for audit attribution) and check the default permissions
+    request.user
+    for permission in api_settings.DEFAULT_PERMISSION_CLASSES:
+        if not permission().has_permission(request, None):
+            if request.authenticators and not request.successful_authenticator:
+                raise exceptions.NotAuthenticated()
+            raise exceptions.PermissionDenied()
+
+def _auth_error(request, exc):
+    # same status / WWW-Authenticate handling as APIView.handle_exception
+    response = JsonResponse({'detail': exc.detail}, status=exc.status_code)
+    header = request.authenticators[0].authenticate_header(request) if request.authenticators else None
+    if header:
+        response['WWW-Authenticate'] = header
+    else:
+        response.status_code = 403
+    return response
+
+def _get_only(view):
+    async def wrapper(request, *args, **kwargs):
+        if request.method != 'GET':
+            return _method_not_allowed(request.method)
+        drf_request = Request(request, authenticators=[auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES])
+        try:
+            await sync_to_async(_check_access)(drf_request)
+        except (exceptions.NotAuthenticated, exceptions.AuthenticationFailed) as e:
+            return _auth_error(drf_request, e)
+        except exceptions.PermissionDenied as e:
+            return JsonResponse({'detail': e.detail}, status=403)
+        try:
+            return await view(drf_request, *args, **kwargs)
+        except ValidationError as e:
+            return JsonResponse(e.detail, status=400, safe=False)
+    wrapper.__name__ = view.__name__
+    return wrapper
+
+def _load_list(request, queryset, ordering):
+    # evaluate a listing queryset, keyset-paginated when requested -> (rows, next_link or False)
+    if KeysetPagination.is_requested(request):
+        paginator = KeysetPagination(ordering)
+        page = paginator.paginate_queryset(queryset, request)
+        return page, paginator.get_next_link()
+    return list(queryset), False
+
+def _list_response(serializer_class, rows, next_link, fields):
+    data = serializer_class(rows, many=True, fields=fields).data
+    if next_link is False:
+        return JsonResponse(data, safe=False)
+    return JsonResponse({'next': next_link, 'results': data})
+
+@query_budget(4)
+@csrf_exempt
+async def login(request):
+    if request.method != 'POST':
+        return _method_not_allowed(request.method)
+    data = _request_data(request)
+    if data is None:
+        return JsonResponse({'detail': 'JSON parse error'}, status=400)
+    username = data.get('username')
+    password = data.get('password')
+    user = await User.objects.filter(username=username).afirst()
+    if user is None:
+        return JsonResponse({'detail': 'No User matches the given query.'}, status=404)
+
+    # PBKDF2 is CPU bound: run it on the hash pool so the event loop keeps serving requests
+    loop = asyncio.get_running_loop()
+    if not await loop.run_in_executor(hash_executor(), check_password, password, user.password_hash):
+        return JsonResponse({'detail': 'Invalid credentials'}, status=401)
+    if needs_rehash(user.password_hash):
+        encoded = await loop.run_in_executor(hash_executor(), make_password, password)
+        await User.objects.filter(pk=user.pk).aupdate(password_hash=encoded)
+
+    token, expires_at = await sync_to_async(issue_token)(user)
+    return JsonResponse({'token': token, 'role': user.role, 'expires_at': expires_at})
+
+@query_budget(3)
+@_get_only
+async def get_review(request, id):
+    review = await ReviewSerializer.setup_eager_loading(Review.objects.filter(id=id)).afirst()
+    if review is None:
+        return _not_found(Review)
+    return JsonResponse(ReviewSerializer(review).data)
+
+@query_budget(4)
+@_get_only
+async def employee_reviews(request, id):
+    fields = ReviewSerializer.parse_fields(request.query_params.get('fields'))
+    ordering = ('-cycle__start_date', '-id')
+    reviews = ReviewSerializer.setup_eager_loading(
+        Review.objects.filter(employee_id=id).order_by(*ordering), fields
+    )
+    # the employee check and the history fetch are independent
+    exists, (rows, next_link) = await gather_queries(
+        Employee.objects.filter(id=id).aexists(),
+        lambda: _load_list(request, reviews, ordering),
+    )
+    if not exists:
+        return _not_found(Employee)
+    return _list_response(ReviewSerializer, rows, next_link, fields)
+
+@query_budget(3)
+@_get_only
+async def employee_goals(request, id):
+    fields = GoalSerializer.parse_fields(request.query_params.get('fields'))
+    ordering = ('-created_at', '-id')
+    goals = GoalSerializer.setup_eager_loading(
+        Goal.objects.filter(employee_id=id).order_by(*ordering), fields
+    )
+    exists, (rows, next_link) = await gather_queries(
+        Employee.objects.filter(id=id).aexists(),
+        lambda: _load_list(request, goals, ordering),
+    )
+    if not exists:
+        return _not_found(Employee)
+    return _list_response(GoalSerializer, rows, next_link, fields)
+
+@query_budget(4)
+@_get_only
+async def performance_trend(request, id):
+    num_cycles = _num_cycles(request)
+    if num_cycles is None:
+        return JsonResponse({'detail': f'cycles must be an integer between 1 and {MAX_TREND_CYCLES}'}, status=400)
+    exists, trend = await gather_queries(
+        Employee.objects.filter(id=id).aexists(),
+        lambda: get_performance_trend(id, num_cycles),
+    )
+    if not exists:
+        return _not_found(Employee)
+    return JsonResponse({'employee_id': id, 'trend': trend})
+
+@query_budget(6)
+@_get_only
+async def department_summary(request, dept):
+    cycle_id = request.query_params.get('cycle_id')
+    if cycle_id is not None and not cycle_id.isdigit():
+        return JsonResponse({'detail': 'cycle_id must be an integer'}, status=400)
+    summary = await sync_to_async(summarize_department)(dept, int(cycle_id) if cycle_id is not None else None)
+    if summary is None:
+        return JsonResponse({'detail': 'Cycle not found'}, status=404)
+    return JsonResponse(summary)
@@ -0,0 +1,262 @@
+import atexit
+import contextlib
+import contextvars
+import json
+import logging
+import queue
+import threading
+import time
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import OperationalError, connection, connections, transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+from .models import AuditLog, Employee, Review, Score, Goal, User, soft_deleted
+
+# Batched audit trail for Review / Score / Goal / Employee changes.
+# Audited models remember the values they were loaded with (AuditedModel.from_db, only while
+# auditing is enabled), so post_save can record just the changed fields without another query. Entries recorded in a
+# transaction are only kept if it commits (transaction.on_commit). Accepted entries collect in
+# the open AuditBatch (one per request, see performance.middleware.AuditMiddleware) and are
+# written with one bulk_create when it closes or fills up. Outside a batch (background jobs,
+# management commands) they go to a bounded queue drained by a background flusher thread.
+# Queryset update() / bulk_create bypass model signals: bulk_import records its reviews itself,
+# soft deletes are recorded from the soft_deleted signal.
+
+logger = logging.getLogger(__name__)
+
+AUDITED = (Employee, Review, Score, Goal)
+# bookkeeping columns left out of diffs
+IGNORED_FIELDS = {'created_at', 'updated_at'}
+
+_batch = contextvars.ContextVar('performance_audit_batch', default=None)
+
+def _config():
+    config = {'ENABLED': True, 'BATCH_SIZE': 500, 'QUEUE_SIZE': 10000, 'FLUSH_INTERVAL': 1.0, 'RETRIES': 3, 'BACKGROUND': True}
+    config.update(getattr(settings, 'PERFORMANCE_AUDIT', {}))
+    return config
+
+def _dumps(values):
+    return None if values is None else json.dumps(values, cls=DjangoJSONEncoder, sort_keys=True)
+
+def _write(entries):
+    if entries:
+        AuditLog.objects.bulk_create(entries, batch_size=_config()['BATCH_SIZE'])
+
+def _write_each(entries):
+    written = 0
+    for entry in entries:
+        try:
+            _write([entry])
+            written += 1
+        except Exception:
+            logger.exception('audit entry dropped: %s %s #%s', entry.action, entry.target_table, entry.target_id)
+    return written
+
+class AuditBatch:
+    """Entries accepted during a request (or an audit_batch() block); written on flush()."""
+
+    def __init__(self, background=False):
+        self.background = background
+        self.actor_id = None
+        self.entries = []
+        self._lock = threading.Lock()
+
+    def add(self, entry):
+        with self._lock:
+            self.entries.append(entry)
+            full = len(self.entries) >= _config()['BATCH_SIZE']
+        if full:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            entries, self.entries = self.entries, []
+        for entry in entries:
+            if entry.actor_user_id is None:
+                entry.actor_user_id = self.actor_id
+        if self.background:
+            flusher.submit(entries)
+        else:
+            _write(entries)
+
+class AuditFlusher:
+    """
+    Background writer for entries recorded outside a batch. The queue is bounded: when it is full
+    the caller writes the backlog itself (backpressure instead of dropping entries). A batch the
+    thread fails to write with an OperationalError (e.g. "database is locked" on SQLite) is retried
+    up to RETRIES times; after that, or on any other error, its entries are written one by one and
+    only those that still fail are logged and dropped.
+    """
+
+    def __init__(self):
+        self._queue = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._queue is None:
+                self._queue = queue.Queue(maxsize=_config()['QUEUE_SIZE'])
+            if _config()['BACKGROUND'] and (self._thread is None or not self._thread.is_alive()):
+                self._thread = threading.Thread(target=self._run, name='audit-flusher', daemon=True)
+                self._thread.start()
+
+    def submit(self, entries):
+        if not entries:
+            return
+        self._ensure_started()
+        for entry in entries:
+            try:
+                self._queue.put_nowait(entry)
+            except queue.Full:
+                self.flush()
+                self._queue.put_nowait(entry)
+        if not _config()['BACKGROUND']:
+            self.flush()
+
+    def _drain(self, limit=None):
+        entries = []
+        while limit is None or len(entries) < limit:
+            try:
+                entries.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return entries
+
+    def flush(self):
+        """Write everything queued so far in the calling thread. Returns the number of entries written."""
+        if self._queue is None:
+            return 0
+        written = 0
+        while True:
+            entries = self._drain(_config()['BATCH_SIZE'])
+            if not entries:
+                return written
+            _write(entries)
+            written += len(entries)
+
+    def _flush_next(self):
+        # one step of the flusher thread: write the next batch, retrying transient errors a few times
+        config = _config()
+        try:
+            first = self._queue.get(timeout=config['FLUSH_INTERVAL'])
+        except queue.Empty:
+            return 0
+        entries = [first] + self._drain(config['BATCH_SIZE'] - 1)
+        for attempt in range(config['RETRIES'] + 1):
+            try:
+                _write(entries)
+                return len(entries)
+            except OperationalError:
+                # e.g. "database is locked" on SQLite while another thread writes
+                logger.warning('audit flush failed (attempt %d)', attempt + 1, exc_info=True)
+                if attempt < config['RETRIES']:
+                    time.sleep(config['FLUSH_INTERVAL'])
+            except Exception:
+                logger.exception('audit flush failed')
+                break
+        # permanent error or retries used up: one by one, so a bad entry only drops itself
+        return _write_each(entries)
+
+    def _run(self):
+        try:
+            while True:
+                self._flush_next()
+        finally:
+            connections.close_all()
+
+flusher = AuditFlusher()
+
+@atexit.register
+def _flush_at_exit():
+    try:
+        flusher.flush()
+    except Exception:
+        logger.exception('audit flush at exit failed')
+
+def _accept(entry):
+    batch = _batch.get()
+    if batch is not None:
+        batch.add(entry)
+    else:
+        flusher.submit([entry])
+
+def record(action, instance=None, target_table=None, target_id=None, old=None, new=None, actor=None):
+    """
+    Queue one AuditLog entry. old / new are dicts (stored as JSON). Inside a transaction the entry
+    is kept only if the transaction commits.
+    """
+    if not _config()['ENABLED']:
+        return
+    if instance is not None:
+        target_table, target_id = instance._meta.db_table, instance.pk
+    entry = AuditLog(
+        actor_user_id=getattr(actor, 'pk', actor), action=action, target_table=target_table, target_id=target_id,
+        old_value=_dumps(old), new_value=_dumps(new), created_at=timezone.now(),
+    )
+    if connection.in_atomic_block:
+        transaction.on_commit(lambda: _accept(entry))
+    else:
+        _accept(entry)
+
+@contextlib.contextmanager
+def audit_batch(background=False):
+    """
+    Collect audit entries of the block and write them with one bulk_create at the end (or hand them
+    to the background flusher with background=True). Nested blocks join the outer batch.
+    """
+    if _batch.get() is not None:
+        yield _batch.get()
+        return
+    batch = AuditBatch(background=background)
+    token = _batch.set(batch)
+    try:
+        yield batch
+    finally:
+        _batch.reset(token)
+        batch.flush()
+
+def set_actor(user, batch=None):
+    """Attribute the entries of the batch (default: the current one) to user, if it is an authenticated User."""
+    batch = batch or _batch.get()
+    # type(), not isinstance(): the lazy request.user of AuthenticationMiddleware would run a session query
+    if batch is not None and type(user) is User:
+        batch.actor_id = user.pk
+
+def _values(instance, fields=None):
+    deferred = instance.get_deferred_fields()
+    return {
+        f.attname: getattr(instance, f.attname)
+        for f in instance._meta.concrete_fields
+        if f.attname not in IGNORED_FIELDS and f.attname not in deferred and (fields is None or f.attname in fields)
+    }
+
+@receiver(post_save)
+def _saved(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if raw or sender not in AUDITED or not _config()['ENABLED']:
+        return
+    loaded = getattr(instance, '_loaded_values', None)
+    new = _values(instance, update_fields and {instance._meta.get_field(f).attname for f in update_fields})
+    if created:
+        record('create', instance, new=new)
+    elif loaded is None:
+        # instance built in memory and saved over an existing row: previous values unknown
+        record('update', instance, new=new)
+    else:
+        changed = {k for k, v in new.items() if k in loaded and loaded[k] != v}
+        if changed:
+            record('update', instance, old={k: loaded[k] for k in changed}, new={k: new[k] for k in changed})
+    instance._loaded_values = {**(loaded or {}), **new}
+
+@receiver(post_delete)
+def _deleted(sender, instance, **kwargs):
+    if sender in AUDITED and _config()['ENABLED']:
+        record('delete', instance, old=_values(instance))
+
+@receiver(soft_deleted)
+def _soft_deleted(sender, pks, **kwargs):
+    if sender in AUDITED and _config()['ENABLED']:
+        for pk in pks:
+            record('soft_delete', target_table=sender._meta.db_table, target_id=pk, old={'is_deleted': False}, new={'is_deleted': True})
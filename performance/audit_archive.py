@@ -0,0 +1,250 @@
+import fcntl
+import gzip
+import hashlib
+import json
+import os
+import zlib
+from contextlib import contextmanager
+from datetime import timedelta, timezone as dt_timezone
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from .models import AuditLog
+
+# Retention for AuditLog: rows older than RETENTION_DAYS are moved into append-only monthly
+# archive segments and deleted from the table in bounded batches.
+# A segment is auditlog-YYYY-MM.ndjson.gz, a concatenation of gzip members (one per archived
+# batch, so appending never rewrites earlier data), plus auditlog-YYYY-MM.index.ndjson with one
+# line per member: byte offset / length, row count, created_at range and the target ids per
+# table. Lookups by target_table / target_id decompress only the members that contain them.
+# search() merges the live table with the archives. Rows archived twice (a run interrupted
+# between writing and deleting) are de-duplicated by id on read and by compact().
+
+FIELDS = ('id', 'actor_user_id', 'action', 'target_table', 'target_id', 'old_value', 'new_value', 'created_at')
+
+def _config():
+    config = {
+        'DIR': os.path.join(settings.BASE_DIR, 'var', 'audit-archive'),
+        'RETENTION_DAYS': 90,
+        'BATCH_SIZE': 1000,
+    }
+    config.update(getattr(settings, 'PERFORMANCE_AUDIT_ARCHIVE', {}))
+    return config
+
+def archive_root():
+    # one directory per database, like performance.snapshots
+    db = hashlib.md5(str(connection.settings_dict['NAME']).encode()).hexdigest()[:12]
+    return os.path.join(_config()['DIR'], db)
+
+def _paths(month):
+    base = os.path.join(archive_root(), f'auditlog-{month}')
+    return f'{base}.ndjson.gz', f'{base}.index.ndjson'
+
+def months():
+    """Archived months ('YYYY-MM'), oldest first."""
+    root = archive_root()
+    if not os.path.isdir(root):
+        return []
+    return sorted(name[len('auditlog-'):-len('.ndjson.gz')] for name in os.listdir(root)
+                  if name.startswith('auditlog-') and name.endswith('.ndjson.gz'))
+
+@contextmanager
+def _locked(name, shared=False):
+    # '.write': one archiver / compactor at a time; '.swap': readers (shared) versus compact() replacing files
+    os.makedirs(archive_root(), exist_ok=True)
+    with open(os.path.join(archive_root(), name), 'a') as f:
+        fcntl.flock(f, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+def _row(values):
+    row = dict(zip(FIELDS, values))
+    row['created_at'] = row['created_at'].isoformat()
+    return row
+
+def _index_entry(offset, length, rows):
+    targets = {}
+    for r in rows:
+        if r['target_table'] is not None and r['target_id'] is not None:
+            targets.setdefault(r['target_table'], set()).add(r['target_id'])
+    return {
+        'offset': offset, 'length': length, 'rows': len(rows),
+        'first': min(r['created_at'] for r in rows), 'last': max(r['created_at'] for r in rows),
+        'targets': {table: sorted(ids) for table, ids in sorted(targets.items())},
+    }
+
+def _member(rows):
+    body = ''.join(json.dumps(r, sort_keys=True) + '\n' for r in rows).encode()
+    return gzip.compress(body, mtime=0)
+
+def _append(month, rows):
+    data_path, index_path = _paths(month)
+    member = _member(rows)
+    with open(data_path, 'ab') as f:
+        offset = f.tell()
+        f.write(member)
+        f.flush()
+        os.fsync(f.fileno())
+    # the index line is written after the data it points to
+    with open(index_path, 'a+b') as f:
+        if f.seek(0, os.SEEK_END) and (f.seek(-1, os.SEEK_END), f.read(1))[1] != b'\n':
+            # torn last line of an interrupted run: end it, so it does not swallow this one
+            f.write(b'\n')
+        f.write(json.dumps(_index_entry(offset, len(member), rows)).encode() + b'\n')
+        f.flush()
+        os.fsync(f.fileno())
+    return offset
+
+def archive(older_than_days=None, batch_size=None, progress=None):
+    """
+    Move AuditLog rows created before now - older_than_days into the monthly segments, batch_size rows
+    at a time (one gzip member per month touched, then one DELETE). Returns the number of rows moved.
+    """
+    config = _config()
+    days = config['RETENTION_DAYS'] if older_than_days is None else older_than_days
+    batch_size = batch_size or config['BATCH_SIZE']
+    cutoff = timezone.now() - timedelta(days=days)
+    old = AuditLog.objects.filter(created_at__lt=cutoff).order_by('id')
+    moved = 0
+    # appends never move existing members, so readers need no lock against them
+    with _locked('.write'):
+        while True:
+            rows = [_row(v) for v in old.values_list(*FIELDS)[:batch_size]]
+            if not rows:
+                return moved
+            by_month = {}
+            for r in rows:
+                by_month.setdefault(r['created_at'][:7], []).append(r)
+            for month, month_rows in sorted(by_month.items()):
+                offset = _append(month, month_rows)
+                # rows are only deleted once their member is reachable through the index
+                if not any(entry['offset'] == offset for entry in _index(month)):
+                    raise RuntimeError(f'Audit archive index for {month} does not list the member at {offset}')
+            with transaction.atomic():
+                AuditLog.objects.filter(id__in=[r['id'] for r in rows]).delete()
+            moved += len(rows)
+            if progress:
+                progress(moved)
+
+def _index(month):
+    _, index_path = _paths(month)
+    entries = []
+    try:
+        with open(index_path) as f:
+            for line in f:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    # torn last line of an interrupted run: its member is re-archived on the next run
+                    continue
+    except FileNotFoundError:
+        pass
+    return entries
+
+def _read_member(month, entry):
+    data_path, _ = _paths(month)
+    with open(data_path, 'rb') as f:
+        f.seek(entry['offset'])
+        data = f.read(entry['length'])
+    # 16 + MAX_WBITS: a single gzip member
+    for line in zlib.decompress(data, 16 + zlib.MAX_WBITS).decode().splitlines():
+        yield json.loads(line)
+
+def _utc(value):
+    # archived created_at values are UTC ISO strings, so bounds are compared in UTC too
+    return value.astimezone(dt_timezone.utc).isoformat() if value else None
+
+def _iter_month(month, target_table=None, target_id=None, since=None, until=None):
+    # since / until: UTC ISO strings; only members that may hold matching rows are decompressed
+    for entry in _index(month):
+        if since and entry['last'] < since:
+            continue
+        if until and entry['first'] >= until:
+            continue
+        if target_table is not None:
+            ids = entry['targets'].get(target_table)
+            if ids is None or (target_id is not None and target_id not in ids):
+                continue
+        yield from _read_member(month, entry)
+
+def _matches(row, target_table, target_id, action, since, until):
+    if target_table is not None and row['target_table'] != target_table:
+        return False
+    if target_id is not None and row['target_id'] != target_id:
+        return False
+    if action is not None and row['action'] != action:
+        return False
+    created = parse_datetime(row['created_at'])
+    return (since is None or created >= since) and (until is None or created < until)
+
+def search(target_table=None, target_id=None, action=None, since=None, until=None, limit=100):
+    """
+    Audit entries from the live table and the archives, newest first. Filters: target_table / target_id,
+    action, since <= created_at < until. Each dict has the AuditLog fields plus 'archived'. Rows without
+    a created_at are left out (archive() never moves them either).
+    """
+    # rows from before created_at had a default may have none: they cannot be placed in time
+    live = AuditLog.objects.filter(created_at__isnull=False).order_by('-created_at', '-id')
+    if target_table is not None:
+        live = live.filter(target_table=target_table)
+    if target_id is not None:
+        live = live.filter(target_id=target_id)
+    if action is not None:
+        live = live.filter(action=action)
+    if since is not None:
+        live = live.filter(created_at__gte=since)
+    if until is not None:
+        live = live.filter(created_at__lt=until)
+    if limit is not None:
+        live = live[:limit]
+    results = {r['id']: {**r, 'archived': False} for r in (_row(v) for v in live.values_list(*FIELDS))}
+    archived = months()
+    if archived:
+        since_utc, until_utc = _utc(since), _utc(until)
+        with _locked('.swap', shared=True):
+            # newest month first; stop once older months cannot reach the first `limit` results
+            for month in reversed(archived):
+                if (since_utc and month < since_utc[:7]) or (until_utc and month > until_utc[:7]):
+                    continue
+                floor = since_utc
+                if limit is not None and len(results) >= limit:
+                    floor = max(floor or '', sorted((r['created_at'] for r in results.values()), reverse=True)[limit - 1])
+                    if month < floor[:7]:
+                        break
+                for row in _iter_month(month, target_table, target_id, floor, until_utc):
+                    if row['id'] not in results and _matches(row, target_table, target_id, action, since, until):
+                        results[row['id']] = {**row, 'archived': True}
+    ordered = sorted(results.values(), key=lambda r: (r['created_at'], r['id']), reverse=True)
+    return ordered if limit is None else ordered[:limit]
+
+def compact(month, member_rows=None):
+    """
+    Rewrite a month segment de-duplicated and sorted by id, in members of member_rows rows
+    (default BATCH_SIZE), replacing both files atomically. Returns the row count.
+    """
+    member_rows = member_rows or _config()['BATCH_SIZE']
+    data_path, index_path = _paths(month)
+    with _locked('.write'):
+        rows = {}
+        for entry in _index(month):
+            for row in _read_member(month, entry):
+                rows[row['id']] = row
+        rows = [rows[i] for i in sorted(rows)]
+        tmp_data, tmp_index = f'{data_path}.tmp', f'{index_path}.tmp'
+        with open(tmp_data, 'wb') as data, open(tmp_index, 'w') as index:
+            for i in range(0, len(rows), member_rows):
+                chunk = rows[i:i + member_rows]
+                member = _member(chunk)
+                index.write(json.dumps(_index_entry(data.tell(), len(member), chunk)) + '\n')
+                data.write(member)
+            data.flush()
+            os.fsync(data.fileno())
+            index.flush()
+            os.fsync(index.fileno())
+        with _locked('.swap'):
+            os.replace(tmp_data, data_path)
+            os.replace(tmp_index, index_path)
+    return len(rows)
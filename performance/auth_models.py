@@ -1,9 +1,20 @@
 from django.db import models
+from django.conf import settings
+from datetime import timedelta
 import uuid
 from django.utils import timezone
 
+def token_lifetime():
+    return getattr(settings, 'AUTH_TOKEN_LIFETIME', timedelta(hours=8))
+
 class AuthToken(models.Model):
     user = models.ForeignKey('performance.User', on_delete=models.CASCADE)
     token = models.CharField(max_length=128, unique=True, default=uuid.uuid4)
     created_at = models.DateTimeField(auto_now_add=True)
-    expires_at = models.DateTimeField(null=True, blank=True) 
\ No newline at end of file
+    expires_at = models.DateTimeField(null=True, blank=True, db_index=True)
+
+    def effective_expiry(self):
+        # tokens issued before expiry was enforced fall back to created_at + AUTH_TOKEN_LIFETIME
+        if self.expires_at is not None:
+            return self.expires_at
+        return self.created_at + token_lifetime() if self.created_at else None 
\ No newline at end of file
@@ -0,0 +1,143 @@
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, get_hasher, identify_hasher, make_password
+from django.utils import timezone
+from rest_framework import exceptions
+from rest_framework.authentication import BaseAuthentication
+from .auth_models import AuthToken, token_lifetime
+from .models import User
+
+class TTLCache:
+    """Small thread-safe LRU cache whose entries also expire after a per-entry TTL (seconds)."""
+
+    def __init__(self, maxsize=10000, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, deadline = item
+            if deadline <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+# token -> (user, expiry). Per process: logout evicts locally, other workers drop the entry
+# after AUTH_TOKEN_CACHE_TTL seconds at most.
+token_cache = TTLCache(
+    maxsize=getattr(settings, 'AUTH_TOKEN_CACHE_SIZE', 10000),
+    ttl=getattr(settings, 'AUTH_TOKEN_CACHE_TTL', 60),
+)
+
+def get_token_from_request(request):
+    """Accept 'Token <key>', 'Bearer <key>' or a bare key in the Authorization header."""
+    header = request.META.get('HTTP_AUTHORIZATION', '').strip()
+    if not header:
+        return None
+    parts = header.split()
+    if len(parts) == 2 and parts[0].lower() in ('token', 'bearer'):
+        return parts[1]
+    if len(parts) == 1:
+        return parts[0]
+    return None
+
+class AuthTokenAuthentication(BaseAuthentication):
+    """
+    Authenticates requests with performance.auth_models.AuthToken (issued by views.login).
+    Token lookups are cached in-process, so a valid token costs no DB round-trip until the
+    cache entry expires; expires_at is enforced on every request.
+    """
+    keyword = 'Token'
+
+    def authenticate(self, request):
+        key = get_token_from_request(request)
+        if not key:
+            return None
+        entry = token_cache.get(key)
+        if entry is None:
+            token = AuthToken.objects.select_related('user').filter(token=key).first()
+            if token is None or not token.user.is_active:
+                raise exceptions.AuthenticationFailed('Invalid token.')
+            entry = (token.user, token.effective_expiry())
+            if entry[1] is not None:
+                token_cache.set(key, entry, ttl=(entry[1] - timezone.now()).total_seconds())
+            else:
+                token_cache.set(key, entry)
+        user, expires_at = entry
+        if expires_at is not None and expires_at <= timezone.now():
+            token_cache.delete(key)
+            raise exceptions.AuthenticationFailed('Token has expired.')
+        return (user, key)
+
+    def authenticate_header(self, request):
+        return self.keyword
+
+
+# Login pipeline shared by views.login (WSGI) and async_views.login (ASGI).
+
+def needs_rehash(encoded):
+    """True if encoded was not produced by the preferred hasher with its current settings."""
+    try:
+        hasher = identify_hasher(encoded)
+    except ValueError:
+        return False
+    preferred = get_hasher('default')
+    return hasher.algorithm != preferred.algorithm or preferred.must_update(encoded)
+
+def verify_password(user, password):
+    """check_password against User.password_hash, rehashing to the configured profile on success."""
+    def rehash(raw_password):
+        user.set_password(raw_password)
+        User.objects.filter(pk=user.pk).update(password_hash=user.password_hash)
+    return check_password(password, user.password_hash, setter=rehash)
+
+def issue_token(user):
+    """Create an AuthToken for user. Returns (token, expires_at)."""
+    token = str(uuid.uuid4())
+    expires_at = timezone.now() + token_lifetime()
+    AuthToken.objects.create(user=user, token=token, expires_at=expires_at)
+    return token, expires_at
+
+_hash_executor = None
+_hash_executor_lock = threading.Lock()
+
+def hash_executor():
+    """Thread pool for password hashing under ASGI (hashlib releases the GIL, so hashes run in parallel)."""
+    global _hash_executor
+    with _hash_executor_lock:
+        if _hash_executor is None:
+            workers = getattr(settings, 'PASSWORD_HASH_WORKERS', None) or os.cpu_count() or 1
+            _hash_executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+        return _hash_executor
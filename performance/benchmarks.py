@@ -0,0 +1,319 @@
+import os
+import threading
+import time
+from django.contrib.auth.hashers import check_password, get_hasher, make_password
+
+# Benchmarks runnable with `manage.py benchmark <name> [--param key=value ...]`.
+# Each benchmark returns a flat dict of results so runs can be stored and compared.
+
+BENCHMARKS = {}
+
+def benchmark(name):
+    def register(fn):
+        BENCHMARKS[name] = fn
+        return fn
+    return register
+
+@benchmark('login')
+def bench_login(seconds=3.0, workers=None):
+    """
+    Password verification throughput with the configured hasher (the CPU-bound part of auth/login).
+    Runs check_password in `workers` threads (default: one per core) for `seconds`.
+    """
+    cores = os.cpu_count() or 1
+    workers = int(workers or cores)
+    encoded = make_password('benchmark-password')
+    hasher = get_hasher('default')
+    deadline = time.perf_counter() + float(seconds)
+    counts = [0] * workers
+
+    def run(slot):
+        while time.perf_counter() < deadline:
+            check_password('benchmark-password', encoded)
+            counts[slot] += 1
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(workers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    total = sum(counts)
+    return {
+        'hasher': hasher.algorithm,
+        'iterations': getattr(hasher, 'iterations', None),
+        'workers': workers,
+        'cores': cores,
+        'logins': total,
+        'seconds': round(elapsed, 3),
+        'logins_per_sec': round(total / elapsed, 1),
+        'logins_per_sec_per_core': round(total / elapsed / min(workers, cores), 1),
+    }
+
+def _latency_stats(prefix, latencies, elapsed):
+    latencies = sorted(latencies)
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    return {
+        f'{prefix}_requests': len(latencies),
+        f'{prefix}_rps': round(len(latencies) / elapsed, 1),
+        f'{prefix}_p50_ms': round(latencies[len(latencies) // 2] * 1000, 2),
+        f'{prefix}_p99_ms': round(p99 * 1000, 2),
+    }
+
+def _default_paths():
+    from .models import Employee
+    employee = Employee.objects.order_by('id').first()
+    if employee is None:
+        raise ValueError('no employees in the database; generate data first')
+    return [
+        f'/employees/{employee.id}/reviews',
+        f'/employees/{employee.id}/goals',
+        f'/employees/{employee.id}/performance-trend',
+        f'/departments/{employee.department}/summary',
+    ]
+
+@benchmark('asgi')
+def bench_asgi(requests=200, concurrency=8, paths=None):
+    """
+    Requests/sec and latency of the read endpoints through the WSGI handler (sync DRF views,
+    `concurrency` threads) versus the ASGI handler (async views, `concurrency` in-flight requests).
+    Runs in-process against the configured database; paths is a comma separated list.
+    """
+    import asyncio
+    from django.conf import settings
+    from django.test import Client, AsyncClient
+    from django.test.utils import override_settings
+
+    requests = int(requests)
+    concurrency = int(concurrency)
+    paths = paths.split(',') if paths else _default_paths()
+    targets = [paths[i % len(paths)] for i in range(requests)]
+
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+
+    def wsgi_worker(chunk):
+        client = Client()
+        for path in chunk:
+            t = time.perf_counter()
+            status = client.get(path).status_code
+            with lock:
+                latencies.append(time.perf_counter() - t)
+                if status >= 400:
+                    errors.append(path)
+
+    async def run_asgi():
+        client = AsyncClient()
+        sem = asyncio.Semaphore(concurrency)
+        timings = []
+        failed = []
+
+        async def one(path):
+            async with sem:
+                t = time.perf_counter()
+                status = (await client.get(path)).status_code
+                timings.append(time.perf_counter() - t)
+                if status >= 400:
+                    failed.append(path)
+
+        begin = time.perf_counter()
+        await asyncio.gather(*(one(p) for p in targets))
+        return timings, time.perf_counter() - begin, len(failed)
+
+    # the in-process test clients send Host: testserver
+    hosts = override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'])
+    hosts.enable()
+    try:
+        start = time.perf_counter()
+        threads = [threading.Thread(target=wsgi_worker, args=(targets[i::concurrency],)) for i in range(concurrency)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        result = _latency_stats('wsgi', latencies, time.perf_counter() - start)
+        result['wsgi_errors'] = len(errors)
+        timings, elapsed, asgi_errors = asyncio.run(run_asgi())
+    finally:
+        hosts.disable()
+    result.update(_latency_stats('asgi', timings, elapsed))
+    result['asgi_errors'] = asgi_errors
+    result['paths'] = ','.join(paths)
+    return result
+
+
+def _analyzer_payload(employees, departments, quarters, seed=0):
+    import random
+    rng = random.Random(seed)
+    dept_avgs = {f'Dept{d}': [round(rng.uniform(5, 8), 2) for _ in range(quarters)] for d in range(departments)}
+    return {
+        'department_averages': dept_avgs,
+        'employees': [
+            {
+                'employee_id': i,
+                'department': f'Dept{rng.randrange(departments)}',
+                'quarterly_scores': [round(rng.uniform(3, 10), 2) for _ in range(rng.randint(1, quarters))],
+                'goal_completion_rates': [round(rng.random(), 2) for _ in range(quarters)],
+            }
+            for i in range(employees)
+        ],
+    }
+
+@benchmark('analyzer')
+def bench_analyzer(employees=200000, departments=50, quarters=8):
+    """
+    analyze_company_performance (NumPy) versus the per-employee loop on a synthetic payload.
+    Fails if the two produce different output.
+    """
+    from .outlier_detector import analyze_company_performance, analyze_company_performance_loop
+    payload = _analyzer_payload(int(employees), int(departments), int(quarters))
+
+    start = time.perf_counter()
+    expected = analyze_company_performance_loop(payload)
+    loop_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    result = analyze_company_performance(payload)
+    vector_seconds = time.perf_counter() - start
+    if result != expected:
+        raise AssertionError('vectorized analyzer output differs from the loop')
+    return {
+        'employees': int(employees),
+        'high_performers': len(result['high_performers']),
+        'at_risk': len(result['at_risk']),
+        'loop_seconds': round(loop_seconds, 3),
+        'vectorized_seconds': round(vector_seconds, 3),
+        'speedup': round(loop_seconds / vector_seconds, 1) if vector_seconds else None,
+    }
+
+def _call_stats(prefix, timings):
+    timings = sorted(timings)
+    p99 = timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+    return {
+        f'{prefix}_calls': len(timings),
+        f'{prefix}_p50_ms': round(timings[len(timings) // 2] * 1000, 3),
+        f'{prefix}_p99_ms': round(p99 * 1000, 3),
+        f'{prefix}_total_s': round(sum(timings), 3),
+    }
+
+def _time_calls(fn, args_list):
+    timings = []
+    for args in args_list:
+        t = time.perf_counter()
+        fn(*args)
+        timings.append(time.perf_counter() - t)
+    return timings
+
+def _sample_employees(samples):
+    from .models import Employee
+    ids = list(Employee.objects.order_by('id').values_list('id', 'department'))
+    if not ids:
+        raise ValueError('no employees in the database; run `manage.py generate_dataset` first')
+    step = max(1, len(ids) // int(samples))
+    return ids[::step][:int(samples)]
+
+def _company_payload(num_cycles):
+    # analyze_company_performance input built from the stored scores of the last num_cycles cycles
+    from collections import defaultdict
+    from .models import Employee, ReviewCycle
+    from .services import calculate_final_scores_for_cycles, calculate_goal_achievements
+    cycles = list(ReviewCycle.objects.order_by('-start_date').values_list('id', flat=True)[:num_cycles])[::-1]
+    finals = calculate_final_scores_for_cycles(cycles)
+    goals = {cid: calculate_goal_achievements.uncached(cid) for cid in cycles}
+    departments = dict(Employee.objects.values_list('id', 'department'))
+    per_dept = defaultdict(lambda: [[] for _ in cycles])
+    employees = []
+    for eid, dept in departments.items():
+        scores = [finals[cid][eid] for cid in cycles if eid in finals[cid]]
+        for i, cid in enumerate(cycles):
+            if eid in finals[cid]:
+                per_dept[dept][i].append(finals[cid][eid])
+        employees.append({
+            'employee_id': eid,
+            'department': dept,
+            'quarterly_scores': scores,
+            'goal_completion_rates': [goals[cid][eid]['completion_rate'] for cid in cycles if eid in goals[cid]],
+        })
+    dept_avgs = {dept: [round(sum(v) / len(v), 2) if v else 0.0 for v in values] for dept, values in per_dept.items()}
+    return {'employees': employees, 'department_averages': dept_avgs}
+
+@benchmark('services')
+def bench_services(samples=200, cycles=3):
+    """
+    Per-call latency of the scoring services on the current database (`manage.py generate_dataset`),
+    bypassing the result cache, for `samples` employees spread over the id range; plus the batch
+    variants and analyze_company_performance over every active employee.
+    """
+    from .models import ReviewCycle
+    from .outlier_detector import analyze_company_performance
+    from .services import (
+        calculate_final_score, calculate_final_scores, calculate_goal_achievement, calculate_goal_achievements,
+        get_performance_trend, get_performance_trends, identify_outliers, identify_company_outliers,
+    )
+    employees = _sample_employees(samples)
+    cycle = ReviewCycle.objects.filter(status='closed').order_by('-start_date').first() or ReviewCycle.objects.order_by('-start_date').first()
+    if cycle is None:
+        raise ValueError('no review cycles in the database; run `manage.py generate_dataset` first')
+    ids = [eid for eid, _ in employees]
+    departments = sorted({dept for _, dept in employees})
+    cycles = int(cycles)
+
+    result = {'employees_sampled': len(ids), 'cycle_id': cycle.id}
+    result.update(_call_stats('final_score', _time_calls(calculate_final_score.uncached, [(eid, cycle.id) for eid in ids])))
+    result.update(_call_stats('performance_trend', _time_calls(get_performance_trend.uncached, [(eid, cycles) for eid in ids])))
+    result.update(_call_stats('goal_achievement', _time_calls(calculate_goal_achievement.uncached, [(eid, cycle.id) for eid in ids])))
+    result.update(_call_stats('outliers', _time_calls(identify_outliers.uncached, [(dept,) for dept in departments])))
+    result.update(_call_stats('final_scores_batch', _time_calls(calculate_final_scores, [(cycle.id,)])))
+    result.update(_call_stats('performance_trends_batch', _time_calls(get_performance_trends.uncached, [(ids, cycles)])))
+    result.update(_call_stats('goal_achievements_batch', _time_calls(calculate_goal_achievements.uncached, [(cycle.id,)])))
+    result.update(_call_stats('company_outliers', _time_calls(identify_company_outliers.uncached, [()])))
+
+    start = time.perf_counter()
+    payload = _company_payload(cycles)
+    result['company_payload_s'] = round(time.perf_counter() - start, 3)
+    result['company_employees'] = len(payload['employees'])
+    result.update(_call_stats('analyze_company', _time_calls(analyze_company_performance, [(payload,)])))
+    return result
+
+@benchmark('endpoints')
+def bench_endpoints(samples=50, repeat=1):
+    """
+    Latency and SQL query count of the main read endpoints (profile, reviews, goals, trend, org
+    summary, department summary, bulk trend) on the current database, through the WSGI test client.
+    The result cache is invalidated first, so the first request per URL is a miss.
+    """
+    from django.conf import settings
+    from django.test import Client
+    from django.test.utils import override_settings
+    from .cache import invalidate
+    from .profiling import profile_requests
+
+    employees = _sample_employees(samples)
+    ids = [eid for eid, _ in employees]
+    endpoints = {
+        'profile': [f'/employees/{eid}/profile' for eid in ids],
+        'reviews': [f'/employees/{eid}/reviews' for eid in ids],
+        'goals': [f'/employees/{eid}/goals' for eid in ids],
+        'trend': [f'/employees/{eid}/performance-trend' for eid in ids],
+        'org_summary': [f'/employees/{ids[0]}/org-summary'],
+        'department_summary': [f'/departments/{dept}/summary' for dept in sorted({d for _, d in employees})],
+        'trends_batch': ['/employees/performance-trend?employee_ids=' + ','.join(map(str, ids))],
+    }
+    # every cache entry depends on the ('cycles',) scope
+    invalidate(('cycles',))
+    client = Client()
+    result = {'employees_sampled': len(ids)}
+    with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+        for name, paths in endpoints.items():
+            timings = []
+            errors = 0
+            with profile_requests() as profiles:
+                for _ in range(int(repeat)):
+                    for path in paths:
+                        t = time.perf_counter()
+                        errors += client.get(path).status_code >= 400
+                        timings.append(time.perf_counter() - t)
+            result.update(_call_stats(name, timings))
+            result[f'{name}_queries_max'] = max((p.queries for p in profiles), default=None)
+            result[f'{name}_errors'] = errors
+    return result
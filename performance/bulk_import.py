@@ -0,0 +1,242 @@
+import codecs
+import json
+from itertools import islice
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from .models import Employee, Review, ReviewCycle, Score
+from .serializers import ReviewImportSerializer
+from .rollups import refresh_for_reviews
+from .cache import invalidate_reviews
+from . import audit, snapshots
+
+# Streaming bulk review import.
+# Items are parsed incrementally from a JSON array or NDJSON body, validated without DB access,
+# and then resolved / de-duplicated / inserted chunk by chunk with a fixed number of queries.
+
+READ_SIZE = 64 * 1024
+
+def default_batch_size():
+    return getattr(settings, 'BULK_IMPORT_BATCH_SIZE', 1000)
+
+def _read_text(stream):
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    while True:
+        raw = stream.read(READ_SIZE)
+        if not raw:
+            tail = decoder.decode(b'', final=True)
+            if tail:
+                yield tail
+            return
+        yield decoder.decode(raw) if isinstance(raw, bytes) else raw
+
+def iter_ndjson(stream):
+    """Yield one decoded object per non-empty line."""
+    buf = ''
+    for text in _read_text(stream):
+        buf += text
+        *lines, buf = buf.split('\n')
+        for line in lines:
+            if line.strip():
+                yield json.loads(line)
+    if buf.strip():
+        yield json.loads(buf)
+
+def iter_json_items(stream):
+    """
+    Yield items of a top-level JSON array without loading the whole document.
+    A top-level object is accepted for compatibility and its 'reviews' list is used.
+    """
+    decoder = json.JSONDecoder()
+    chunks = _read_text(stream)
+    buf = ''
+    pos = 0
+    eof = False
+
+    def fill():
+        nonlocal buf, pos, eof
+        text = next(chunks, None)
+        if text is None:
+            eof = True
+            return False
+        buf = buf[pos:] + text
+        pos = 0
+        return True
+
+    def skip_ws():
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos] in ' \t\r\n':
+                pos += 1
+            if pos < len(buf) or not fill():
+                return
+
+    skip_ws()
+    if pos >= len(buf):
+        return
+    if buf[pos] == '{':
+        # legacy {"reviews": [...]} payload: no streaming possible, parse it whole
+        while fill():
+            pass
+        yield from json.loads(buf[pos:]).get('reviews', [])
+        return
+    if buf[pos] != '[':
+        raise ValueError('Expected a JSON array of reviews')
+    pos += 1
+
+    while True:
+        skip_ws()
+        if pos >= len(buf):
+            raise ValueError('Unterminated JSON array')
+        if buf[pos] == ']':
+            return
+        if buf[pos] == ',':
+            pos += 1
+            continue
+        try:
+            item, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            if fill():
+                continue
+            raise
+        rest = buf[end:].lstrip(' \t\r\n')
+        if (not rest or rest[0] not in ',]') and not eof and fill():
+            # no delimiter after the value yet: it may be truncated (e.g. a number split as "4." + "5"); re-read
+            continue
+        pos = end
+        yield item
+
+def _chunks(items, size):
+    items = iter(items)
+    while True:
+        chunk = []
+        try:
+            for item in islice(items, size):
+                chunk.append(item)
+        except ValueError:
+            # malformed body: the items parsed before it still form a (last) chunk
+            if chunk:
+                yield chunk
+            raise
+        if not chunk:
+            return
+        yield chunk
+
+def _missing_pk(value):
+    return [f'Invalid pk "{value}" - object does not exist.']
+
+def _insert(rows, batch_size):
+    # rows: [(item, validated_data)] -> [(review, validated_data)]
+    reviews = Review.objects.bulk_create(
+        [Review(**{k: val for k, val in v.items() if k != 'scores'}) for _, v in rows],
+        batch_size=batch_size,
+    )
+    Score.objects.bulk_create(
+        [Score(review_id=review.id, **s) for review, (_, v) in zip(reviews, rows) for s in v.get('scores', [])],
+        batch_size=batch_size,
+    )
+    return [(review, v) for review, (_, v) in zip(reviews, rows)]
+
+def _exists(v):
+    return Review.all_objects.filter(
+        employee_id=v['employee_id'], reviewer_id=v.get('reviewer_id'), cycle_id=v['cycle_id'], review_type=v['review_type'],
+    ).exists()
+
+def _import_chunk(items, batch_size):
+    created = []
+    errors = []
+    valid = []
+    for item in items:
+        serializer = ReviewImportSerializer(data=item)
+        if serializer.is_valid():
+            valid.append((item, serializer.validated_data))
+        else:
+            errors.append({'item': item, 'error': serializer.errors})
+    if not valid:
+        return created, errors
+
+    # one lookup per FK table for the whole chunk
+    employee_ids = {v['employee_id'] for _, v in valid} | {v['reviewer_id'] for _, v in valid if v.get('reviewer_id') is not None}
+    cycle_ids = {v['cycle_id'] for _, v in valid}
+    known_employees = set(Employee.all_objects.filter(id__in=employee_ids).values_list('id', flat=True))
+    known_cycles = set(ReviewCycle.objects.filter(id__in=cycle_ids).values_list('id', flat=True))
+
+    # one set-based duplicate query against the unique_together key
+    existing = set(
+        Review.all_objects.filter(employee_id__in=employee_ids, cycle_id__in=cycle_ids)
+        .values_list('employee_id', 'reviewer_id', 'cycle_id', 'review_type')
+    )
+
+    to_create = []
+    for item, v in valid:
+        fk_errors = {}
+        if v['employee_id'] not in known_employees:
+            fk_errors['employee'] = _missing_pk(v['employee_id'])
+        if v.get('reviewer_id') is not None and v['reviewer_id'] not in known_employees:
+            fk_errors['reviewer'] = _missing_pk(v['reviewer_id'])
+        if v['cycle_id'] not in known_cycles:
+            fk_errors['cycle'] = _missing_pk(v['cycle_id'])
+        if fk_errors:
+            errors.append({'item': item, 'error': fk_errors})
+            continue
+        key = (v['employee_id'], v.get('reviewer_id'), v['cycle_id'], v['review_type'])
+        if key in existing:
+            errors.append({'item': item, 'error': 'duplicate'})
+            continue
+        existing.add(key)
+        to_create.append((item, v))
+
+    if not to_create:
+        return created, errors
+
+    with transaction.atomic():
+        try:
+            with transaction.atomic():
+                inserted = _insert(to_create, batch_size)
+        except IntegrityError:
+            # a row written since the duplicate query (concurrent import): insert row by row so
+            # only the conflicting items fail, with the usual per-item error
+            inserted = []
+            for item, v in to_create:
+                try:
+                    with transaction.atomic():
+                        inserted.extend(_insert([(item, v)], batch_size))
+                except IntegrityError as e:
+                    errors.append({'item': item, 'error': 'duplicate' if _exists(v) else str(e)})
+        created = [review.id for review, _ in inserted]
+        # bulk_create sends no post_save: record the imported reviews (with their scores) directly
+        for review, v in inserted:
+            audit.record('create', review, new=v)
+        refresh_for_reviews(created)
+        invalidate_reviews(created)
+    # bulk_create sends no signals: drop snapshots of closed cycles that just got reviews
+    for cycle_id in {v['cycle_id'] for _, v in inserted}:
+        snapshots.discard(cycle_id)
+    return created, errors
+
+def import_reviews(items, batch_size=None, progress=None):
+    """
+    Import an iterable of review dicts (same shape as ReviewSerializer input) in chunks of batch_size.
+    progress, if given, is called after each chunk with (processed, created, errors): the row count
+    so far and the running created / errors lists.
+    Returns {'created': [review ids], 'errors': [{'item': ..., 'error': ...}]} like reviews_bulk_import.
+    Chunks commit one by one: if items raises ValueError (malformed body) part way, the items before
+    it are still imported and the result gets a 'detail' with the parse error.
+    """
+    batch_size = batch_size or default_batch_size()
+    result = {'created': [], 'errors': []}
+    processed = 0
+    chunks = _chunks(items, batch_size)
+    while True:
+        try:
+            chunk = next(chunks, None)
+        except ValueError as e:
+            result['detail'] = f'Malformed import body: {e}'
+            return result
+        if chunk is None:
+            return result
+        chunk_created, chunk_errors = _import_chunk(chunk, batch_size)
+        result['created'].extend(chunk_created)
+        result['errors'].extend(chunk_errors)
+        processed += len(chunk)
+        if progress:
+            progress(processed, result['created'], result['errors'])
@@ -0,0 +1,172 @@
+import functools
+import hashlib
+import threading
+import uuid
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import connection, transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import Employee, Review, ReviewCycle, Score, Goal, soft_deleted
+
+# Read-through cache for the score services.
+#
+# Entries are stored in the Django cache alias named by settings.PERFORMANCE_CACHE['ALIAS']
+# (LocMemCache is an in-process LRU with TTL; FileBasedCache / DatabaseCache / Redis share
+# entries between gunicorn workers). Every entry depends on a set of scopes:
+#   ('employee', id)      - reviews, scores and goals of one employee
+#   ('department', name)  - anything computed over a department
+#   ('roster',)           - employee membership (hires, moves, soft deletes)
+#   ('company',)          - company-wide results
+#   ('cycles',)           - the ReviewCycle list (implicitly part of every entry)
+# Each scope has a generation token stored in the same cache and included in the entry key.
+# Model signals replace the tokens of the affected scopes, so stale entries are never read
+# again and simply age out of the backend. Inside a transaction the tokens are replaced again
+# when it commits: a concurrent request may have cached the pre-commit data in between.
+# Tokens only reach the processes sharing the backend, so with ENABLED = None (the default)
+# caching is on only for a shared backend, not for a per-process LocMemCache.
+
+_MISSING = object()
+
+class CacheStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+            self.invalidations = 0
+
+    def incr(self, name, n=1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + n)
+
+    def as_dict(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'invalidations': self.invalidations,
+                'hit_rate': round(self.hits / total, 3) if total else None,
+            }
+
+stats = CacheStats()
+
+def _config():
+    config = {'ENABLED': None, 'ALIAS': 'default', 'TIMEOUT': 300}
+    config.update(getattr(settings, 'PERFORMANCE_CACHE', {}))
+    if config['ENABLED'] is None:
+        # invalidation has to reach every worker: per-process backends do not qualify
+        config['ENABLED'] = not isinstance(caches[config['ALIAS']], (LocMemCache, DummyCache))
+    return config
+
+def _backend():
+    return caches[_config()['ALIAS']]
+
+def _scope_key(scope):
+    return 'perf:gen:' + ':'.join(str(p) for p in scope)
+
+def _generations(scopes):
+    backend = _backend()
+    keys = [_scope_key(s) for s in scopes]
+    found = backend.get_many(keys)
+    missing = {k: uuid.uuid4().hex for k in keys if k not in found}
+    if missing:
+        backend.set_many(missing, timeout=None)
+        found.update(missing)
+    return [found[k] for k in keys]
+
+def invalidate(*scopes):
+    """Drop every cached entry that depends on one of the given scopes."""
+    scopes = set(scopes)
+    if not scopes or not _config()['ENABLED']:
+        return
+
+    def bump():
+        _backend().set_many({_scope_key(s): uuid.uuid4().hex for s in scopes}, timeout=None)
+    # now, for reads later in this transaction, and again once other requests can see the change
+    bump()
+    if connection.in_atomic_block:
+        transaction.on_commit(bump)
+    stats.incr('invalidations', len(scopes))
+
+def cached(namespace, scopes):
+    """
+    Decorator for pure service functions.
+    scopes(*args, **kwargs) returns the scopes the result depends on (see module comment).
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            config = _config()
+            if not config['ENABLED']:
+                return fn(*args, **kwargs)
+            deps = [('cycles',)] + list(scopes(*args, **kwargs))
+            args_hash = hashlib.md5(repr((args, sorted(kwargs.items()))).encode()).hexdigest()
+            gens_hash = hashlib.md5(':'.join(_generations(deps)).encode()).hexdigest()
+            key = f'perf:{namespace}:{args_hash}:{gens_hash}'
+            backend = _backend()
+            value = backend.get(key, _MISSING)
+            if value is not _MISSING:
+                stats.incr('hits')
+                return value
+            stats.incr('misses')
+            value = fn(*args, **kwargs)
+            backend.set(key, value, config['TIMEOUT'])
+            return value
+        wrapper.uncached = fn
+        return wrapper
+    return decorator
+
+def invalidate_employees(employee_ids):
+    """Invalidate employees plus their departments and company-wide results."""
+    rows = Employee.all_objects.filter(id__in=list(employee_ids)).values_list('id', 'department')
+    scopes = {('company',)}
+    for eid, dept in rows:
+        scopes.add(('employee', eid))
+        scopes.add(('department', dept))
+    invalidate(*scopes)
+
+def invalidate_reviews(review_ids):
+    invalidate_employees(Review.all_objects.filter(id__in=list(review_ids)).values_list('employee_id', flat=True))
+
+@receiver([post_save, post_delete], sender=Review)
+@receiver([post_save, post_delete], sender=Goal)
+def _employee_data_changed(sender, instance, **kwargs):
+    if _config()['ENABLED']:
+        invalidate_employees([instance.employee_id])
+
+@receiver([post_save, post_delete], sender=Score)
+def _score_changed(sender, instance, **kwargs):
+    if _config()['ENABLED']:
+        invalidate_reviews([instance.review_id])
+
+@receiver([post_save, post_delete], sender=Employee)
+def _employee_changed(sender, instance, **kwargs):
+    # department of an employee may have changed: membership-based entries are all stale
+    invalidate(('employee', instance.id), ('department', instance.department), ('roster',), ('company',))
+
+@receiver([post_save, post_delete], sender=ReviewCycle)
+def _cycle_changed(sender, instance, **kwargs):
+    invalidate(('cycles',))
+
+@receiver(soft_deleted, sender=Review)
+def _reviews_soft_deleted(sender, pks, **kwargs):
+    if _config()['ENABLED']:
+        invalidate_reviews(pks)
+
+@receiver(soft_deleted, sender=Goal)
+def _goals_soft_deleted(sender, pks, **kwargs):
+    if _config()['ENABLED']:
+        invalidate_employees(Goal.all_objects.filter(id__in=pks).values_list('employee_id', flat=True))
+
+@receiver(soft_deleted, sender=Employee)
+def _employees_soft_deleted(sender, pks, **kwargs):
+    if _config()['ENABLED']:
+        invalidate_employees(pks)
+        invalidate(('roster',))
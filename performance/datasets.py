@@ -0,0 +1,186 @@
+import random
+from collections import deque
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from django.contrib.auth.hashers import make_password
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from .models import Employee, Review, ReviewCycle, Score, Goal, User
+from .cache import invalidate
+from .hierarchy import depth_of, path_for
+from .rollups import rebuild_rollups
+
+# Reproducible synthetic datasets for benchmarking.
+# generate_dataset builds an org tree (a CEO, one head per department, teams with a span of
+# 3-8 below them), a run of quarterly ReviewCycles, self / manager / peer reviews with the four
+# Score criteria and goals for every employee and cycle. Rows are written with bulk_create in
+# batches and explicit primary keys, so manager / review references need no extra round trips
+# and the same seed always produces the same data.
+
+SIZES = {'1k': 1000, '10k': 10000, '100k': 100000}
+
+DEPARTMENTS = ['Engineering', 'Sales', 'Marketing', 'Finance', 'HR', 'Operations', 'Support', 'Product']
+CRITERIA = [c for c, _ in Score.CRITERIA_CHOICES]
+EMAIL_DOMAIN = 'synthetic.example.com'
+BATCH_SIZE = 5000
+
+def _next_id(model):
+    return (model.all_objects.aggregate(m=Max('id'))['m'] or 0) + 1
+
+def _insert(model, rows, batch_size):
+    batch = []
+    count = 0
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            model.objects.bulk_create(batch, batch_size=batch_size)
+            count += len(batch)
+            batch = []
+    if batch:
+        model.objects.bulk_create(batch, batch_size=batch_size)
+        count += len(batch)
+    return count
+
+def _org(rng, n, first_id):
+    # breadth-first tree: employee 0 is the CEO, 1..len(DEPARTMENTS) head a department each
+    heads = min(len(DEPARTMENTS), n - 1)
+    managers = [None] * n
+    departments = ['Executive'] * n
+    for i in range(1, heads + 1):
+        managers[i] = 0
+        departments[i] = DEPARTMENTS[i - 1]
+    open_slots = deque((i, rng.randint(3, 8)) for i in range(1, heads + 1))
+    for i in range(heads + 1, n):
+        manager, slots = open_slots[0]
+        managers[i] = manager
+        departments[i] = departments[manager]
+        open_slots.append((i, rng.randint(3, 8)))
+        if slots == 1:
+            open_slots.popleft()
+        else:
+            open_slots[0] = (manager, slots - 1)
+
+    paths = [None] * n
+    for i in range(n):
+        parent = managers[i]
+        paths[i] = path_for(first_id + i, None if parent is None else paths[parent])
+    return [None if m is None else first_id + m for m in managers], departments, paths
+
+def generate_dataset(employees=1000, cycles=4, peers=2, goals=3, users=0, seed=0, start_year=2022, batch_size=BATCH_SIZE, log=None):
+    """
+    Write a synthetic dataset and return the row counts. Refuses to run twice on the same database
+    (synthetic employees use @synthetic.example.com addresses); start from a fresh database instead.
+    """
+    log = log or (lambda message: None)
+    if Employee.all_objects.filter(email__endswith='@' + EMAIL_DOMAIN).exists():
+        raise ValueError('synthetic data already present; use a fresh database (manage.py flush)')
+    rng = random.Random(seed)
+    n = int(employees)
+    first_id = _next_id(Employee)
+    managers, departments, paths = _org(rng, n, first_id)
+    ids = [first_id + i for i in range(n)]
+    reports = {}
+    for eid, manager in zip(ids, managers):
+        reports.setdefault(manager, []).append(eid)
+
+    counts = {}
+    with transaction.atomic():
+        log(f'employees: {n}')
+        counts['employees'] = _insert(Employee, (
+            Employee(
+                id=eid, name=f'Synthetic Employee {eid}', email=f'employee{eid}@{EMAIL_DOMAIN}',
+                department=departments[i], manager_id=managers[i], role='manager' if eid in reports else 'employee',
+                hire_date=date(start_year - 1 - rng.randint(0, 10), rng.randint(1, 12), rng.randint(1, 28)),
+                path=paths[i], depth=depth_of(paths[i]),
+            )
+            for i, eid in enumerate(ids)
+        ), batch_size)
+
+        if users:
+            password_hash = make_password('synthetic-password')
+            counts['users'] = _insert(User, (
+                User(employee_id=eid, username=f'synthetic{eid}', password_hash=password_hash,
+                     role='manager' if eid in reports else 'employee')
+                for eid in ids[:int(users)]
+            ), batch_size)
+
+        cycle_rows = []
+        for c in range(int(cycles)):
+            year, quarter = start_year + c // 4, c % 4
+            next_start = date(year + (quarter == 3), (quarter * 3 + 3) % 12 + 1, 1)
+            cycle_rows.append(ReviewCycle.objects.create(
+                name=f'{year} Q{quarter + 1}', start_date=date(year, quarter * 3 + 1, 1),
+                end_date=next_start - timedelta(days=1),
+            ))
+        counts['cycles'] = len(cycle_rows)
+
+        # latent ability per employee with a drift per cycle; a few employees decline sharply at the end
+        ability = {eid: rng.gauss(6.5, 1.2) for eid in ids}
+        drift = {eid: rng.gauss(0, 0.3) for eid in ids}
+        decliners = set(rng.sample(ids, max(1, n // 30)))
+        teams = {eid: reports.get(manager, []) for eid, manager in zip(ids, managers)}
+
+        def level(eid, c):
+            value = ability[eid] + drift[eid] * c
+            if eid in decliners and c == len(cycle_rows) - 1:
+                value -= 2.5
+            return value
+
+        next_review = _next_id(Review)
+        review_count = score_count = 0
+        for c, cycle in enumerate(cycle_rows):
+            log(f'cycle {cycle.name}')
+            current = c == len(cycle_rows) - 1
+            submitted_at = datetime.combine(cycle.end_date, time(12), tzinfo=dt_timezone.utc)
+            reviews, scores = [], []
+            for eid, manager in zip(ids, managers):
+                reviewers = [('self', eid, 0.5)]
+                if manager is not None:
+                    reviewers.append(('manager', manager, 0.0))
+                team = [p for p in teams[eid] if p != eid]
+                for peer in rng.sample(team, min(int(peers), len(team))):
+                    reviewers.append(('peer', peer, 0.2))
+                for review_type, reviewer, bias in reviewers:
+                    draft = current and rng.random() < 0.2
+                    reviews.append(Review(
+                        id=next_review, employee_id=eid, reviewer_id=reviewer, cycle=cycle, review_type=review_type,
+                        status='draft' if draft else 'submitted', submitted_date=None if draft else submitted_at,
+                    ))
+                    base = level(eid, c) + bias
+                    scores.extend(
+                        Score(review_id=next_review, criteria=criteria, score=min(10, max(1, round(base + rng.gauss(0, 0.8)))))
+                        for criteria in CRITERIA
+                    )
+                    next_review += 1
+                if len(reviews) >= batch_size:
+                    review_count += _insert(Review, reviews, batch_size)
+                    score_count += _insert(Score, scores, batch_size)
+                    reviews, scores = [], []
+            review_count += _insert(Review, reviews, batch_size)
+            score_count += _insert(Score, scores, batch_size)
+        counts['reviews'], counts['scores'] = review_count, score_count
+
+        def goal_rows():
+            for c, cycle in enumerate(cycle_rows):
+                for eid in ids:
+                    for g in range(int(goals)):
+                        progress = max(0, min(120, round(rng.gauss(level(eid, c) * 11, 25))))
+                        status = 'completed' if progress >= 100 else ('not_started' if progress == 0 else 'in_progress')
+                        yield Goal(employee_id=eid, cycle=cycle, description=f'Goal {g + 1}', target_date=cycle.end_date,
+                                   status=status, progress=progress)
+        log('goals')
+        counts['goals'] = _insert(Goal, goal_rows(), batch_size)
+
+        # explicit primary keys: move the sequences past them (no-op on SQLite)
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(), [Employee, Review]):
+                cursor.execute(sql)
+
+        # every cycle but the last is over; queryset update so no snapshot is taken mid-load
+        ReviewCycle.objects.filter(id__in=[c.id for c in cycle_rows[:-1]]).update(status='closed')
+
+    log('rollups')
+    rebuild_rollups()
+    # bulk writes send no signals
+    invalidate(('roster',), ('company',), ('cycles',))
+    return counts
@@ -0,0 +1,88 @@
+import csv
+import json
+from itertools import islice
+from .models import Employee
+from .services import calculate_component_scores, calculate_goal_achievements, identify_company_outliers, _weighted_final_score
+
+# Streaming export of cycle results: one row per active employee with the component scores,
+# final score, goal metrics and the department outlier flag.
+# Employees are read with a chunked iterator() and each chunk costs two aggregate queries
+# (scores, goals), so memory does not grow with headcount and rows are produced as soon as
+# the first chunk is computed.
+
+CHUNK_SIZE = 2000
+
+COLUMNS = [
+    'employee_id', 'name', 'email', 'department', 'manager_id',
+    'manager_score', 'self_score', 'peer_score', 'final_score',
+    'total_goals', 'completed_goals', 'goal_completion_rate', 'goal_avg_progress', 'weighted_goal_score',
+    'is_outlier',
+]
+
+FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+def iter_cycle_results(cycle_id, department=None, chunk_size=CHUNK_SIZE):
+    """Yield one dict per active employee (ordered by id) with the COLUMNS keys."""
+    # only the flagged ids are kept: the outlier pass itself is a grouped NumPy computation
+    departments = None if department is None else [department]
+    outlier_ids = {
+        o['employee_id']
+        for found in identify_company_outliers(departments=departments, cycle_id=cycle_id).values()
+        for o in found
+    }
+
+    employees = Employee.objects.all()
+    if department is not None:
+        employees = employees.filter(department=department)
+    rows = employees.order_by('id').values_list('id', 'name', 'email', 'department', 'manager_id').iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        ids = [e[0] for e in chunk]
+        components = calculate_component_scores(cycle_id, ids)
+        # per-chunk results are not worth caching
+        goals = calculate_goal_achievements.uncached(cycle_id, employee_ids=ids)
+        for eid, name, email, dept, manager_id in chunk:
+            c = components.get(eid, {'manager': None, 'self': None, 'peer': None})
+            g = goals[eid]
+            yield {
+                'employee_id': eid,
+                'name': name,
+                'email': email,
+                'department': dept,
+                'manager_id': manager_id,
+                'manager_score': c['manager'],
+                'self_score': c['self'],
+                'peer_score': c['peer'],
+                'final_score': _weighted_final_score(c['manager'], c['self'], c['peer']),
+                'total_goals': g['total_goals'],
+                'completed_goals': g['completed'],
+                'goal_completion_rate': g['completion_rate'],
+                'goal_avg_progress': g.get('avg_progress'),
+                'weighted_goal_score': g['weighted_goal_score'],
+                'is_outlier': eid in outlier_ids,
+            }
+
+class _Echo:
+    # csv.writer target that hands back each formatted line instead of buffering it
+    def write(self, value):
+        return value
+
+def render_csv(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(COLUMNS)
+    for row in rows:
+        yield writer.writerow(['' if row[c] is None else row[c] for c in COLUMNS])
+
+def render_ndjson(rows):
+    for row in rows:
+        yield json.dumps(row) + '\n'
+
+def export_cycle_results(cycle_id, fmt='csv', department=None, chunk_size=CHUNK_SIZE):
+    """Generator of encoded text lines for the given format ('csv' or 'ndjson')."""
+    rows = iter_cycle_results(cycle_id, department=department, chunk_size=chunk_size)
+    return render_csv(rows) if fmt == 'csv' else render_ndjson(rows)
@@ -0,0 +1,13 @@
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+class ConfigurablePBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """
+    PBKDF2-SHA256 whose work factor comes from settings.PASSWORD_HASH_ITERATIONS (Django's
+    default when unset). Keeps the pbkdf2_sha256 algorithm name, so existing hashes verify
+    unchanged and are upgraded/downgraded to the configured cost on the next successful login.
+    """
+
+    @property
+    def iterations(self):
+        return getattr(settings, 'PASSWORD_HASH_ITERATIONS', None) or PBKDF2PasswordHasher.iterations
@@ -0,0 +1,94 @@
+from collections import defaultdict
+from django.db.models import F, Value
+from django.db.models.functions import Concat, Substr
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from .models import Employee
+
+# Materialized reporting paths.
+# Employee.path lists the ids from the top of the reporting chain down to the employee
+# ("/1/7/42/") and depth is the number of managers above it, so a whole org is one
+# `path LIKE '/1/7/%'` query (Employee.objects.subtree). Saves that change an employee's
+# manager rewrite the paths of its whole subtree with a single UPDATE. Writes that bypass
+# signals (QuerySet.update(manager=...), bulk_create) need `manage.py rebuild_hierarchy`.
+
+BATCH_SIZE = 1000
+
+def path_for(employee_id, manager_path=None):
+    return f"{manager_path or '/'}{employee_id}/"
+
+def depth_of(path):
+    return path.count('/') - 2
+
+def move_subtree(old_path, new_path):
+    """Re-root every row under old_path (inclusive) at new_path with one UPDATE."""
+    if old_path == new_path:
+        return 0
+    return Employee.all_objects.filter(path__startswith=old_path).update(
+        path=Concat(Value(new_path), Substr('path', len(old_path) + 1)),
+        depth=F('depth') + (depth_of(new_path) - depth_of(old_path)),
+    )
+
+def rebuild_hierarchy():
+    """Recompute every path from the manager FKs. Returns the number of rows changed."""
+    rows = list(Employee.all_objects.values_list('id', 'manager_id', 'path'))
+    children = defaultdict(list)
+    known = {eid for eid, _, _ in rows}
+    for eid, manager_id, _ in rows:
+        children[manager_id if manager_id in known else None].append(eid)
+
+    paths = {}
+    level = [(eid, path_for(eid)) for eid in children[None]]
+    while level:
+        next_level = []
+        for eid, path in level:
+            paths[eid] = path
+            next_level.extend((child, path_for(child, path)) for child in children[eid])
+        level = next_level
+    # rows left over sit on a manager cycle; they are treated as roots
+    for eid, _, _ in rows:
+        if eid not in paths:
+            paths[eid] = path_for(eid)
+
+    changed = [Employee(id=eid, path=paths[eid], depth=depth_of(paths[eid])) for eid, _, path in rows if path != paths[eid]]
+    Employee.all_objects.bulk_update(changed, ['path', 'depth'], batch_size=BATCH_SIZE)
+    return len(changed)
+
+@receiver(pre_save, sender=Employee)
+def _load_paths(sender, instance, raw=False, **kwargs):
+    # current paths of the employee and its new manager, read in one query
+    ids = [i for i in (instance.pk, instance.manager_id) if i is not None]
+    paths = dict(Employee.all_objects.filter(id__in=ids).values_list('id', 'path')) if ids else {}
+    manager_path = paths.get(instance.manager_id, '')
+    if instance.pk is not None and instance.manager_id is not None and (
+        instance.manager_id == instance.pk or f'/{instance.pk}/' in manager_path
+    ):
+        raise ValueError(f'Employee {instance.pk} cannot report to {instance.manager_id}: it is in their reporting line')
+    # save() writes path/depth back: keep the stored values, post_save moves the subtree if needed
+    instance.path = paths.get(instance.pk, '')
+    instance.depth = depth_of(instance.path) if instance.path else 0
+    instance._hierarchy_manager_path = manager_path
+
+@receiver(post_save, sender=Employee)
+def _update_path(sender, instance, raw=False, **kwargs):
+    if raw or not hasattr(instance, '_hierarchy_manager_path'):
+        return
+    manager_path = instance.__dict__.pop('_hierarchy_manager_path')
+    new_path = path_for(instance.pk, manager_path if instance.manager_id is not None else None)
+    if instance.path == new_path:
+        return
+    if instance.path:
+        move_subtree(instance.path, new_path)
+    else:
+        Employee.all_objects.filter(pk=instance.pk).update(path=new_path, depth=depth_of(new_path))
+    instance.path, instance.depth = new_path, depth_of(new_path)
+
+@receiver(post_delete, sender=Employee)
+def _detach_reports(sender, instance, **kwargs):
+    # hard delete: direct reports were set to manager=NULL, their subtrees become top-level
+    if not instance.path:
+        return
+    Employee.all_objects.filter(path__startswith=instance.path).exclude(pk=instance.pk).update(
+        path=Concat(Value('/'), Substr('path', len(instance.path) + 1)),
+        depth=F('depth') - (depth_of(instance.path) + 1),
+    )
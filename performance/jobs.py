@@ -0,0 +1,128 @@
+import os
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+from .models import ImportJob
+from . import audit, bulk_import
+
+# In-process background workers for review bulk imports.
+# The request stores the upload and returns an ImportJob right away; a small thread pool
+# runs performance.bulk_import over the stored file and records progress on the job row.
+# Jobs of a process that exits (worker restart / recycling) are left queued or running:
+# recover_stale_jobs (`manage.py recover_import_jobs`) fails them once their heartbeat
+# (updated_at) is old and removes their uploads. Worker updates only apply to jobs still in
+# the expected state, so a recovered job is not revived by a late worker.
+
+# only the first MAX_STORED_ERRORS per-item errors are kept on the job, error_count has the total
+MAX_STORED_ERRORS = 1000
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'BULK_IMPORT_WORKERS', 2), thread_name_prefix='bulk-import'
+            )
+        return _executor
+
+def upload_dir():
+    path = getattr(settings, 'BULK_IMPORT_UPLOAD_DIR', os.path.join(settings.BASE_DIR, 'var', 'imports'))
+    os.makedirs(path, exist_ok=True)
+    return path
+
+def submit_import(stream, content_type, batch_size=None):
+    """Store the request body and queue an ImportJob for it. The worker starts once the transaction commits."""
+    job = ImportJob(content_type=content_type, batch_size=batch_size, updated_at=timezone.now())
+    job.upload_path = os.path.join(upload_dir(), f'{job.id}.upload')
+    with open(job.upload_path, 'wb') as f:
+        if stream is not None:
+            shutil.copyfileobj(stream, f, bulk_import.READ_SIZE)
+    job.save()
+    transaction.on_commit(lambda: get_executor().submit(_run_in_worker, job.id))
+    return job
+
+def _run_in_worker(job_id):
+    try:
+        # imported reviews are audited in batches from the worker thread
+        with audit.audit_batch():
+            run_import_job(job_id)
+    finally:
+        # worker threads own their DB connections
+        connections.close_all()
+
+def run_import_job(job_id):
+    """Run a queued import job to completion, updating its progress after every chunk."""
+    job = ImportJob.objects.get(id=job_id)
+    now = timezone.now()
+    if not ImportJob.objects.filter(id=job_id, status='queued').update(status='running', started_at=now, updated_at=now):
+        # recovered (failed) while waiting for a worker
+        return
+    running = ImportJob.objects.filter(id=job_id, status='running')
+    stored_errors = 0
+
+    def progress(processed, created, errors):
+        nonlocal stored_errors
+        fields = {'processed': processed, 'created_count': len(created), 'error_count': len(errors), 'updated_at': timezone.now()}
+        # the stored errors only change until MAX_STORED_ERRORS is reached
+        if min(len(errors), MAX_STORED_ERRORS) != stored_errors:
+            stored_errors = min(len(errors), MAX_STORED_ERRORS)
+            fields['errors'] = errors[:MAX_STORED_ERRORS]
+        running.update(**fields)
+
+    try:
+        with open(job.upload_path, 'rb') as f:
+            if job.content_type.startswith('application/x-ndjson'):
+                items = bulk_import.iter_ndjson(f)
+            else:
+                items = bulk_import.iter_json_items(f)
+            result = bulk_import.import_reviews(items, batch_size=job.batch_size, progress=progress)
+    except Exception as e:
+        now = timezone.now()
+        running.update(status='failed', detail=str(e), finished_at=now, updated_at=now)
+        return
+    finally:
+        if os.path.exists(job.upload_path):
+            os.remove(job.upload_path)
+
+    # a malformed body fails the job, keeping what was imported before the parse error
+    now = timezone.now()
+    running.update(
+        status='failed' if 'detail' in result else 'completed', detail=result.get('detail'),
+        created_ids=result['created'], created_count=len(result['created']),
+        error_count=len(result['errors']), errors=result['errors'][:MAX_STORED_ERRORS], finished_at=now, updated_at=now,
+    )
+
+def recover_stale_jobs(older_than):
+    """
+    Fail queued / running jobs whose heartbeat is older than older_than (a timedelta): their worker
+    process is gone. Also deletes uploads of jobs that are no longer queued or running (and
+    uploads without a job), if the file is older than older_than. Returns (jobs failed, uploads removed).
+    """
+    now = timezone.now()
+    cutoff = now - older_than
+    # jobs from before the heartbeat column have none: their created_at stands in
+    stale = ImportJob.objects.filter(status__in=('queued', 'running')).filter(
+        Q(updated_at__lt=cutoff) | Q(updated_at__isnull=True, created_at__lt=cutoff)
+    )
+    failed = stale.update(status='failed', detail='Import worker exited before the job finished', finished_at=now, updated_at=now)
+    pending = {str(i) for i in ImportJob.objects.filter(status__in=('queued', 'running')).values_list('id', flat=True)}
+    removed = 0
+    root = upload_dir()
+    for name in os.listdir(root):
+        path = os.path.join(root, name)
+        # young files may belong to a submit_import that has not saved its job yet
+        if not name.endswith('.upload') or name[:-len('.upload')] in pending or os.path.getmtime(path) >= cutoff.timestamp():
+            continue
+        try:
+            os.remove(path)
+            removed += 1
+        except FileNotFoundError:
+            pass
+    return failed, removed
@@ -0,0 +1,45 @@
+import json
+import sys
+from collections import Counter
+from django.core.management.base import BaseCommand, CommandError
+from performance.bulk_import import iter_ndjson
+from performance.outlier_detector import STREAM_BATCH_SIZE, iter_company_performance
+
+class Command(BaseCommand):
+    help = (
+        "Run the company performance analyzer over an NDJSON file of employee records "
+        "(one {employee_id, department, quarterly_scores, ...} per line) and write NDJSON events"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="NDJSON input file, '-' for stdin. Lines with a department_averages key set the averages")
+        parser.add_argument('--department-averages', help='JSON file with {department: [quarterly averages]}')
+        parser.add_argument('--batch-size', type=int, default=STREAM_BATCH_SIZE)
+        parser.add_argument('--output', help='Write events to this file instead of stdout')
+
+    def handle(self, *args, **options):
+        averages = None
+        if options['department_averages']:
+            with open(options['department_averages']) as f:
+                averages = json.load(f)
+
+        source = sys.stdin.buffer if options['path'] == '-' else open(options['path'], 'rb')
+        out = open(options['output'], 'w') if options['output'] else None
+        counts = Counter()
+        try:
+            events = iter_company_performance(iter_ndjson(source), averages, batch_size=max(1, options['batch_size']))
+            for event in events:
+                counts[event['type']] += 1
+                line = json.dumps(event)
+                if out:
+                    out.write(line + '\n')
+                else:
+                    self.stdout.write(line)
+        except (ValueError, KeyError) as e:
+            raise CommandError(f'Malformed input: {e!r}')
+        finally:
+            if source is not sys.stdin.buffer:
+                source.close()
+            if out:
+                out.close()
+        self.stderr.write(', '.join(f'{t}={counts[t]}' for t in ('high_performer', 'at_risk', 'recommendation')))
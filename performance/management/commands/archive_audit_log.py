@@ -0,0 +1,30 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from performance import audit_archive
+from performance.models import AuditLog
+
+class Command(BaseCommand):
+    help = "Move old AuditLog rows into gzip NDJSON monthly archives (and optionally compact the archives)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than', type=int, metavar='DAYS', help='Retention in days (default PERFORMANCE_AUDIT_ARCHIVE RETENTION_DAYS)')
+        parser.add_argument('--batch-size', type=int, help='Rows moved and deleted per batch')
+        parser.add_argument('--compact', action='store_true', help='Afterwards rewrite every archived month de-duplicated into fewer members')
+        parser.add_argument('--dry-run', action='store_true', help='Only count the rows that would be archived')
+
+    def handle(self, *args, **options):
+        days = options['older_than']
+        if options['dry_run']:
+            days = audit_archive._config()['RETENTION_DAYS'] if days is None else days
+            count = AuditLog.objects.filter(created_at__lt=timezone.now() - timedelta(days=days)).count()
+            self.stdout.write(f"{count} rows older than {days} days")
+            return
+        moved = audit_archive.archive(
+            older_than_days=days, batch_size=options['batch_size'],
+            progress=lambda n: self.stdout.write(f"archived {n} rows"),
+        )
+        if options['compact']:
+            for month in audit_archive.months():
+                self.stdout.write(f"{month}: {audit_archive.compact(month)} rows")
+        self.stdout.write(self.style.SUCCESS(f"Archived {moved} rows"))
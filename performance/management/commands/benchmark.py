@@ -0,0 +1,35 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from performance.benchmarks import BENCHMARKS
+
+class Command(BaseCommand):
+    help = "Run performance benchmarks and print (or save) machine-readable results"
+
+    def add_arguments(self, parser):
+        parser.add_argument('names', nargs='+', help=f"benchmarks to run: {', '.join(sorted(BENCHMARKS))} or 'all'")
+        parser.add_argument('--param', action='append', default=[], metavar='KEY=VALUE', help='benchmark parameter (repeatable)')
+        parser.add_argument('--output', help='write results as JSON to this file')
+
+    def handle(self, *args, **options):
+        names = sorted(BENCHMARKS) if options['names'] == ['all'] else options['names']
+        unknown = [n for n in names if n not in BENCHMARKS]
+        if unknown:
+            raise CommandError(f"unknown benchmarks: {', '.join(unknown)}")
+        params = {}
+        for item in options['param']:
+            key, sep, value = item.partition('=')
+            if not sep:
+                raise CommandError(f"--param expects KEY=VALUE, got {item!r}")
+            params[key] = value
+
+        results = []
+        for name in names:
+            fn = BENCHMARKS[name]
+            accepted = fn.__code__.co_varnames[:fn.__code__.co_argcount]
+            result = fn(**{k: v for k, v in params.items() if k in accepted})
+            results.append({'benchmark': name, **result})
+            self.stdout.write(json.dumps(results[-1]))
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(results, f, indent=2, default=str)
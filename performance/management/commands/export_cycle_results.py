@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+from performance.exports import CHUNK_SIZE, FORMATS, export_cycle_results
+from performance.models import ReviewCycle
+
+class Command(BaseCommand):
+    help = "Stream final scores, components, goal metrics and outlier flags of every employee for a cycle"
+
+    def add_arguments(self, parser):
+        parser.add_argument('cycle_id', type=int)
+        parser.add_argument('--format', choices=list(FORMATS), default='csv')
+        parser.add_argument('--department', help='Only export this department')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+        parser.add_argument('--output', help='Write to this file instead of stdout')
+
+    def handle(self, *args, **options):
+        if not ReviewCycle.objects.filter(id=options['cycle_id']).exists():
+            raise CommandError(f"ReviewCycle {options['cycle_id']} does not exist")
+        lines = export_cycle_results(
+            options['cycle_id'], options['format'], department=options['department'], chunk_size=max(1, options['chunk_size'])
+        )
+        if options['output']:
+            with open(options['output'], 'w', newline='') as f:
+                f.writelines(lines)
+        else:
+            for line in lines:
+                self.stdout.write(line, ending='')
@@ -0,0 +1,38 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from performance.datasets import SIZES, generate_dataset
+from performance.models import ReviewCycle
+from performance.snapshots import build_snapshot
+
+class Command(BaseCommand):
+    help = "Generate a reproducible synthetic dataset (org tree, review cycles, reviews, scores, goals) for benchmarking"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', choices=sorted(SIZES), default='1k', help='Preset employee count')
+        parser.add_argument('--employees', type=int, help='Employee count (overrides --size)')
+        parser.add_argument('--cycles', type=int, default=4, help='Quarterly review cycles; all but the last are closed')
+        parser.add_argument('--peers', type=int, default=2, help='Peer reviews per employee and cycle')
+        parser.add_argument('--goals', type=int, default=3, help='Goals per employee and cycle')
+        parser.add_argument('--users', type=int, default=0, help='Login users for the first N employees')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--snapshots', action='store_true', help='Snapshot the closed cycles afterwards')
+
+    def handle(self, *args, **options):
+        employees = options['employees'] or SIZES[options['size']]
+        if employees < 1 or options['cycles'] < 1:
+            raise CommandError('--employees and --cycles must be positive')
+        start = time.perf_counter()
+        try:
+            counts = generate_dataset(
+                employees=employees, cycles=options['cycles'], peers=options['peers'], goals=options['goals'],
+                users=options['users'], seed=options['seed'], batch_size=options['batch_size'],
+                log=lambda message: self.stdout.write(message),
+            )
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        if options['snapshots']:
+            for cycle_id in ReviewCycle.objects.filter(status='closed').values_list('id', flat=True):
+                build_snapshot(cycle_id)
+        summary = ', '.join(f'{n} {name}' for name, n in counts.items())
+        self.stdout.write(self.style.SUCCESS(f"Generated {summary} in {time.perf_counter() - start:.1f}s"))
@@ -0,0 +1,74 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+from performance import audit
+from performance.cache import invalidate_employees
+from performance.models import Employee, Review, Goal, Score, ReviewScoreRollup
+
+# dependents first, so purging an employee does not cascade into large batches of reviews / goals
+MODELS = {'goal': Goal, 'review': Review, 'employee': Employee}
+
+# Tombstones are invisible to the services, caches and snapshots, so Score / Review / Goal rows are
+# removed with raw DELETEs: no per-row post_delete receivers (cache, snapshot, audit). Each batch
+# invalidates the cache of its employees once and gets one 'purge' audit entry. Employee rows still
+# go through the Collector: their post_delete keeps the hierarchy paths of former reports right.
+
+def _raw_delete(queryset):
+    return queryset._raw_delete(queryset.db)
+
+def _purge_reviews(ids):
+    _raw_delete(Score.objects.filter(review_id__in=ids))
+    _raw_delete(ReviewScoreRollup.objects.filter(review_id__in=ids))
+    return _raw_delete(Review.all_objects.filter(id__in=ids))
+
+def _purge_batch(model, ids):
+    if model is Goal:
+        employee_ids = set(Goal.all_objects.filter(id__in=ids).values_list('employee_id', flat=True))
+        _raw_delete(Goal.all_objects.filter(id__in=ids))
+    elif model is Review:
+        employee_ids = set(Review.all_objects.filter(id__in=ids).values_list('employee_id', flat=True))
+        _purge_reviews(ids)
+    else:
+        employee_ids = set(ids)
+        # their (tombstoned) reviews and goals, left over when only employees are purged
+        _purge_reviews(list(Review.all_objects.filter(employee_id__in=ids).values_list('id', flat=True)))
+        _raw_delete(Goal.all_objects.filter(employee_id__in=ids))
+        Employee.all_objects.filter(id__in=ids).hard_delete()
+    audit.record('purge', target_table=model._meta.db_table, old={'ids': ids})
+    invalidate_employees(employee_ids)
+
+class Command(BaseCommand):
+    help = "Hard delete soft-deleted Employee / Review / Goal rows (tombstones) in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than', type=int, default=30, metavar='DAYS', help='Only tombstones not updated for this many days')
+        parser.add_argument('--model', choices=sorted(MODELS), action='append', help='Limit to these models (repeatable)')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true', help='Only count the tombstones')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['older_than'])
+        for name, model in MODELS.items():
+            if options['model'] and name not in options['model']:
+                continue
+            tombstones = model.all_objects.dead().filter(updated_at__lt=cutoff)
+            if model is Employee:
+                # deleted before the soft delete cascaded (or given reviews since): a hard delete would
+                # take their live reviews / goals with it
+                tombstones = tombstones.exclude(Exists(Review.objects.filter(employee_id=OuterRef('pk')))).exclude(
+                    Exists(Goal.objects.filter(employee_id=OuterRef('pk'))))
+            if options['dry_run']:
+                self.stdout.write(f"{name}: {tombstones.count()} tombstones")
+                continue
+            purged = 0
+            while True:
+                ids = list(tombstones.values_list('id', flat=True)[:options['batch_size']])
+                if not ids:
+                    break
+                with audit.audit_batch(), transaction.atomic():
+                    _purge_batch(model, ids)
+                purged += len(ids)
+            self.stdout.write(f"{name}: purged {purged}")
+        self.stdout.write(self.style.SUCCESS("Done"))
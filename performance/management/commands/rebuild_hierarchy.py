@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from performance.cache import invalidate
+from performance.hierarchy import rebuild_hierarchy
+
+class Command(BaseCommand):
+    help = "Recompute the materialized reporting paths (Employee.path / depth) from the manager FKs"
+
+    def handle(self, *args, **options):
+        changed = rebuild_hierarchy()
+        if changed:
+            invalidate(('roster',), ('company',))
+        self.stdout.write(self.style.SUCCESS(f"Updated {changed} employee paths"))
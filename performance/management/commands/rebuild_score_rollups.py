@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+from performance.rollups import rebuild_rollups, verify_rollups
+
+class Command(BaseCommand):
+    help = "Rebuild (or verify) the ReviewScoreRollup / EmployeeCycleScore tables from raw scores"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cycle', type=int, help='Only process this ReviewCycle id')
+        parser.add_argument('--verify', action='store_true', help='Compare stored rollups with a fresh computation instead of rebuilding')
+
+    def handle(self, *args, **options):
+        cycle_id = options['cycle']
+        if options['verify']:
+            mismatches = verify_rollups(cycle_id)
+            for m in mismatches:
+                self.stdout.write(f"employee={m['employee_id']} cycle={m['cycle_id']} stored={m['stored']} expected={m['expected']}")
+            if mismatches:
+                raise CommandError(f"{len(mismatches)} rollup mismatches")
+            self.stdout.write(self.style.SUCCESS("Rollups up to date"))
+            return
+
+        reviews, scores = rebuild_rollups(cycle_id)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {reviews} review rollups and {scores} employee cycle scores"))
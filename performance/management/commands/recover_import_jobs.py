@@ -0,0 +1,14 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from performance.jobs import recover_stale_jobs
+
+class Command(BaseCommand):
+    help = "Fail bulk import jobs left queued / running by an exited worker process and delete leftover uploads"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than', type=int, default=30, metavar='MINUTES',
+                            help='Heartbeat age after which a queued / running job counts as lost')
+
+    def handle(self, *args, **options):
+        failed, removed = recover_stale_jobs(timedelta(minutes=options['older_than']))
+        self.stdout.write(self.style.SUCCESS(f"Failed {failed} stale jobs, removed {removed} uploads"))
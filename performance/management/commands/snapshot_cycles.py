@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+from performance.models import ReviewCycle
+from performance.snapshots import build_snapshot, discard, load
+
+class Command(BaseCommand):
+    help = "Write columnar snapshots for closed review cycles (missing ones by default)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cycle', type=int, help='Only process this closed ReviewCycle id')
+        parser.add_argument('--rebuild', action='store_true', help='Rewrite snapshots that already exist')
+        parser.add_argument('--discard', action='store_true', help='Remove the snapshots instead')
+
+    def handle(self, *args, **options):
+        cycles = ReviewCycle.objects.filter(status='closed').order_by('start_date')
+        if options['cycle'] is not None:
+            cycles = cycles.filter(id=options['cycle'])
+            if not cycles.exists():
+                raise CommandError(f"No closed ReviewCycle {options['cycle']}")
+
+        for cycle in cycles:
+            if options['discard']:
+                if discard(cycle.id):
+                    self.stdout.write(f"{cycle.name}: discarded")
+                continue
+            if load(cycle.id) is not None and not options['rebuild']:
+                continue
+            rows = build_snapshot(cycle.id)
+            self.stdout.write(f"{cycle.name}: {rows} rows")
+        self.stdout.write(self.style.SUCCESS("Done"))
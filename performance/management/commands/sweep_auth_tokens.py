@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+from performance.auth_models import AuthToken, token_lifetime
+
+class Command(BaseCommand):
+    help = "Delete expired AuthToken rows in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        expired = AuthToken.objects.filter(
+            Q(expires_at__lte=now) | Q(expires_at__isnull=True, created_at__lte=now - token_lifetime())
+        )
+        deleted = 0
+        while True:
+            ids = list(expired.values_list('id', flat=True)[:options['batch_size']])
+            if not ids:
+                break
+            deleted += AuthToken.objects.filter(id__in=ids).delete()[0]
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} expired tokens"))
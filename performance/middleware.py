@@ -0,0 +1,95 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.utils.deprecation import MiddlewareMixin
+from . import audit, profiling
+
+class AsgiUrlconfMiddleware(MiddlewareMixin):
+    """Route requests arriving through the ASGI handler to settings.ASGI_URLCONF (async views first)."""
+
+    def process_request(self, request):
+        urlconf = getattr(settings, 'ASGI_URLCONF', None)
+        if urlconf and isinstance(request, ASGIRequest):
+            request.urlconf = urlconf
+
+class QueryProfilingMiddleware:
+    """
+    Profile every request (query count, DB / render / total time, slowest statements) and feed
+    the per-view metrics in performance.profiling; enforces the view's @query_budget.
+    Works under both WSGI and ASGI. Disabled with PERFORMANCE_PROFILING['ENABLED'] = False.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = profiling._config()['ENABLED']
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.enabled:
+            return self.get_response(request)
+        profile, token = profiling.start_profile()
+        try:
+            response = self.get_response(request)
+        except BaseException:
+            profiling._current.reset(token)
+            raise
+        profiling.finish_profile(profile, token, *self._view(request))
+        return response
+
+    async def __acall__(self, request):
+        if not self.enabled:
+            return await self.get_response(request)
+        profile, token = profiling.start_profile()
+        try:
+            response = await self.get_response(request)
+        except BaseException:
+            profiling._current.reset(token)
+            raise
+        profiling.finish_profile(profile, token, *self._view(request))
+        return response
+
+    def _view(self, request):
+        match = getattr(request, 'resolver_match', None)
+        if match is None:
+            return None, None
+        return match._func_path, getattr(match.func, 'query_budget', None)
+
+class AuditMiddleware:
+    """
+    Collect the audit entries of a request (performance.audit) and write them with one bulk_create
+    once the response is ready, attributed to the authenticated user. Works under WSGI and ASGI.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        batch = audit.AuditBatch()
+        token = audit._batch.set(batch)
+        try:
+            return self.get_response(request)
+        finally:
+            audit._batch.reset(token)
+            audit.set_actor(getattr(request, 'user', None), batch)
+            batch.flush()
+
+    async def __acall__(self, request):
+        batch = audit.AuditBatch()
+        token = audit._batch.set(batch)
+        try:
+            return await self.get_response(request)
+        finally:
+            audit._batch.reset(token)
+            audit.set_actor(getattr(request, 'user', None), batch)
+            await sync_to_async(batch.flush)()
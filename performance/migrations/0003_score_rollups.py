@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('performance', '0002_auditlog_authtoken_alter_score_unique_together_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReviewScoreRollup',
+            fields=[
+                ('review', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='score_rollup', serialize=False, to='performance.review')),
+                ('score_sum', models.IntegerField(default=0)),
+                ('score_count', models.IntegerField(default=0)),
+                ('avg_score', models.FloatField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='EmployeeCycleScore',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('manager_score', models.FloatField(blank=True, null=True)),
+                ('self_score', models.FloatField(blank=True, null=True)),
+                ('peer_score', models.FloatField(blank=True, null=True)),
+                ('final_score', models.FloatField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('cycle', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='employee_scores', to='performance.reviewcycle')),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cycle_scores', to='performance.employee')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['cycle', 'employee'], name='performance_cycle_i_d23603_idx')],
+                'unique_together': {('employee', 'cycle')},
+            },
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('performance', '0004_importjob'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='goal',
+            index=models.Index(fields=['employee', 'created_at', 'id'], name='performance_employe_81a28b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reviewcycle',
+            index=models.Index(fields=['start_date', 'id'], name='performance_start_d_6baed3_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('performance', '0005_listing_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='authtoken',
+            name='expires_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+    ]
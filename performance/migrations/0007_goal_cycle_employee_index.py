@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('performance', '0006_authtoken_expires_at_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='goal',
+            index=models.Index(fields=['cycle', 'employee', 'is_deleted'], name='performance_cycle_i_dd0c01_idx'),
+        ),
+    ]
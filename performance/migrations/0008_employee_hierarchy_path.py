@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:48
+
+from collections import defaultdict
+from django.db import migrations, models
+
+
+def populate_paths(apps, schema_editor):
+    # same walk as performance.hierarchy.rebuild_hierarchy, against the historical model
+    Employee = apps.get_model('performance', 'Employee')
+    rows = list(Employee.objects.values_list('id', 'manager_id'))
+    known = {eid for eid, _ in rows}
+    children = defaultdict(list)
+    for eid, manager_id in rows:
+        children[manager_id if manager_id in known else None].append(eid)
+    paths = {}
+    level = [(eid, f'/{eid}/') for eid in children[None]]
+    while level:
+        next_level = []
+        for eid, path in level:
+            paths[eid] = path
+            next_level.extend((child, f'{path}{child}/') for child in children[eid])
+        level = next_level
+    updates = [Employee(id=eid, path=paths.get(eid, f'/{eid}/')) for eid, _ in rows]
+    for e in updates:
+        e.depth = e.path.count('/') - 2
+    Employee.objects.bulk_update(updates, ['path', 'depth'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('performance', '0007_goal_cycle_employee_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='employee',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='employee',
+            name='path',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=255),
+        ),
+        migrations.RunPython(populate_paths, migrations.RunPython.noop),
+    ]
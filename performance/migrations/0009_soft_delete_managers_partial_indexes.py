@@ -0,0 +1,80 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:05
+
+import django.db.models.manager
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('performance', '0008_employee_hierarchy_path'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='employee',
+            options={'default_manager_name': 'all_objects'},
+        ),
+        migrations.AlterModelOptions(
+            name='goal',
+            options={'default_manager_name': 'all_objects'},
+        ),
+        migrations.AlterModelOptions(
+            name='review',
+            options={'default_manager_name': 'all_objects'},
+        ),
+        migrations.AlterModelManagers(
+            name='employee',
+            managers=[
+                ('all_objects', django.db.models.manager.Manager()),
+            ],
+        ),
+        migrations.AlterModelManagers(
+            name='goal',
+            managers=[
+                ('all_objects', django.db.models.manager.Manager()),
+            ],
+        ),
+        migrations.AlterModelManagers(
+            name='review',
+            managers=[
+                ('all_objects', django.db.models.manager.Manager()),
+            ],
+        ),
+        migrations.RemoveIndex(
+            model_name='goal',
+            name='performance_employe_81a28b_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='goal',
+            name='performance_cycle_i_dd0c01_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='review',
+            name='performance_employe_96dc4f_idx',
+        ),
+        migrations.AddIndex(
+            model_name='employee',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['department', 'id'], name='employee_alive_dept_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='employee',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['manager'], name='employee_alive_manager_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='goal',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['employee', 'created_at', 'id'], name='goal_alive_emp_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='goal',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['cycle', 'employee'], name='goal_alive_cycle_emp_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['employee', 'cycle'], name='review_alive_emp_cycle_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['cycle', 'employee'], name='review_alive_cycle_emp_idx'),
+        ),
+    ]
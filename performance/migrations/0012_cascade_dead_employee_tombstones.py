@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:33
+
+from django.db import migrations
+from django.utils import timezone
+
+
+def cascade_tombstones(apps, schema_editor):
+    # employees soft deleted before the cascade existed still have live reviews / goals;
+    # flag them like SoftDeleteQuerySet.delete would have
+    Employee = apps.get_model('performance', 'Employee')
+    dead = Employee._base_manager.filter(is_deleted=True).values('pk')
+    now = timezone.now()
+    for name in ('Review', 'Goal'):
+        model = apps.get_model('performance', name)
+        model._base_manager.filter(employee__in=dead, is_deleted=False).update(is_deleted=True, updated_at=now)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('performance', '0011_importjob_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(cascade_tombstones, migrations.RunPython.noop),
+    ]
@@ -1,10 +1,27 @@
+from django.conf import settings
 from django.db import models, transaction
+import uuid
 from django.contrib.auth.hashers import make_password
+from django.dispatch import Signal
 from django.utils import timezone
 
+# sent with the primary keys of rows flagged by a soft delete (queryset or instance)
+soft_deleted = Signal()
+
 class SoftDeleteQuerySet(models.QuerySet):
     def delete(self):
-        return super().update(is_deleted=1, updated_at=timezone.now())
+        # one transaction: a failing step or receiver must not leave dependents tombstoned under a live row
+        with transaction.atomic(using=self.db):
+            # dependents first: once these rows are flagged they drop out of alive querysets like self
+            for name in getattr(self.model, 'soft_delete_cascade', ()):
+                rel = self.model._meta.get_field(name)
+                rel.related_model.objects.using(self.db).filter(**{f'{rel.field.name}__in': self.values('pk')}).delete()
+            if not soft_deleted.has_listeners(self.model):
+                return super().update(is_deleted=1, updated_at=timezone.now())
+            pks = list(self.values_list('pk', flat=True))
+            updated = super().update(is_deleted=1, updated_at=timezone.now())
+            soft_deleted.send(sender=self.model, pks=pks)
+            return updated
 
     def hard_delete(self):
         return super().delete()
@@ -15,7 +32,59 @@ class SoftDeleteQuerySet(models.QuerySet):
     def dead(self):
         return self.filter(is_deleted=1)
 
-class Employee(models.Model):
+class SoftDeleteManager(models.Manager.from_queryset(SoftDeleteQuerySet)):
+    """`objects` of soft-deletable models: tombstones (is_deleted) are excluded; use `all_objects` to see them."""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(is_deleted=False)
+
+class SoftDeleteModel(models.Model):
+    """
+    Base for soft-deletable models. `objects` only returns live rows; `all_objects` returns every row
+    and is the default manager, so uniqueness validation, related managers and dumpdata still see tombstones.
+    Subclasses define an is_deleted BooleanField; related rows named in soft_delete_cascade (reverse
+    accessors) are soft deleted along with the row.
+    """
+    objects = SoftDeleteManager()
+    all_objects = SoftDeleteQuerySet.as_manager()
+
+    soft_delete_cascade = ()
+
+    class Meta:
+        abstract = True
+        default_manager_name = 'all_objects'
+
+    def soft_delete(self):
+        type(self).all_objects.filter(pk=self.pk).delete()
+        self.is_deleted = True
+
+class AuditedModel(models.Model):
+    """
+    Keeps the values an instance was loaded with, so performance.audit can log old/new values of a save.
+    Only while auditing is enabled (PERFORMANCE_AUDIT['ENABLED']): otherwise loads carry no extra copy.
+    """
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if getattr(settings, 'PERFORMANCE_AUDIT', {}).get('ENABLED', True):
+            instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+class EmployeeQuerySet(SoftDeleteQuerySet):
+    def subtree(self, manager_id, include_self=False):
+        """Everyone below manager_id in the reporting hierarchy, in one query on the materialized path."""
+        path = Employee.all_objects.filter(id=manager_id).values('path')[:1]
+        qs = self.filter(path__startswith=models.Subquery(path))
+        return qs if include_self else qs.exclude(id=manager_id)
+
+class EmployeeManager(SoftDeleteManager.from_queryset(EmployeeQuerySet)):
+    pass
+
+class Employee(SoftDeleteModel, AuditedModel):
     name = models.CharField(max_length=255)
     email = models.EmailField(unique=True)
     department = models.CharField(max_length=100, db_index=True)
@@ -25,12 +94,22 @@ class Employee(models.Model):
     is_deleted = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True, null=True,)
     updated_at = models.DateTimeField(auto_now=True, null=True,)
+    # materialized reporting path, e.g. "/1/7/42/" for 42 reporting to 7 reporting to 1; maintained by performance.hierarchy
+    path = models.CharField(max_length=255, db_index=True, default='', editable=False)
+    depth = models.PositiveSmallIntegerField(default=0, editable=False)
 
-    objects = SoftDeleteQuerySet.as_manager()
+    objects = EmployeeManager()
+    all_objects = EmployeeQuerySet.as_manager()
 
-    def soft_delete(self):
-        self.is_deleted = True
-        self.save(update_fields=['is_deleted','updated_at'])
+    # soft deleting an employee tombstones their reviews and goals (one UPDATE each)
+    soft_delete_cascade = ('reviews', 'goals')
+
+    class Meta(SoftDeleteModel.Meta):
+        # live-row indexes for the roster queries (department listings, direct reports)
+        indexes = [
+            models.Index(fields=['department','id'], name='employee_alive_dept_idx', condition=models.Q(is_deleted=False)),
+            models.Index(fields=['manager'], name='employee_alive_manager_idx', condition=models.Q(is_deleted=False)),
+        ]
 
     def __str__(self):
         return f"{self.name} ({self.department})"
@@ -41,7 +120,13 @@ class ReviewCycle(models.Model):
     end_date = models.DateField()
     status = models.CharField(max_length=10, choices=(('active','active'),('closed','closed')), default='active')
 
-class Review(models.Model):
+    class Meta:
+        # latest-cycle lookups (order_by('-start_date')) for trends, profiles and summaries. It does not
+        # serve the review listing keyset: that filters Review by employee and sorts the employee's
+        # (few) rows by the joined start_date
+        indexes = [models.Index(fields=['start_date','id'])]
+
+class Review(SoftDeleteModel, AuditedModel):
     REVIEW_TYPE_CHOICES = (('self','self'),('manager','manager'),('peer','peer'))
     STATUS_CHOICES = (('draft','draft'),('submitted','submitted'))
 
@@ -55,14 +140,16 @@ class Review(models.Model):
     created_at = models.DateTimeField(auto_now_add=True, null=True,)
     updated_at = models.DateTimeField(auto_now=True, null=True,)
 
-    class Meta:
+    class Meta(SoftDeleteModel.Meta):
         unique_together = ('employee','reviewer','cycle','review_type')
+        # (cycle) serves rollup rebuilds over every row; live rows are read per employee or per cycle
         indexes = [
-            models.Index(fields=['employee','cycle']),
             models.Index(fields=['cycle']),
+            models.Index(fields=['employee','cycle'], name='review_alive_emp_cycle_idx', condition=models.Q(is_deleted=False)),
+            models.Index(fields=['cycle','employee'], name='review_alive_cycle_emp_idx', condition=models.Q(is_deleted=False)),
         ]
 
-class Score(models.Model):
+class Score(AuditedModel):
     CRITERIA_CHOICES = (('technical','technical'),('communication','communication'),('leadership','leadership'),('goals','goals'))
     review = models.ForeignKey(Review, related_name='scores', on_delete=models.CASCADE)
     criteria = models.CharField(max_length=20, choices=CRITERIA_CHOICES)
@@ -74,7 +161,7 @@ class Score(models.Model):
     class Meta:
         indexes = [models.Index(fields=['review'])]
 
-class Goal(models.Model):
+class Goal(SoftDeleteModel, AuditedModel):
     STATUS_CHOICES = (('not_started','not_started'),('in_progress','in_progress'),('completed','completed'))
     employee = models.ForeignKey(Employee, related_name='goals', on_delete=models.CASCADE)
     cycle = models.ForeignKey(ReviewCycle, related_name='goals', on_delete=models.CASCADE)
@@ -86,6 +173,36 @@ class Goal(models.Model):
     created_at = models.DateTimeField(auto_now_add=True, null=True,)
     updated_at = models.DateTimeField(auto_now=True, null=True,)
 
+    class Meta(SoftDeleteModel.Meta):
+        # employee goal listings: newest first, keyset paginated on (created_at, id)
+        # per-cycle goal achievement: grouped by employee within a cycle
+        indexes = [
+            models.Index(fields=['employee','created_at','id'], name='goal_alive_emp_created_idx', condition=models.Q(is_deleted=False)),
+            models.Index(fields=['cycle','employee'], name='goal_alive_cycle_emp_idx', condition=models.Q(is_deleted=False)),
+        ]
+
+class ReviewScoreRollup(models.Model):
+    """Materialized sum/count/average of a review's Score rows, maintained by performance.rollups."""
+    review = models.OneToOneField(Review, primary_key=True, related_name='score_rollup', on_delete=models.CASCADE)
+    score_sum = models.IntegerField(default=0)
+    score_count = models.IntegerField(default=0)
+    avg_score = models.FloatField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+class EmployeeCycleScore(models.Model):
+    """Materialized component and final scores per (employee, cycle), maintained by performance.rollups."""
+    employee = models.ForeignKey(Employee, related_name='cycle_scores', on_delete=models.CASCADE)
+    cycle = models.ForeignKey(ReviewCycle, related_name='employee_scores', on_delete=models.CASCADE)
+    manager_score = models.FloatField(null=True, blank=True)
+    self_score = models.FloatField(null=True, blank=True)
+    peer_score = models.FloatField(null=True, blank=True)
+    final_score = models.FloatField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('employee','cycle')
+        indexes = [models.Index(fields=['cycle','employee'])]
+
 class User(models.Model):
     employee = models.ForeignKey(Employee, null=True, on_delete=models.CASCADE)
     username = models.CharField(max_length=150, unique=True)
@@ -94,6 +211,10 @@ class User(models.Model):
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True, null=True,)
 
+    # request.user for performance.authentication.AuthTokenAuthentication
+    is_authenticated = True
+    is_anonymous = False
+
     def set_password(self, raw_password):
         self.password_hash = make_password(raw_password)
 
@@ -104,4 +225,35 @@ class AuditLog(models.Model):
     target_id = models.IntegerField(null=True, blank=True)
     old_value = models.TextField(null=True, blank=True)
     new_value = models.TextField(null=True, blank=True)
-    created_at = models.DateTimeField(auto_now_add=True, null=True,)
+    # time of the change, not of the (batched) insert
+    created_at = models.DateTimeField(default=timezone.now, null=True)
+
+    class Meta:
+        # time-range scans (retention, archival, partitioning by month) and per-object history
+        indexes = [
+            models.Index(fields=['created_at']),
+            models.Index(fields=['target_table','target_id','created_at']),
+        ]
+
+class ImportJob(models.Model):
+    """Background review bulk import (see performance.jobs); the uploaded body lives at upload_path until done."""
+    STATUS_CHOICES = (('queued','queued'),('running','running'),('completed','completed'),('failed','failed'))
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    upload_path = models.CharField(max_length=500)
+    content_type = models.CharField(max_length=100)
+    batch_size = models.IntegerField(null=True, blank=True)
+    processed = models.IntegerField(default=0)
+    created_count = models.IntegerField(default=0)
+    error_count = models.IntegerField(default=0)
+    errors = models.JSONField(default=list)
+    created_ids = models.JSONField(default=list)
+    detail = models.TextField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    # heartbeat: set by the worker on every status / progress update (see performance.jobs.recover_stale_jobs)
+    updated_at = models.DateTimeField(null=True, blank=True)
+
+# register models kept in separate modules
+from .auth_models import AuthToken  # noqa: E402,F401
@@ -1,7 +1,55 @@
 import math
+from itertools import chain
 from statistics import mean, stdev
+import numpy as np
 
-def analyze_company_performance(input_json):
+# consistency constant so MAD estimates the standard deviation for normal data
+MAD_SCALE = 1.4826
+
+def _grouped_median(inverse, values, counts):
+    # median per group: sort by (group, value) once, then pick the middle element(s) of each run
+    order = np.lexsort((values, inverse))
+    ordered = values[order]
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    lo = starts + (counts - 1) // 2
+    hi = starts + counts // 2
+    return (ordered[lo] + ordered[hi]) / 2.0
+
+def grouped_outliers(groups, values, threshold=1.5, method='zscore'):
+    """
+    Vectorized per-group outlier detection.
+    groups: array of group labels (e.g. departments), values: array of scores (same length).
+    method='zscore' uses group mean / sample standard deviation (same as statistics.stdev),
+    method='mad' uses group median / scaled median absolute deviation.
+    Returns (labels, inverse, center, spread, z, mask) where center/spread are per group,
+    z is per value (nan where the group spread is 0) and mask flags |z| > threshold.
+    """
+    values = np.asarray(values, dtype=float)
+    labels, inverse = np.unique(np.asarray(groups), return_inverse=True)
+    counts = np.bincount(inverse, minlength=len(labels))
+
+    if method == 'zscore':
+        center = np.bincount(inverse, weights=values, minlength=len(labels)) / counts
+        dev = values - center[inverse]
+        ss = np.bincount(inverse, weights=dev * dev, minlength=len(labels))
+        spread = np.zeros(len(labels))
+        multi = counts > 1
+        spread[multi] = np.sqrt(ss[multi] / (counts[multi] - 1))
+    elif method == 'mad':
+        center = _grouped_median(inverse, values, counts)
+        spread = MAD_SCALE * _grouped_median(inverse, np.abs(values - center[inverse]), counts)
+    else:
+        raise ValueError(f"unknown outlier method: {method}")
+
+    group_spread = spread[inverse]
+    z = np.full(len(values), np.nan)
+    nonzero = group_spread > 0
+    z[nonzero] = (values[nonzero] - center[inverse][nonzero]) / group_spread[nonzero]
+    mask = np.abs(np.nan_to_num(z)) > threshold
+    return labels, inverse, center, spread, z, mask
+
+def analyze_company_performance_loop(input_json):
+    """Reference per-employee implementation of analyze_company_performance (kept for tests and benchmarks)."""
     employees = input_json.get('employees', [])
     dept_avgs = input_json.get('department_averages', {})
 
@@ -67,3 +115,120 @@ def analyze_company_performance(input_json):
         'at_risk': at_risk,
         'recommendations': recommendations
     }
+
+def _last_quarters(employees):
+    # right-aligned last three quarterly scores (NaN padded) and the number of quarters per employee
+    scores = [emp.get('quarterly_scores') or () for emp in employees]
+    lengths = np.fromiter(map(len, scores), dtype=np.int64, count=len(scores))
+    kept = np.minimum(lengths, 3)
+    flat = np.fromiter(chain.from_iterable(q[-3:] for q in scores), dtype=float, count=int(kept.sum()))
+    rows = np.repeat(np.arange(len(scores)), kept)
+    starts = np.cumsum(kept) - kept
+    last3 = np.full((len(scores), 3), np.nan)
+    last3[rows, 3 - kept[rows] + np.arange(len(flat)) - starts[rows]] = flat
+    return lengths, last3
+
+def _department_matrix(labels, dept_avgs):
+    # one NaN padded row of quarterly averages per department label, plus its length and first zero position
+    width = max([len(dept_avgs.get(d) or []) for d in labels] + [1])
+    averages = np.full((len(labels), width), np.nan)
+    lengths = np.zeros(len(labels), dtype=np.int64)
+    first_zero = np.full(len(labels), np.iinfo(np.int64).max)
+    for g, dept in enumerate(labels):
+        values = dept_avgs.get(dept) or []
+        lengths[g] = len(values)
+        averages[g, :len(values)] = values
+        zeros = np.flatnonzero(averages[g, :len(values)] == 0)
+        if zeros.size:
+            first_zero[g] = zeros[0]
+    return averages, lengths, first_zero
+
+def analyze_company_performance(input_json):
+    """
+    Flag consistent high performers and at-risk employees for the whole company at once.
+    Same rules and output as analyze_company_performance_loop, evaluated on NumPy arrays:
+    only each employee's last three quarters matter, so they are loaded right-aligned into an
+    (n, 3) array and compared with the (department, quarter) matrix of department averages.
+    """
+    employees = input_json.get('employees', [])
+    dept_avgs = input_json.get('department_averages', {})
+    result = {'high_performers': [], 'at_risk': [], 'recommendations': []}
+    if not employees:
+        return result
+
+    ids = [emp['employee_id'] for emp in employees]
+    codes = {}
+    inverse = np.fromiter((codes.setdefault(emp['department'], len(codes)) for emp in employees), dtype=np.int64, count=len(employees))
+    lengths, last3 = _last_quarters(employees)
+    averages, dept_lengths, first_zero = _department_matrix(list(codes), dept_avgs)
+
+    # 1) consistent high performer: each of the last (up to) 3 quarters >= 10% above the department average
+    eligible = (lengths > 0) & (dept_lengths[inverse] > 0) & (dept_lengths[inverse] >= lengths)
+    if np.any(eligible & (first_zero[inverse] < lengths)):
+        raise ZeroDivisionError('float division by zero')
+    positions = lengths[:, None] - 3 + np.arange(3)
+    present = positions >= 0
+    dept_values = averages[inverse[:, None], np.clip(positions, 0, averages.shape[1] - 1)]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        diffs = (last3 - dept_values) / dept_values
+    high = eligible & np.all(~present | (diffs >= 0.1), axis=1)
+
+    # 2) at risk: >= 15% below the previous two-quarter average, or >= 20% drop with only two quarters
+    with np.errstate(divide='ignore', invalid='ignore'):
+        prev_avg = (last3[:, 0] + last3[:, 1]) / 2
+        decline3 = (prev_avg - last3[:, 2]) / prev_avg
+        decline2 = (last3[:, 1] - last3[:, 2]) / last3[:, 1]
+    risk3 = (lengths >= 3) & (prev_avg != 0) & (decline3 >= 0.15)
+    risk2 = (lengths == 2) & (last3[:, 1] != 0) & (decline2 >= 0.2)
+
+    for i in np.flatnonzero(high):
+        result['high_performers'].append({
+            'employee_id': ids[i],
+            'reason': f'Consistently >=10% above department average (last {min(3, int(lengths[i]))} quarters)',
+            'confidence': 0.85
+        })
+    for i in np.flatnonzero(risk3 | risk2):
+        if risk3[i]:
+            reason = f'{round(float(decline3[i]) * 100, 1)}% performance decline vs previous two-quarter avg'
+            confidence, action, priority = 0.92, 'Schedule performance improvement plan meeting', 'high'
+        else:
+            reason = f'{round(float(decline2[i]) * 100, 1)}% performance decline over last 1 quarter'
+            confidence, action, priority = 0.85, 'Manager check-in & coaching', 'medium'
+        result['at_risk'].append({'employee_id': ids[i], 'reason': reason, 'confidence': confidence})
+        result['recommendations'].append({'employee_id': ids[i], 'action': action, 'priority': priority})
+    return result
+
+STREAM_BATCH_SIZE = 10000
+
+EVENT_TYPES = (('high_performers', 'high_performer'), ('at_risk', 'at_risk'), ('recommendations', 'recommendation'))
+
+def iter_company_performance(records, department_averages=None, batch_size=STREAM_BATCH_SIZE):
+    """
+    Streaming analyze_company_performance over any iterable of employee records (e.g. NDJSON lines).
+    Records are evaluated in batches of batch_size with the vectorized rules, so memory does not
+    depend on the input size. A record with a 'department_averages' key (such as a header line)
+    updates the averages used for the records after it.
+    Yields {'type': 'high_performer' | 'at_risk' | 'recommendation', **entry}; per batch, all
+    high_performer events come first, then at_risk, then recommendation, each in input order.
+    """
+    dept_avgs = dict(department_averages or {})
+    batch = []
+    for record in records:
+        if 'department_averages' in record:
+            yield from _batch_events(batch, dept_avgs)
+            batch = []
+            dept_avgs.update(record['department_averages'])
+            continue
+        batch.append(record)
+        if len(batch) >= batch_size:
+            yield from _batch_events(batch, dept_avgs)
+            batch = []
+    yield from _batch_events(batch, dept_avgs)
+
+def _batch_events(batch, dept_avgs):
+    if not batch:
+        return
+    result = analyze_company_performance({'employees': batch, 'department_averages': dept_avgs})
+    for key, event in EVENT_TYPES:
+        for entry in result[key]:
+            yield {'type': event, **entry}
@@ -0,0 +1,110 @@
+import base64
+import json
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import F, Q
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor (keyset) pagination over an arbitrary ordering, e.g. ('-cycle__start_date', '-id').
+    The last field must be unique so every row has a distinct position. Fields may span relations
+    and may be nullable (nulls sort last). Pages are fetched with a WHERE on the ordering columns,
+    so cost does not grow with the page number.
+    Pagination is opt-in: views paginate only when ?cursor or ?page_size is present.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+
+    def __init__(self, ordering):
+        self.ordering = ordering
+        self.fields = [f.lstrip('-') for f in ordering]
+        self.descending = [f.startswith('-') for f in ordering]
+
+    @classmethod
+    def is_requested(cls, request):
+        return cls.cursor_query_param in request.query_params or cls.page_size_query_param in request.query_params
+
+    def get_page_size(self, request):
+        default = getattr(settings, 'PERFORMANCE_PAGE_SIZE', 50)
+        maximum = getattr(settings, 'PERFORMANCE_MAX_PAGE_SIZE', 500)
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, default))
+        except ValueError:
+            raise ValidationError({'page_size': 'must be an integer'})
+        return max(1, min(size, maximum))
+
+    def _order_by(self):
+        order = []
+        for field, desc in zip(self.fields, self.descending):
+            order.append(F(field).desc(nulls_last=True) if desc else F(field).asc(nulls_last=True))
+        return order
+
+    def _after(self, values):
+        # rows strictly after the cursor position: for each prefix of equal columns, the next column moves past it
+        condition = Q()
+        equal = Q()
+        for field, desc, value in zip(self.fields, self.descending, values):
+            if value is None:
+                # nulls sort last: only rows that are also null on this column can follow
+                step = Q(pk__in=[])
+                eq = Q(**{f'{field}__isnull': True})
+            else:
+                step = Q(**{f'{field}__lt' if desc else f'{field}__gt': value}) | Q(**{f'{field}__isnull': True})
+                eq = Q(**{field: value})
+            condition |= equal & step
+            equal &= eq
+        return condition
+
+    def encode_cursor(self, values):
+        raw = json.dumps([v.isoformat() if hasattr(v, 'isoformat') else v for v in values])
+        return base64.urlsafe_b64encode(raw.encode()).decode()
+
+    def _model_field(self, model, path):
+        *relations, name = path.split('__')
+        for relation in relations:
+            model = model._meta.get_field(relation).related_model
+        return model._meta.get_field(name)
+
+    def decode_cursor(self, cursor, model=None):
+        """Cursor -> ordering values; with model, each value is checked / converted by its model field."""
+        try:
+            values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        except (ValueError, TypeError):
+            raise ValidationError({'cursor': 'invalid cursor'})
+        if not isinstance(values, list) or len(values) != len(self.fields):
+            raise ValidationError({'cursor': 'invalid cursor'})
+        if model is None:
+            return values
+        try:
+            return [None if v is None else self._model_field(model, f).to_python(v) for f, v in zip(self.fields, values)]
+        except (DjangoValidationError, TypeError, ValueError):
+            raise ValidationError({'cursor': 'invalid cursor'})
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+        annotations = {f'_keyset_{i}': F(field) for i, field in enumerate(self.fields)}
+        queryset = queryset.annotate(**annotations).order_by(*self._order_by())
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            queryset = queryset.filter(self._after(self.decode_cursor(cursor, queryset.model)))
+
+        page = list(queryset[:page_size + 1])
+        self.next_cursor = None
+        if len(page) > page_size:
+            page = page[:page_size]
+            last = page[-1]
+            self.next_cursor = self.encode_cursor([getattr(last, name) for name in annotations])
+        return page
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.get_next_link(), 'results': data})
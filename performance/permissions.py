@@ -0,0 +1,8 @@
+from rest_framework.permissions import BasePermission
+
+class IsHR(BasePermission):
+    """HR users (User.role == 'hr') and Django staff sessions."""
+
+    def has_permission(self, request, view):
+        user = request.user
+        return bool(user and user.is_authenticated and (getattr(user, 'role', None) == 'hr' or getattr(user, 'is_staff', False)))
@@ -0,0 +1,219 @@
+import bisect
+import contextlib
+import contextvars
+import heapq
+import logging
+import threading
+import time
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from rest_framework.renderers import JSONRenderer
+
+# Per-request query / latency profiling.
+# Every database connection gets an execute wrapper that reports to the RequestProfile of the
+# request being served (a context variable, so queries run on sync_to_async threads are counted
+# too). performance.middleware.QueryProfilingMiddleware opens a profile per request and, when it
+# finishes, checks the view's @query_budget and folds the numbers into per-view histograms that
+# are served by /internal/metrics.
+# Only statements that touch data count as queries: transaction control (BEGIN / COMMIT /
+# SAVEPOINT ...) differs between a TestCase, where atomic blocks become savepoints, and
+# production, so it only adds to db_time and budgets mean the same thing in both.
+
+logger = logging.getLogger(__name__)
+
+# histogram bucket upper bounds; the last bucket is open ended
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+QUERY_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100)
+
+TRANSACTION_STATEMENTS = ('BEGIN', 'COMMIT', 'ROLLBACK', 'SAVEPOINT', 'RELEASE', 'START TRANSACTION', 'END')
+
+_current = contextvars.ContextVar('performance_request_profile', default=None)
+_listeners = []
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+def _config():
+    config = {'ENABLED': True, 'SLOWEST': 5, 'RAISE_ON_BUDGET': False}
+    config.update(getattr(settings, 'PERFORMANCE_PROFILING', {}))
+    return config
+
+def query_budget(max_queries):
+    """
+    Declare the most SQL queries a view may run per request (transaction control statements
+    excluded). Place it above @api_view.
+    Exceeding it logs a warning, and raises QueryBudgetExceeded when
+    PERFORMANCE_PROFILING['RAISE_ON_BUDGET'] is set (tests).
+    """
+    def decorator(view):
+        view.query_budget = max_queries
+        return view
+    return decorator
+
+def _is_transaction_control(sql):
+    return sql.lstrip()[:20].upper().startswith(TRANSACTION_STATEMENTS)
+
+class RequestProfile:
+    def __init__(self, slowest=5):
+        self._lock = threading.Lock()
+        self._slowest = slowest
+        self.view = None
+        self.budget = None
+        self.queries = 0
+        self.db_time = 0.0
+        self.render_time = 0.0
+        self.total_time = 0.0
+        self.slowest_queries = []  # min-heap of (seconds, sql)
+        self.started = time.perf_counter()
+
+    def add_query(self, sql, seconds):
+        with self._lock:
+            self.db_time += seconds
+            if _is_transaction_control(sql):
+                return
+            self.queries += 1
+            entry = (seconds, sql[:500])
+            if len(self.slowest_queries) < self._slowest:
+                heapq.heappush(self.slowest_queries, entry)
+            elif entry > self.slowest_queries[0]:
+                heapq.heapreplace(self.slowest_queries, entry)
+
+    def add_render(self, seconds):
+        with self._lock:
+            self.render_time += seconds
+
+    @property
+    def over_budget(self):
+        return self.budget is not None and self.queries > self.budget
+
+    def as_dict(self):
+        return {
+            'view': self.view,
+            'queries': self.queries,
+            'query_budget': self.budget,
+            'db_ms': round(self.db_time * 1000, 2),
+            'render_ms': round(self.render_time * 1000, 2),
+            'total_ms': round(self.total_time * 1000, 2),
+            'slowest': [{'ms': round(s * 1000, 2), 'sql': sql} for s, sql in sorted(self.slowest_queries, reverse=True)],
+        }
+
+def _record_query(execute, sql, params, many, context):
+    profile = _current.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        profile.add_query(sql, time.perf_counter() - start)
+
+@receiver(connection_created)
+def _install_wrapper(sender, connection, **kwargs):
+    # execute_wrappers survives reconnects, connection_created does not
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+def start_profile():
+    profile = RequestProfile(slowest=_config()['SLOWEST'])
+    return profile, _current.set(profile)
+
+def finish_profile(profile, token, view_name, budget):
+    _current.reset(token)
+    profile.total_time = time.perf_counter() - profile.started
+    profile.view = view_name
+    profile.budget = budget
+    if view_name is not None:
+        metrics.observe(profile)
+    for listener in list(_listeners):
+        listener(profile)
+    if profile.over_budget:
+        message = f'{view_name} ran {profile.queries} queries (budget {budget})'
+        logger.warning(message, extra={'profile': profile.as_dict()})
+        if _config()['RAISE_ON_BUDGET']:
+            raise QueryBudgetExceeded(message)
+
+@contextlib.contextmanager
+def profile_requests():
+    """Collect the RequestProfile of every request finished inside the block (test helper)."""
+    profiles = []
+    _listeners.append(profiles.append)
+    try:
+        yield profiles
+    finally:
+        _listeners.remove(profiles.append)
+
+class ProfiledJSONRenderer(JSONRenderer):
+    """JSONRenderer that reports its time as the request's render (serialization) time."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        start = time.perf_counter()
+        try:
+            return super().render(data, accepted_media_type, renderer_context)
+        finally:
+            profile = _current.get()
+            if profile is not None:
+                profile.add_render(time.perf_counter() - start)
+
+class _Histogram:
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0.0
+        self.max = 0
+
+    def add(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def as_dict(self, n):
+        labels = [f'<={b}' for b in self.bounds] + [f'>{self.bounds[-1]}']
+        return {'buckets': dict(zip(labels, self.counts)), 'mean': round(self.total / n, 2) if n else None, 'max': round(self.max, 2)}
+
+class ViewMetrics:
+    """In-process per-view aggregates of the request profiles."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._views = {}
+
+    def observe(self, profile):
+        with self._lock:
+            view = self._views.get(profile.view)
+            if view is None:
+                view = self._views[profile.view] = {
+                    'requests': 0, 'over_budget': 0, 'budget': None, 'slowest': [],
+                    'latency_ms': _Histogram(LATENCY_BUCKETS_MS), 'db_ms': _Histogram(LATENCY_BUCKETS_MS),
+                    'render_ms': _Histogram(LATENCY_BUCKETS_MS), 'queries': _Histogram(QUERY_BUCKETS),
+                }
+            view['requests'] += 1
+            view['budget'] = profile.budget
+            view['over_budget'] += profile.over_budget
+            view['latency_ms'].add(profile.total_time * 1000)
+            view['db_ms'].add(profile.db_time * 1000)
+            view['render_ms'].add(profile.render_time * 1000)
+            view['queries'].add(profile.queries)
+            view['slowest'] = heapq.nlargest(5, view['slowest'] + profile.slowest_queries)
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                name: {
+                    'requests': v['requests'],
+                    'query_budget': v['budget'],
+                    'over_budget': v['over_budget'],
+                    'queries': v['queries'].as_dict(v['requests']),
+                    'latency_ms': v['latency_ms'].as_dict(v['requests']),
+                    'db_ms': v['db_ms'].as_dict(v['requests']),
+                    'render_ms': v['render_ms'].as_dict(v['requests']),
+                    'slowest': [{'ms': round(s * 1000, 2), 'sql': sql} for s, sql in v['slowest']],
+                }
+                for name, v in sorted(self._views.items())
+            }
+
+metrics = ViewMetrics()
@@ -0,0 +1,126 @@
+from collections import defaultdict
+from django.db.models import Sum, Count
+from django.dispatch import receiver
+from .models import Employee, Review, ReviewCycle, Score, ReviewScoreRollup, EmployeeCycleScore, soft_deleted
+from .services import calculate_component_scores, _weighted_final_score
+
+# Materialized score rollups.
+# ReviewScoreRollup keeps one row per review (sum/count/avg of its scores) and
+# EmployeeCycleScore one row per (employee, cycle) with the component and final scores.
+# Both are refreshed incrementally from the write paths (ReviewSerializer.create,
+# submit_review, soft deletes) and can be rebuilt with `manage.py rebuild_score_rollups`.
+# With PERFORMANCE_READ_ROLLUPS the score services read them: EmployeeCycleScore for final
+# scores, ReviewScoreRollup for the per-review sums behind the component scores (which is
+# also how EmployeeCycleScore rows are refreshed, so review rollups are written first).
+
+BATCH_SIZE = 1000
+
+def refresh_review_rollups(review_ids):
+    """Recompute ReviewScoreRollup rows for the given reviews with one aggregate query."""
+    review_ids = list(review_ids)
+    if not review_ids:
+        return
+    totals = {
+        row['review_id']: row
+        for row in Score.objects.filter(review_id__in=review_ids).values('review_id').annotate(total=Sum('score'), n=Count('id'))
+    }
+    rollups = []
+    for rid in review_ids:
+        row = totals.get(rid)
+        total = row['total'] if row else 0
+        n = row['n'] if row else 0
+        rollups.append(ReviewScoreRollup(review_id=rid, score_sum=total, score_count=n, avg_score=(total / n if n else None)))
+    ReviewScoreRollup.objects.bulk_create(
+        rollups, batch_size=BATCH_SIZE, update_conflicts=True, unique_fields=['review'], update_fields=['score_sum', 'score_count', 'avg_score', 'updated_at']
+    )
+
+def _write_employee_scores(cycle_id, components, employee_ids=None):
+    # upsert computed rows, drop rows for employees (of this batch) that no longer have a final score
+    rows = []
+    for eid, c in components.items():
+        final = _weighted_final_score(c['manager'], c['self'], c['peer'])
+        if final is None:
+            continue
+        rows.append(EmployeeCycleScore(
+            employee_id=eid, cycle_id=cycle_id, manager_score=c['manager'],
+            self_score=c['self'], peer_score=c['peer'], final_score=final,
+        ))
+    stale = EmployeeCycleScore.objects.filter(cycle_id=cycle_id)
+    if employee_ids is not None:
+        stale = stale.filter(employee_id__in=employee_ids).exclude(employee_id__in=[r.employee_id for r in rows])
+    stale.delete()
+    EmployeeCycleScore.objects.bulk_create(
+        rows, batch_size=BATCH_SIZE, update_conflicts=True, unique_fields=['employee', 'cycle'],
+        update_fields=['manager_score', 'self_score', 'peer_score', 'final_score', 'updated_at'],
+    )
+    return len(rows)
+
+def refresh_employee_scores(pairs):
+    """
+    Recompute EmployeeCycleScore rows for the given (employee_id, cycle_id) pairs.
+    One aggregate query per distinct cycle; pairs that no longer have a final score are removed.
+    """
+    by_cycle = defaultdict(set)
+    for employee_id, cycle_id in pairs:
+        by_cycle[cycle_id].add(employee_id)
+
+    for cycle_id, employee_ids in by_cycle.items():
+        _write_employee_scores(cycle_id, calculate_component_scores(cycle_id, employee_ids), employee_ids)
+
+def refresh_for_reviews(review_ids):
+    """Refresh both rollup tables after reviews (or their scores) were written."""
+    review_ids = list(review_ids)
+    refresh_review_rollups(review_ids)
+    pairs = Review.all_objects.filter(id__in=review_ids).values_list('employee_id', 'cycle_id').distinct()
+    refresh_employee_scores(pairs)
+
+def rebuild_rollups(cycle_id=None):
+    """Recompute rollups from raw Score rows, cycle by cycle. Returns (reviews, employee_cycles) written."""
+    if cycle_id is None:
+        cycle_ids = list(ReviewCycle.objects.values_list('id', flat=True))
+        EmployeeCycleScore.objects.exclude(cycle_id__in=cycle_ids).delete()
+    else:
+        cycle_ids = [cycle_id]
+    n_reviews = n_scores = 0
+    for cid in cycle_ids:
+        review_ids = list(Review.all_objects.filter(cycle_id=cid).values_list('id', flat=True))
+        for i in range(0, len(review_ids), BATCH_SIZE):
+            refresh_review_rollups(review_ids[i:i + BATCH_SIZE])
+        n_reviews += len(review_ids)
+        n_scores += _write_employee_scores(cid, calculate_component_scores(cid))
+    return n_reviews, n_scores
+
+def verify_rollups(cycle_id=None):
+    """
+    Compare stored EmployeeCycleScore rows with a fresh computation.
+    Returns list of mismatches as dicts {employee_id, cycle_id, stored, expected}.
+    """
+    stored = EmployeeCycleScore.objects.all()
+    cycle_ids = ReviewCycle.objects.values_list('id', flat=True)
+    if cycle_id is not None:
+        stored = stored.filter(cycle_id=cycle_id)
+        cycle_ids = [cycle_id]
+    stored_map = {(r.employee_id, r.cycle_id): r.final_score for r in stored}
+    mismatches = []
+    seen = set()
+    for cid in cycle_ids:
+        # from raw Score rows, not from ReviewScoreRollup
+        for eid, c in calculate_component_scores(cid, read_rollups=False).items():
+            expected = _weighted_final_score(c['manager'], c['self'], c['peer'])
+            if expected is None:
+                continue
+            seen.add((eid, cid))
+            if stored_map.get((eid, cid)) != expected:
+                mismatches.append({'employee_id': eid, 'cycle_id': cid, 'stored': stored_map.get((eid, cid)), 'expected': expected})
+    for (eid, cid), final in stored_map.items():
+        if (eid, cid) not in seen:
+            mismatches.append({'employee_id': eid, 'cycle_id': cid, 'stored': final, 'expected': None})
+    return mismatches
+
+@receiver(soft_deleted, sender=Review)
+def _review_soft_deleted(sender, pks, **kwargs):
+    refresh_employee_scores(Review.all_objects.filter(id__in=pks).values_list('employee_id', 'cycle_id').distinct())
+
+@receiver(soft_deleted, sender=Employee)
+def _employee_soft_deleted(sender, pks, **kwargs):
+    EmployeeCycleScore.objects.filter(employee_id__in=pks).delete()
@@ -1,13 +1,69 @@
 from rest_framework import serializers
-from .models import Employee, Review, Score, Goal, ReviewCycle, User
+from .models import Employee, Review, Score, Goal, ReviewCycle, User, ImportJob
+from django.utils import timezone
+from .rollups import refresh_for_reviews
+
+class EagerLoadingMixin:
+    """
+    Serializers declare the relations they render; views call setup_eager_loading on their
+    querysets so nested fields are loaded with a fixed number of queries.
+    """
+    select_related_fields = ()
+    prefetch_related_fields = ()
+
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        if cls.select_related_fields:
+            queryset = queryset.select_related(*cls.select_related_fields)
+        if cls.prefetch_related_fields:
+            queryset = queryset.prefetch_related(*cls.prefetch_related_fields)
+        return queryset
+
+class FieldProjectionMixin:
+    """
+    Accepts fields=[...] (e.g. parsed from ?fields=id,status,cycle) and only renders those fields.
+    prefetch_related_fields whose serializer field is projected away are not loaded either.
+    """
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+    @classmethod
+    def parse_fields(cls, value):
+        """Split a ?fields= value; raises ValidationError for unknown names. None means all fields."""
+        if not value:
+            return None
+        fields = [f.strip() for f in value.split(',') if f.strip()]
+        unknown = set(fields) - set(cls.Meta.fields)
+        if unknown:
+            raise serializers.ValidationError({'fields': f"unknown fields: {', '.join(sorted(unknown))}"})
+        return fields
+
+    @classmethod
+    def setup_eager_loading(cls, queryset, fields=None):
+        if fields is None:
+            return super().setup_eager_loading(queryset)
+        opts = cls.Meta.model._meta
+        columns = [f for f in fields if opts.get_field(f).concrete]
+        queryset = queryset.only('pk', *columns)
+        select = [f for f in cls.select_related_fields if f in fields]
+        prefetch = [f for f in cls.prefetch_related_fields if f in fields]
+        if select:
+            queryset = queryset.select_related(*select)
+        if prefetch:
+            queryset = queryset.prefetch_related(*prefetch)
+        return queryset
 
 class ScoreSerializer(serializers.ModelSerializer):
     class Meta:
         model = Score
         fields = ['id','criteria','score','comments']
 
-class ReviewSerializer(serializers.ModelSerializer):
+class ReviewSerializer(FieldProjectionMixin, EagerLoadingMixin, serializers.ModelSerializer):
     scores = ScoreSerializer(many=True, required=False)
+    prefetch_related_fields = ('scores',)
     class Meta:
         model = Review
         fields = ['id','employee','reviewer','cycle','review_type','status','submitted_date','scores']
@@ -17,14 +73,41 @@ class ReviewSerializer(serializers.ModelSerializer):
         review = Review.objects.create(**validated_data)
         for s in scores_data:
             Score.objects.create(review=review, **s)
+        refresh_for_reviews([review.id])
         return review
 
+class ReviewImportSerializer(serializers.ModelSerializer):
+    """
+    Row validator for the streaming bulk import. FKs are plain ids and the unique_together
+    validator is dropped: performance.bulk_import resolves and de-duplicates them per chunk.
+    """
+    employee = serializers.IntegerField(source='employee_id')
+    reviewer = serializers.IntegerField(source='reviewer_id', required=False, allow_null=True)
+    cycle = serializers.IntegerField(source='cycle_id')
+    scores = ScoreSerializer(many=True, required=False)
+    class Meta:
+        model = Review
+        fields = ['employee','reviewer','cycle','review_type','status','submitted_date','scores']
+        validators = []
+
 class EmployeeSerializer(serializers.ModelSerializer):
     class Meta:
         model = Employee
         fields = ['id','name','email','department','manager','hire_date','role']
 
-class GoalSerializer(serializers.ModelSerializer):
+class GoalSerializer(FieldProjectionMixin, EagerLoadingMixin, serializers.ModelSerializer):
     class Meta:
         model = Goal
         fields = ['id','employee','cycle','description','target_date','status','progress']
+
+class ImportJobSerializer(serializers.ModelSerializer):
+    rows_per_sec = serializers.SerializerMethodField()
+    class Meta:
+        model = ImportJob
+        fields = ['id','status','processed','created_count','error_count','rows_per_sec','errors','created_ids','detail','created_at','started_at','finished_at']
+
+    def get_rows_per_sec(self, job):
+        if not job.started_at:
+            return None
+        elapsed = ((job.finished_at or timezone.now()) - job.started_at).total_seconds()
+        return round(job.processed / elapsed, 1) if elapsed > 0 else None
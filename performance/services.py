@@ -1,8 +1,14 @@
-from .models import Employee, Review, Score, ReviewCycle, Goal
-from django.db.models import Avg, Q
+from .models import Employee, Review, Score, ReviewCycle, Goal, EmployeeCycleScore, ReviewScoreRollup
+from django.conf import settings
+from django.db.models import Avg, F, Q, Sum, Count, Max, Value
+from django.db.models.functions import Least
 import math
 from statistics import mean, stdev
 from collections import defaultdict
+import numpy as np
+from .outlier_detector import grouped_outliers
+from .cache import cached
+from . import snapshots
 
 # helper to get average numeric score for a review
 def _avg_score_for_review(review):
@@ -12,6 +18,7 @@ def _avg_score_for_review(review):
     vals = [s.score for s in scores]
     return sum(vals)/len(vals)
 
+@cached('final_score', lambda employee_id, cycle_id: [('employee', employee_id)])
 def calculate_final_score(employee_id, cycle_id):
     """
     Calculate weighted final score for employee for given cycle_id.
@@ -21,7 +28,7 @@ def calculate_final_score(employee_id, cycle_id):
       - Peers: 20% (average of all peer reviews)
     Returns final numeric score (0-10) or None if insufficient data.
     """
-    employee = Employee.objects.filter(id=employee_id, is_deleted=False).first()
+    employee = Employee.objects.filter(id=employee_id).first()
     if not employee:
         return None
 
@@ -29,7 +36,7 @@ def calculate_final_score(employee_id, cycle_id):
     if not cycle:
         return None
 
-    reviews = Review.objects.filter(employee=employee, cycle=cycle, status='submitted', is_deleted=False)
+    reviews = Review.objects.filter(employee=employee, cycle=cycle, status='submitted')
     # manager
     manager_reviews = reviews.filter(review_type='manager')
     self_reviews = reviews.filter(review_type='self')
@@ -54,6 +61,13 @@ def calculate_final_score(employee_id, cycle_id):
         if peer_vals:
             peer_score = mean(peer_vals)
 
+    return _weighted_final_score(manager_score, self_score, peer_score)
+
+def _weighted_final_score(manager_score, self_score, peer_score):
+    """
+    Combine per-type component scores into the rounded final score.
+    Shared by calculate_final_score and calculate_final_scores so both apply the same weights.
+    """
     # require at least a manager review or self+peer to compute
     # business rule: manager review required for final score; if not present, compute best-effort
     if manager_score is None:
@@ -83,61 +97,177 @@ def calculate_final_score(employee_id, cycle_id):
     final = total / weight_sum
     return round(final, 2)
 
+def _read_rollups(read_rollups=None):
+    return getattr(settings, 'PERFORMANCE_READ_ROLLUPS', False) if read_rollups is None else read_rollups
+
+def _component_scores(cycle_ids, employee_ids=None, read_rollups=None):
+    # one query for all requested cycles -> {(cycle_id, employee_id): components}; the per-review
+    # sums come from ReviewScoreRollup with PERFORMANCE_READ_ROLLUPS, else from grouping Score rows
+    review_filter = dict(
+        review__cycle_id__in=cycle_ids,
+        review__status='submitted',
+        review__is_deleted=False,
+        review__employee__is_deleted=False,
+    )
+    if employee_ids is not None:
+        review_filter['review__employee_id__in'] = employee_ids
+    if _read_rollups(read_rollups):
+        rows = ReviewScoreRollup.objects.filter(score_count__gt=0, **review_filter).values(
+            'review__cycle_id', 'review__employee_id', 'review__review_type', 'review_id', total=F('score_sum'), n=F('score_count'),
+        ).order_by('review__cycle_id', 'review__employee_id', 'review_id')
+    else:
+        rows = Score.objects.filter(**review_filter).values('review__cycle_id', 'review__employee_id', 'review__review_type', 'review_id').annotate(
+            total=Sum('score'), n=Count('id')
+        ).order_by('review__cycle_id', 'review__employee_id', 'review_id')
+
+    # per-review averages grouped by (cycle, employee) and review type
+    per_type = defaultdict(lambda: defaultdict(list))
+    for row in rows:
+        key = (row['review__cycle_id'], row['review__employee_id'])
+        per_type[key][row['review__review_type']].append(row['total'] / row['n'])
+
+    components = {}
+    for key, by_type in per_type.items():
+        components[key] = {
+            rtype: (mean(by_type[rtype]) if by_type.get(rtype) else None)
+            for rtype in ('manager', 'self', 'peer')
+        }
+    return components
+
+def _id_list(employee_ids):
+    # snapshots need concrete ids; services also accept a values('id') queryset
+    if employee_ids is None or isinstance(employee_ids, (list, tuple, set)):
+        return employee_ids
+    return list(employee_ids.values_list('id', flat=True))
+
+def calculate_component_scores(cycle_id, employee_ids=None, read_rollups=None):
+    """
+    Batch version of the per-type averages used by calculate_final_score.
+    Runs a single aggregated query over Score for the whole cycle (optionally limited to employee_ids),
+    or reads the per-review ReviewScoreRollup sums when read_rollups (default:
+    settings.PERFORMANCE_READ_ROLLUPS) is on.
+    Returns {employee_id: {'manager': x, 'self': y, 'peer': z}} where missing types are None.
+    Closed cycles with a snapshot are answered from it.
+    """
+    snapshot = snapshots.load(cycle_id)
+    if snapshot is not None:
+        return snapshot.component_scores(_id_list(employee_ids))
+    return {eid: c for (_, eid), c in _component_scores([cycle_id], employee_ids, read_rollups).items()}
+
+def calculate_final_scores_for_cycles(cycle_ids, employee_ids=None):
+    """
+    Final scores for several cycles in one query.
+    Returns {cycle_id: {employee_id: final_score}}; cycles without data map to {}.
+    Reads the EmployeeCycleScore rollups when settings.PERFORMANCE_READ_ROLLUPS is on.
+    Cycles with a snapshot (closed cycles) are read from it instead.
+    """
+    finals = {cid: {} for cid in cycle_ids}
+    live = []
+    for cid in cycle_ids:
+        snapshot = snapshots.load(cid)
+        if snapshot is None:
+            live.append(cid)
+        else:
+            employee_ids = _id_list(employee_ids)
+            finals[cid] = snapshot.final_scores(employee_ids)
+    if not live:
+        return finals
+    cycle_ids = live
+
+    if getattr(settings, 'PERFORMANCE_READ_ROLLUPS', False):
+        rows = EmployeeCycleScore.objects.filter(cycle_id__in=cycle_ids, employee__is_deleted=False)
+        if employee_ids is not None:
+            rows = rows.filter(employee_id__in=employee_ids)
+        for cid, eid, final in rows.values_list('cycle_id', 'employee_id', 'final_score'):
+            finals[cid][eid] = final
+        return finals
+
+    for (cid, eid), c in _component_scores(cycle_ids, employee_ids).items():
+        final = _weighted_final_score(c['manager'], c['self'], c['peer'])
+        if final is not None:
+            finals[cid][eid] = final
+    return finals
+
+def calculate_final_scores(cycle_id, employee_ids=None):
+    """
+    Calculate weighted final scores for every employee in a cycle at once.
+    Same weights and rounding as calculate_final_score; employees without data are omitted.
+    Returns {employee_id: final_score}.
+    When settings.PERFORMANCE_READ_ROLLUPS is on, reads the materialized EmployeeCycleScore rows instead.
+    """
+    return calculate_final_scores_for_cycles([cycle_id], employee_ids)[cycle_id]
+
+@cached('trends', lambda employee_ids, num_cycles=3: [('employee', eid) for eid in employee_ids])
+def get_performance_trends(employee_ids, num_cycles=3):
+    """
+    Trends for several employees over the last num_cycles cycles in a constant number of queries.
+    Returns {employee_id: [{'cycle': name, 'final_score': x}, ...]} ordered oldest->newest.
+    """
+    cycles = list(ReviewCycle.objects.order_by('-start_date')[:num_cycles])[::-1]  # oldest to newest
+    finals = calculate_final_scores_for_cycles([c.id for c in cycles], employee_ids)
+    return {
+        eid: [{'cycle': c.name, 'final_score': finals[c.id].get(eid)} for c in cycles]
+        for eid in employee_ids
+    }
+
+@cached('trend', lambda employee_id, num_cycles=3: [('employee', employee_id)])
 def get_performance_trend(employee_id, num_cycles=3):
     """
     Return list of last num_cycles final scores for employee ordered oldest->newest.
     """
-    cycles = ReviewCycle.objects.order_by('-start_date')[:num_cycles]
-    trend = []
-    cycles = list(cycles)[::-1]  # oldest to newest
-    for cycle in cycles:
-        final = calculate_final_score(employee_id, cycle.id)
-        trend.append({'cycle': cycle.name, 'final_score': final})
-    return trend
+    return get_performance_trends([employee_id], num_cycles)[employee_id]
 
-def identify_outliers(department):
+@cached('outliers', lambda department, *args, **kwargs: [('department', department), ('roster',)])
+def identify_outliers(department, threshold=1.5, method='zscore'):
     """
     Find performance outliers in department.
-    Definition: an employee whose most recent final score differs from department average by >1.5 stddev.
+    Definition: an employee whose most recent final score differs from department average by >threshold (1.5) stddev.
     Returns list of dict {employee_id, name, final_score, dept_avg, dept_std, zscore}
     """
+    return identify_company_outliers(departments=[department], threshold=threshold, method=method).get(department, [])
 
-    latest_cycle = ReviewCycle.objects.order_by('-start_date').first()
-    if not latest_cycle:
-        return []
-
-    employees = Employee.objects.filter(department=department, is_deleted=False)
-    final_scores = []
-    emp_map = {}
-    for e in employees:
-        s = calculate_final_score(e.id, latest_cycle.id)
-        if s is not None:
-            final_scores.append(s)
-            emp_map[e.id] = {'employee': e, 'score': s}
-
-    if not final_scores:
-        return []
-
-    avg = mean(final_scores)
-    std = stdev(final_scores) if len(final_scores) > 1 else 0.0
-    threshold = 1.5 * std
-    outliers = []
-    for eid, info in emp_map.items():
-        score = info['score']
-        if std == 0:
-            continue
-        z = (score - avg) / std
-        if abs(z) > 1.5:
-            outliers.append({
-                'employee_id': eid,
-                'name': info['employee'].name,
-                'final_score': score,
-                'department_avg': round(avg,2),
-                'department_std': round(std,2),
-                'zscore': round(z,2)
-            })
-    return outliers
+@cached('company_outliers', lambda *args, **kwargs: [('company',), ('roster',)])
+def identify_company_outliers(departments=None, threshold=1.5, method='zscore', cycle_id=None):
+    """
+    Outliers for every department at once, computed with grouped NumPy operations.
+    Uses the latest cycle unless cycle_id is given. method is 'zscore' (mean/stdev) or 'mad'
+    (median / scaled MAD; department_avg and department_std then hold the median and scaled MAD).
+    Returns {department: [outlier dicts as in identify_outliers]}.
+    """
+    if cycle_id is None:
+        latest_cycle = ReviewCycle.objects.order_by('-start_date').first()
+        if not latest_cycle:
+            return {}
+        cycle_id = latest_cycle.id
 
+    employees = Employee.objects.all()
+    if departments is not None:
+        employees = employees.filter(department__in=departments)
+    employees = list(employees.order_by('id').values_list('id', 'name', 'department'))
+    scores = calculate_final_scores(cycle_id, None if departments is None else [e[0] for e in employees])
+    employees = [e for e in employees if e[0] in scores]
+    if not employees:
+        return {}
+
+    final = np.array([scores[e[0]] for e in employees], dtype=float)
+    labels, inverse, center, spread, z, mask = grouped_outliers(
+        [e[2] for e in employees], final, threshold=threshold, method=method
+    )
+    outliers = defaultdict(list)
+    for i in np.flatnonzero(mask):
+        eid, name, dept = employees[i]
+        g = inverse[i]
+        outliers[dept].append({
+            'employee_id': eid,
+            'name': name,
+            'final_score': scores[eid],
+            'department_avg': round(float(center[g]), 2),
+            'department_std': round(float(spread[g]), 2),
+            'zscore': round(float(z[i]), 2)
+        })
+    return dict(outliers)
+
+@cached('goal_achievement', lambda employee_id, cycle_id: [('employee', employee_id)])
 def calculate_goal_achievement(employee_id, cycle_id):
     """
     Calculate goal completion percentage for employee in cycle.
@@ -152,13 +282,12 @@ def calculate_goal_achievement(employee_id, cycle_id):
         }
     Weighted goal score: completion_rate * 10
     """
-    qs = Goal.objects.filter(employee_id=employee_id, cycle_id=cycle_id, is_deleted=False)
-    total = qs.count()
+    return calculate_goal_achievements.uncached(cycle_id, employee_ids=[employee_id])[employee_id]
+
+def _goal_achievement(employee_id, cycle_id, total, completed, progress_sum):
     if total == 0:
         return {'employee_id': employee_id, 'cycle_id': cycle_id, 'total_goals': 0, 'completed': 0, 'completion_rate': None, 'weighted_goal_score': None}
-    completed = qs.filter(status='completed').count()
     # Additionally we can calculate progress-weighted completion: cap progress at 100
-    progress_sum = sum([min(100, g.progress) for g in qs])
     completion_rate = completed / total
     progress_avg = progress_sum / total / 100.0
     # weighted goal score: 0-10, combine completion rate 70% and average progress 30%
@@ -172,3 +301,164 @@ def calculate_goal_achievement(employee_id, cycle_id):
         'avg_progress': round(progress_avg,3),
         'weighted_goal_score': weighted_score
     }
+
+def _goal_achievement_scopes(cycle_id, employee_ids=None, department=None):
+    if employee_ids is not None:
+        return [('employee', eid) for eid in employee_ids]
+    if department is not None:
+        return [('department', department), ('roster',)]
+    return [('company',), ('roster',)]
+
+def _goal_rows(cycle_id, employee_ids=None, department=None):
+    # per-employee goal totals for a cycle, one grouped aggregate
+    goals = Goal.objects.filter(cycle_id=cycle_id)
+    if employee_ids is not None:
+        goals = goals.filter(employee_id__in=employee_ids)
+    else:
+        goals = goals.filter(employee__is_deleted=False)
+        if department is not None:
+            goals = goals.filter(employee__department=department)
+    return goals.values('employee_id').annotate(
+        total=Count('id'),
+        completed=Count('id', filter=Q(status='completed')),
+        progress_sum=Sum(Least('progress', Value(100))),
+    ).order_by('employee_id')
+
+@cached('goal_achievements', _goal_achievement_scopes)
+def calculate_goal_achievements(cycle_id, employee_ids=None, department=None):
+    """
+    Batch version of calculate_goal_achievement: one grouped aggregate over Goal for the cycle,
+    limited to employee_ids or to the active employees of department (all active employees otherwise).
+    Returns {employee_id: achievement dict}. Every requested employee_id is present (zero goals gives
+    the empty result); with department / no filter only employees that have goals in the cycle appear.
+    Closed cycles with a snapshot are answered from it.
+    """
+    employee_ids = _id_list(employee_ids)
+    snapshot = snapshots.load(cycle_id)
+    if snapshot is not None:
+        totals = snapshot.goal_totals(employee_ids, department)
+    else:
+        totals = {
+            row['employee_id']: (row['total'], row['completed'], row['progress_sum'])
+            for row in _goal_rows(cycle_id, employee_ids, department)
+        }
+    achievements = {eid: _goal_achievement(eid, cycle_id, *t) for eid, t in totals.items()}
+    for eid in employee_ids or ():
+        if eid not in achievements:
+            achievements[eid] = _goal_achievement(eid, cycle_id, 0, 0, None)
+    return achievements
+
+@cached('department_summary', lambda department, cycle_id=None: [('department', department), ('roster',)])
+def summarize_department(department, cycle_id=None):
+    """
+    Department analytics for one cycle (latest cycle by default) from a bounded number of aggregate queries:
+      - total_employees: headcount of active employees
+      - scores: final score distribution (count, mean, median, percentiles, min/max, 0-10 histogram)
+      - review_completion: per review_type total / submitted / completion_rate
+      - goals: department totals using the calculate_goal_achievement formulas
+    Returns None if the cycle does not exist.
+    """
+    if cycle_id is None:
+        cycle = ReviewCycle.objects.order_by('-start_date').first()
+    else:
+        cycle = ReviewCycle.objects.filter(id=cycle_id).first()
+
+    employees = Employee.objects.filter(department=department)
+    summary = {'department': department, 'cycle': None, 'total_employees': employees.count()}
+    if cycle is None:
+        return summary if cycle_id is None else None
+    summary['cycle'] = {'id': cycle.id, 'name': cycle.name}
+
+    finals = np.array(list(calculate_final_scores(cycle.id, employees.values('id')).values()), dtype=float)
+    scores = {'count': int(finals.size)}
+    if finals.size:
+        p25, median, p75, p90 = np.percentile(finals, [25, 50, 75, 90])
+        counts, edges = np.histogram(finals, bins=10, range=(0, 10))
+        scores.update({
+            'mean': round(float(finals.mean()), 2),
+            'median': round(float(median), 2),
+            'p25': round(float(p25), 2),
+            'p75': round(float(p75), 2),
+            'p90': round(float(p90), 2),
+            'min': float(finals.min()),
+            'max': float(finals.max()),
+            'histogram': [{'from': int(edges[i]), 'to': int(edges[i + 1]), 'count': int(c)} for i, c in enumerate(counts)],
+        })
+    summary['scores'] = scores
+
+    completion = {rtype: {'total': 0, 'submitted': 0, 'completion_rate': None} for rtype, _ in Review.REVIEW_TYPE_CHOICES}
+    rows = Review.objects.filter(
+        employee__department=department, employee__is_deleted=False, cycle=cycle
+    ).values('review_type').annotate(total=Count('id'), submitted=Count('id', filter=Q(status='submitted')))
+    for row in rows:
+        completion[row['review_type']] = {
+            'total': row['total'],
+            'submitted': row['submitted'],
+            'completion_rate': round(row['submitted'] / row['total'], 3),
+        }
+    summary['review_completion'] = completion
+
+    summary['goals'] = _goal_stats(Goal.objects.filter(
+        employee__department=department, employee__is_deleted=False, cycle=cycle
+    ))
+    return summary
+
+def _goal_stats(goals):
+    # totals over a Goal queryset using the calculate_goal_achievement formulas, one aggregate query
+    goals = goals.aggregate(
+        total=Count('id'),
+        completed=Count('id', filter=Q(status='completed')),
+        employees=Count('employee', distinct=True),
+        progress_sum=Sum(Least('progress', Value(100))),
+    )
+    total = goals['total']
+    goal_stats = {'total_goals': total, 'completed': goals['completed'], 'employees_with_goals': goals['employees'],
+                  'completion_rate': None, 'avg_progress': None, 'weighted_goal_score': None}
+    if total:
+        completion_rate = goals['completed'] / total
+        progress_avg = goals['progress_sum'] / total / 100.0
+        goal_stats.update({
+            'completion_rate': round(completion_rate, 3),
+            'avg_progress': round(progress_avg, 3),
+            'weighted_goal_score': round(((0.7 * completion_rate) + (0.3 * progress_avg)) * 10, 2),
+        })
+    return goal_stats
+
+@cached('org_summary', lambda manager_id, cycle_id=None: [('company',), ('roster',)])
+def summarize_org(manager_id, cycle_id=None):
+    """
+    Rollup for everyone reporting (directly or indirectly) to manager_id, for one cycle (latest by default).
+    The org is resolved with Employee.objects.subtree, so the query count does not depend on its depth:
+      - headcount, levels: active employees below the manager and the depth of the deepest one
+      - scores: count / mean / min / max of final scores
+      - goals: org totals using the calculate_goal_achievement formulas
+    Returns None if the manager or the requested cycle does not exist.
+    """
+    manager = Employee.objects.filter(id=manager_id).values('id', 'name', 'depth').first()
+    if manager is None:
+        return None
+    if cycle_id is None:
+        cycle = ReviewCycle.objects.order_by('-start_date').first()
+    else:
+        cycle = ReviewCycle.objects.filter(id=cycle_id).first()
+        if cycle is None:
+            return None
+
+    org = Employee.objects.subtree(manager_id)
+    counts = org.aggregate(headcount=Count('id'), max_depth=Max('depth'))
+    summary = {
+        'manager': {'id': manager['id'], 'name': manager['name']},
+        'cycle': {'id': cycle.id, 'name': cycle.name} if cycle else None,
+        'headcount': counts['headcount'],
+        'levels': counts['max_depth'] - manager['depth'] if counts['headcount'] else 0,
+    }
+    if cycle is None:
+        return summary
+
+    finals = list(calculate_final_scores(cycle.id, org.values('id')).values())
+    scores = {'count': len(finals)}
+    if finals:
+        scores.update({'mean': round(mean(finals), 2), 'min': min(finals), 'max': max(finals)})
+    summary['scores'] = scores
+    summary['goals'] = _goal_stats(Goal.objects.filter(employee__in=org.values('id'), cycle=cycle))
+    return summary
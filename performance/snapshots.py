@@ -0,0 +1,222 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import uuid
+import numpy as np
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+from .models import Employee, Review, ReviewCycle, Score, Goal, soft_deleted
+
+# Columnar snapshots of closed review cycles.
+# Closing a cycle writes one .npy file per column (one row per employee with scores or goals
+# in the cycle) plus meta.json into PERFORMANCE_SNAPSHOT_DIR. The score services load them
+# with mmap_mode='r' and answer final scores, components and goal achievement for that cycle
+# without querying Review / Score / Goal. Snapshots are point-in-time: an employee soft deleted
+# after the close stays in them. Writes to the cycle's reviews, scores or goals discard the
+# snapshot (reads fall back to the tables); `manage.py snapshot_cycles` (re)builds them.
+
+VERSION = 1
+
+COLUMNS = {
+    'employee_id': np.int64,
+    'department': np.int32,       # index into meta['departments']
+    'manager_score': np.float64,  # NaN where missing
+    'self_score': np.float64,
+    'peer_score': np.float64,
+    'final_score': np.float64,
+    'total_goals': np.int32,
+    'completed_goals': np.int32,
+    'goal_progress_sum': np.int64,  # sum of min(progress, 100)
+}
+
+_loaded = {}
+_lock = threading.Lock()
+
+def snapshot_root():
+    # one directory per database so test databases never see production snapshots
+    base = getattr(settings, 'PERFORMANCE_SNAPSHOT_DIR', os.path.join(settings.BASE_DIR, 'var', 'snapshots'))
+    db = hashlib.md5(str(connection.settings_dict['NAME']).encode()).hexdigest()[:12]
+    return os.path.join(base, db)
+
+def snapshot_path(cycle_id):
+    return os.path.join(snapshot_root(), f'cycle-{cycle_id}')
+
+class CycleSnapshot:
+    def __init__(self, path):
+        with open(os.path.join(path, 'meta.json')) as f:
+            self.meta = json.load(f)
+        self.cycle_id = self.meta['cycle_id']
+        self.departments = self.meta['departments']
+        # empty files cannot be memory-mapped
+        mmap_mode = 'r' if self.meta['rows'] else None
+        for name in COLUMNS:
+            setattr(self, name, np.load(os.path.join(path, f'{name}.npy'), mmap_mode=mmap_mode))
+
+    def __len__(self):
+        return len(self.employee_id)
+
+    def rows(self, employee_ids=None, department=None):
+        """Row indices for the given employees (or department), ordered by employee id."""
+        if employee_ids is not None:
+            ids = np.fromiter(employee_ids, dtype=np.int64)
+            pos = np.searchsorted(self.employee_id, ids)
+            found = pos < len(self)
+            pos, ids = pos[found], ids[found]
+            return np.unique(pos[self.employee_id[pos] == ids])
+        if department is not None:
+            if department not in self.departments:
+                return np.array([], dtype=np.int64)
+            return np.flatnonzero(self.department == self.departments.index(department))
+        return np.arange(len(self))
+
+    def final_scores(self, employee_ids=None):
+        idx = self.rows(employee_ids)
+        idx = idx[~np.isnan(self.final_score[idx])]
+        return dict(zip(self.employee_id[idx].tolist(), self.final_score[idx].tolist()))
+
+    def component_scores(self, employee_ids=None):
+        idx = self.rows(employee_ids)
+        idx = idx[~np.isnan(self.final_score[idx])]
+        columns = {rtype: getattr(self, f'{rtype}_score')[idx].tolist() for rtype in ('manager', 'self', 'peer')}
+        return {
+            eid: {rtype: (None if np.isnan(columns[rtype][i]) else columns[rtype][i]) for rtype in columns}
+            for i, eid in enumerate(self.employee_id[idx].tolist())
+        }
+
+    def goal_totals(self, employee_ids=None, department=None):
+        """{employee_id: (total, completed, progress_sum)} for employees with goals."""
+        idx = self.rows(employee_ids, department)
+        idx = idx[self.total_goals[idx] > 0]
+        return dict(zip(
+            self.employee_id[idx].tolist(),
+            zip(self.total_goals[idx].tolist(), self.completed_goals[idx].tolist(), self.goal_progress_sum[idx].tolist()),
+        ))
+
+def load(cycle_id):
+    """The snapshot of cycle_id, or None. Loaded arrays are memory-mapped and reused until the files change."""
+    path = snapshot_path(cycle_id)
+    try:
+        stat = os.stat(os.path.join(path, 'meta.json'))
+    except FileNotFoundError:
+        return None
+    stamp = (stat.st_ino, stat.st_mtime_ns)
+    with _lock:
+        cached = _loaded.get(path)
+        if cached and cached[0] == stamp:
+            return cached[1]
+    try:
+        snapshot = CycleSnapshot(path)
+    except (FileNotFoundError, ValueError):
+        # replaced or discarded while loading
+        return None
+    with _lock:
+        _loaded[path] = (stamp, snapshot)
+    return snapshot
+
+def build_snapshot(cycle_id):
+    """Compute the snapshot columns for a cycle from the live tables and write them. Returns the row count."""
+    from .services import _component_scores, _goal_rows, _weighted_final_score
+
+    cycle = ReviewCycle.objects.get(id=cycle_id)
+    components = {eid: c for (_, eid), c in _component_scores([cycle.id]).items()}
+    goals = {row['employee_id']: row for row in _goal_rows(cycle.id)}
+    ids = sorted(set(components) | set(goals))
+    wanted = set(ids)
+    departments = {eid: dept for eid, dept in Employee.all_objects.values_list('id', 'department').iterator() if eid in wanted}
+    labels = sorted(set(departments.values()))
+    codes = {d: i for i, d in enumerate(labels)}
+
+    def component(eid, rtype):
+        value = components.get(eid, {}).get(rtype)
+        return np.nan if value is None else value
+
+    def final(eid):
+        c = components.get(eid)
+        value = _weighted_final_score(c['manager'], c['self'], c['peer']) if c else None
+        return np.nan if value is None else value
+
+    empty = {'total': 0, 'completed': 0, 'progress_sum': 0}
+    columns = {
+        'employee_id': ids,
+        'department': [codes[departments[eid]] for eid in ids],
+        'manager_score': [component(eid, 'manager') for eid in ids],
+        'self_score': [component(eid, 'self') for eid in ids],
+        'peer_score': [component(eid, 'peer') for eid in ids],
+        'final_score': [final(eid) for eid in ids],
+        'total_goals': [goals.get(eid, empty)['total'] for eid in ids],
+        'completed_goals': [goals.get(eid, empty)['completed'] for eid in ids],
+        'goal_progress_sum': [goals.get(eid, empty)['progress_sum'] or 0 for eid in ids],
+    }
+    meta = {
+        'version': VERSION, 'cycle_id': cycle.id, 'cycle_name': cycle.name, 'rows': len(ids),
+        'departments': labels, 'created_at': timezone.now().isoformat(),
+    }
+    _write(cycle.id, columns, meta)
+    return len(ids)
+
+def _write(cycle_id, columns, meta):
+    # write into a scratch directory and swap it in, so readers never see a partial snapshot
+    root = snapshot_root()
+    os.makedirs(root, exist_ok=True)
+    final = snapshot_path(cycle_id)
+    tmp = f'{final}.tmp-{uuid.uuid4().hex}'
+    os.makedirs(tmp)
+    for name, dtype in COLUMNS.items():
+        np.save(os.path.join(tmp, f'{name}.npy'), np.asarray(columns[name], dtype=dtype))
+    with open(os.path.join(tmp, 'meta.json'), 'w') as f:
+        json.dump(meta, f)
+    discard(cycle_id)
+    os.replace(tmp, final)
+
+def discard(cycle_id):
+    """Remove the snapshot of a cycle (if any); open memory maps stay valid until released."""
+    path = snapshot_path(cycle_id)
+    if not os.path.isdir(path):
+        return False
+    old = f'{path}.old-{uuid.uuid4().hex}'
+    try:
+        os.replace(path, old)
+    except FileNotFoundError:
+        return False
+    shutil.rmtree(old, ignore_errors=True)
+    return True
+
+def has_snapshots():
+    root = snapshot_root()
+    return os.path.isdir(root) and any(name.startswith('cycle-') for name in os.listdir(root))
+
+@receiver(post_save, sender=ReviewCycle)
+def _cycle_saved(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    if instance.status == 'closed':
+        transaction.on_commit(lambda: build_snapshot(instance.id))
+    else:
+        discard(instance.id)
+
+@receiver(post_delete, sender=ReviewCycle)
+def _cycle_deleted(sender, instance, **kwargs):
+    discard(instance.id)
+
+@receiver([post_save, post_delete], sender=Review)
+@receiver([post_save, post_delete], sender=Goal)
+def _cycle_data_changed(sender, instance, **kwargs):
+    discard(instance.cycle_id)
+
+@receiver([post_save, post_delete], sender=Score)
+def _score_changed(sender, instance, **kwargs):
+    if has_snapshots():
+        for cycle_id in Review.all_objects.filter(id=instance.review_id).values_list('cycle_id', flat=True):
+            discard(cycle_id)
+
+@receiver(soft_deleted, sender=Review)
+@receiver(soft_deleted, sender=Goal)
+def _rows_soft_deleted(sender, pks, **kwargs):
+    if has_snapshots():
+        for cycle_id in set(sender.all_objects.filter(id__in=pks).values_list('cycle_id', flat=True)):
+            discard(cycle_id)
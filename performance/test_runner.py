@@ -0,0 +1,20 @@
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+from django.conf import settings
+
+class QueryBudgetTestRunner(DiscoverRunner):
+    """
+    Test runner that turns @query_budget violations into failing requests (QueryBudgetExceeded)
+    and writes audit entries recorded outside a request synchronously (no flusher thread).
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        profiling = {**getattr(settings, 'PERFORMANCE_PROFILING', {}), 'RAISE_ON_BUDGET': True}
+        audit = {**getattr(settings, 'PERFORMANCE_AUDIT', {}), 'BACKGROUND': False}
+        self._budget_override = override_settings(PERFORMANCE_PROFILING=profiling, PERFORMANCE_AUDIT=audit)
+        self._budget_override.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._budget_override.disable()
+        super().teardown_test_environment(**kwargs)
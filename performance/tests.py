@@ -1,7 +1,41 @@
-from django.test import TestCase
-from .models import Employee, ReviewCycle, Review, Score, Goal
-from .services import calculate_final_score, calculate_goal_achievement, identify_outliers, get_performance_trend
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, AsyncClient, override_settings
+from .models import Employee, ReviewCycle, Review, Score, Goal, EmployeeCycleScore, ReviewScoreRollup, User, AuditLog, ImportJob, soft_deleted
+from .auth_models import AuthToken
+from .authentication import AuthTokenAuthentication, token_cache
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.test import APIRequestFactory
+from datetime import datetime, timedelta, timezone as dt_timezone
+from asgiref.sync import sync_to_async
+from .serializers import ReviewSerializer
+from .services import calculate_final_score, calculate_final_scores, calculate_component_scores, calculate_goal_achievement, calculate_goal_achievements, identify_outliers, identify_company_outliers, get_performance_trend, summarize_department
+from . import cache as perf_cache
+from django.core.cache import caches
+from statistics import mean, stdev, median
 from django.utils import timezone
+from django.db import IntegrityError, OperationalError, connection, transaction
+from django.db.models import F
+from django.test.utils import CaptureQueriesContext
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from io import StringIO, BytesIO
+from unittest import mock
+import base64
+import csv
+import json
+import os
+import tempfile
+import threading
+from . import async_views, audit, audit_archive, bulk_import, jobs, snapshots, views
+from .benchmarks import bench_endpoints, bench_services
+from .datasets import generate_dataset
+from .profiling import QueryBudgetExceeded, RequestProfile, profile_requests, metrics as view_metrics
+from .outlier_detector import analyze_company_performance, analyze_company_performance_loop, iter_company_performance
+
+def hr_auth():
+    """Authorization header of a fresh HR user, for the HR-only internal endpoints."""
+    user = User.objects.create(username=f'hr{User.objects.count()}', role='hr')
+    token = AuthToken.objects.create(user=user, token=f'hr-{user.id}', expires_at=timezone.now() + timedelta(hours=1))
+    return {'HTTP_AUTHORIZATION': f'Token {token.token}'}
 
 class CoreLogicTests(TestCase):
     def setUp(self):
@@ -38,3 +72,1023 @@ class CoreLogicTests(TestCase):
         cycle = ReviewCycle.objects.get(name='2024 Q3')
         ga = calculate_goal_achievement(e1.id, cycle.id)
         self.assertEqual(ga['total_goals'], 0)
+
+    def test_calculate_goal_achievements_matches_scalar_formula(self):
+        e1 = Employee.objects.get(email='a@example.com')
+        e2 = Employee.objects.get(email='b@example.com')
+        cycle = ReviewCycle.objects.get(name='2024 Q3')
+        for status, progress in (('completed', 130), ('in_progress', 45), ('not_started', 0)):
+            Goal.objects.create(employee=e1, cycle=cycle, description='g', status=status, progress=progress)
+        Goal.objects.create(employee=e1, cycle=cycle, description='gone', status='completed', progress=100, is_deleted=True)
+        with self.assertNumQueries(1):
+            batch = calculate_goal_achievements(cycle.id, employee_ids=[e1.id, e2.id])
+        # reference: the original per-row computation
+        goals = list(Goal.objects.filter(employee=e1, cycle=cycle, is_deleted=False))
+        completion_rate = sum(g.status == 'completed' for g in goals) / len(goals)
+        progress_avg = sum(min(100, g.progress) for g in goals) / len(goals) / 100.0
+        self.assertEqual(batch[e1.id]['weighted_goal_score'], round(((0.7 * completion_rate) + (0.3 * progress_avg)) * 10, 2))
+        self.assertEqual((batch[e1.id]['total_goals'], batch[e1.id]['completed'], batch[e1.id]['avg_progress']), (3, 1, 0.483))
+        self.assertEqual(batch[e2.id]['total_goals'], 0)
+        self.assertEqual(batch[e1.id], calculate_goal_achievement(e1.id, cycle.id))
+        self.assertEqual(set(calculate_goal_achievements(cycle.id, department=e1.department)), {e1.id})
+
+    def test_calculate_final_scores_matches_scalar(self):
+        e1 = Employee.objects.get(email='a@example.com')
+        e2 = Employee.objects.get(email='b@example.com')
+        cycle = ReviewCycle.objects.get(name='2024 Q3')
+        # e2 only has a self review -> 60/40 fallback path
+        r = Review.objects.create(employee=e2, reviewer=e2, cycle=cycle, review_type='self', status='submitted', submitted_date=timezone.now())
+        for criteria, score in (('technical', 6), ('communication', 7), ('leadership', 5), ('goals', 7)):
+            Score.objects.create(review=r, criteria=criteria, score=score)
+        with self.assertNumQueries(1):
+            finals = calculate_final_scores(cycle.id)
+        self.assertEqual(finals, {e1.id: calculate_final_score(e1.id, cycle.id), e2.id: calculate_final_score(e2.id, cycle.id)})
+
+    def test_performance_trend(self):
+        e1 = Employee.objects.get(email='a@example.com')
+        trend = get_performance_trend(e1.id, num_cycles=2)
+        self.assertEqual(trend, [{'cycle': '2024 Q3', 'final_score': 8.0}, {'cycle': '2024 Q4', 'final_score': None}])
+
+class ScoreRollupTests(TestCase):
+    def setUp(self):
+        self.emp = Employee.objects.create(name='A', email='a@example.com', department='Eng')
+        self.mgr = Employee.objects.create(name='M', email='m@example.com', department='Eng')
+        self.cycle = ReviewCycle.objects.create(name='2024 Q3', start_date='2024-07-01', end_date='2024-09-30')
+
+    def _create(self, review_type, reviewer, scores, status='draft'):
+        serializer = ReviewSerializer(data={
+            'employee': self.emp.id, 'reviewer': reviewer.id, 'cycle': self.cycle.id,
+            'review_type': review_type, 'status': status,
+            'scores': [{'criteria': c, 'score': v} for c, v in zip(('technical','communication','leadership','goals'), scores)],
+        })
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        return serializer.save()
+
+    def test_incremental_updates(self):
+        review = self._create('manager', self.mgr, [9, 8, 8, 9])
+        self.assertEqual(review.score_rollup.avg_score, 8.5)
+        self.assertFalse(EmployeeCycleScore.objects.exists())
+
+        self.client.put(f'/reviews/{review.id}/submit')
+        row = EmployeeCycleScore.objects.get(employee=self.emp, cycle=self.cycle)
+        self.assertEqual(row.final_score, calculate_final_score(self.emp.id, self.cycle.id))
+
+        Review.objects.filter(id=review.id).delete()
+        self.assertFalse(EmployeeCycleScore.objects.exists())
+
+    def test_rebuild_and_verify(self):
+        self._create('self', self.emp, [6, 7, 5, 7], status='submitted')
+        EmployeeCycleScore.objects.update(final_score=0)
+        with self.assertRaises(CommandError):
+            call_command('rebuild_score_rollups', '--verify', stdout=StringIO())
+        call_command('rebuild_score_rollups', stdout=StringIO())
+        call_command('rebuild_score_rollups', '--verify', stdout=StringIO())
+        with self.settings(PERFORMANCE_READ_ROLLUPS=True):
+            self.assertEqual(calculate_final_scores(self.cycle.id), {self.emp.id: 6.25})
+            # component scores come from the per-review sums, without touching Score
+            ReviewScoreRollup.objects.update(score_sum=F('score_sum') + 4)
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(calculate_component_scores(self.cycle.id)[self.emp.id]['self'], 7.25)
+            self.assertFalse(any('"performance_score"' in q['sql'] for q in queries.captured_queries))
+            self.assertEqual(calculate_component_scores(self.cycle.id, read_rollups=False)[self.emp.id]['self'], 6.25)
+
+class CompanyAnalyzerTests(SimpleTestCase):
+    def test_vectorized_matches_loop(self):
+        payload = {
+            'department_averages': {'Eng': [6, 6, 6.5, 7], 'Ops': [5, 0], 'Sales': []},
+            'employees': [
+                {'employee_id': 1, 'department': 'Eng', 'quarterly_scores': [7, 7, 7.2, 8]},   # high performer
+                {'employee_id': 2, 'department': 'Eng', 'quarterly_scores': [8, 8, 6]},        # 3+ quarter decline
+                {'employee_id': 3, 'department': 'Eng', 'quarterly_scores': [7, 5.5]},         # 2 quarter decline
+                {'employee_id': 4, 'department': 'Eng', 'quarterly_scores': [6, 6, 6, 6, 6]},  # longer than dept history
+                {'employee_id': 5, 'department': 'Sales', 'quarterly_scores': [9, 9, 9]},
+                {'employee_id': 6, 'department': 'Ops', 'quarterly_scores': [6]},
+                {'employee_id': 7, 'department': 'HR', 'quarterly_scores': [0, 0, 0]},
+                {'employee_id': 8, 'department': 'Eng', 'quarterly_scores': []},
+                {'employee_id': 9, 'department': 'Eng'},
+            ],
+        }
+        expected = analyze_company_performance_loop(payload)
+        self.assertEqual(analyze_company_performance(payload), expected)
+        self.assertEqual([e['employee_id'] for e in expected['high_performers']], [1, 6])
+        self.assertEqual([e['employee_id'] for e in expected['at_risk']], [2, 3])
+        self.assertEqual(analyze_company_performance({}), analyze_company_performance_loop({}))
+
+        payload['employees'].append({'employee_id': 10, 'department': 'Ops', 'quarterly_scores': [6, 6]})
+        with self.assertRaises(ZeroDivisionError):
+            analyze_company_performance_loop(payload)
+        with self.assertRaises(ZeroDivisionError):
+            analyze_company_performance(payload)
+
+    def test_streaming_matches_batch(self):
+        from .benchmarks import _analyzer_payload
+        payload = _analyzer_payload(500, 4, 6, seed=3)
+        expected = analyze_company_performance(payload)
+        events = list(iter_company_performance(iter(payload['employees']), payload['department_averages'], batch_size=64))
+        for key, event_type in (('high_performers', 'high_performer'), ('at_risk', 'at_risk'), ('recommendations', 'recommendation')):
+            self.assertEqual([{k: v for k, v in e.items() if k != 'type'} for e in events if e['type'] == event_type], expected[key])
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'employees.ndjson')
+            with open(path, 'w') as f:
+                f.write(json.dumps({'department_averages': payload['department_averages']}) + '\n')
+                for emp in payload['employees']:
+                    f.write(json.dumps(emp) + '\n')
+            out, err = StringIO(), StringIO()
+            call_command('analyze_company_performance', path, '--batch-size', '100', stdout=out, stderr=err)
+        self.assertEqual([json.loads(line) for line in out.getvalue().splitlines()],
+                         list(iter_company_performance(payload['employees'], payload['department_averages'], batch_size=100)))
+        self.assertIn(f"at_risk={len(expected['at_risk'])}", err.getvalue())
+
+class OutlierTests(TestCase):
+    def setUp(self):
+        self.cycle = ReviewCycle.objects.create(name='2024 Q4', start_date='2024-10-01', end_date='2024-12-31')
+        self.scores = {'Eng': [6, 7, 8, 7, 9, 7, 2], 'Sales': [5, 5, 5]}
+        for dept, values in self.scores.items():
+            for i, v in enumerate(values):
+                e = Employee.objects.create(name=f'{dept}{i}', email=f'{dept}{i}@example.com', department=dept)
+                r = Review.objects.create(employee=e, reviewer=e, cycle=self.cycle, review_type='manager', status='submitted')
+                Score.objects.create(review=r, criteria='technical', score=v)
+
+    def test_company_outliers_zscore(self):
+        outliers = identify_company_outliers()
+        self.assertEqual(list(outliers), ['Eng'])
+        [o] = outliers['Eng']
+        eng = self.scores['Eng']
+        self.assertEqual(o['final_score'], 2.0)
+        self.assertEqual(o['department_avg'], round(mean(eng), 2))
+        self.assertEqual(o['department_std'], round(stdev(eng), 2))
+        self.assertEqual(o['zscore'], round((2 - mean(eng)) / stdev(eng), 2))
+        self.assertEqual(identify_outliers('Eng'), outliers['Eng'])
+        self.assertEqual(identify_outliers('Sales'), [])
+
+    def test_company_outliers_mad(self):
+        outliers = identify_company_outliers(method='mad', threshold=3)
+        self.assertEqual([o['final_score'] for o in outliers['Eng']], [2.0])
+        self.assertEqual(outliers['Eng'][0]['department_avg'], median(self.scores['Eng']))
+
+class BulkImportTests(TestCase):
+    def setUp(self):
+        self.emp = Employee.objects.create(name='A', email='a@example.com', department='Eng')
+        self.peer = Employee.objects.create(name='B', email='b@example.com', department='Eng')
+        self.cycle = ReviewCycle.objects.create(name='2024 Q3', start_date='2024-07-01', end_date='2024-09-30')
+
+    def _item(self, review_type, reviewer, **extra):
+        item = {'employee': self.emp.id, 'reviewer': reviewer.id, 'cycle': self.cycle.id, 'review_type': review_type,
+                'scores': [{'criteria': 'technical', 'score': 8}, {'criteria': 'goals', 'score': 6}]}
+        item.update(extra)
+        return item
+
+    def test_stream_json_array(self):
+        items = [self._item('self', self.emp), self._item('peer', self.peer), self._item('peer', self.peer),
+                 self._item('manager', self.peer, cycle=999), self._item('bogus', self.peer)]
+        resp = self.client.post('/reviews/bulk-import?mode=stream&batch_size=2', data=json.dumps(items), content_type='application/json')
+        self.assertEqual(resp.status_code, 200)
+        body = resp.json()
+        self.assertEqual(len(body['created']), 2)
+        self.assertEqual(Score.objects.filter(review_id__in=body['created']).count(), 4)
+        self.assertEqual([e['error'] for e in body['errors']][:2], ['duplicate', {'cycle': ['Invalid pk "999" - object does not exist.']}])
+        self.assertIn('review_type', body['errors'][2]['error'])
+
+    def test_ndjson_and_existing_duplicate(self):
+        Review.objects.create(employee=self.emp, reviewer=self.emp, cycle=self.cycle, review_type='self')
+        body = '\n'.join(json.dumps(i) for i in [self._item('self', self.emp), self._item('manager', self.peer, status='submitted')])
+        resp = self.client.post('/reviews/bulk-import', data=body, content_type='application/x-ndjson')
+        self.assertEqual(len(resp.json()['created']), 1)
+        self.assertEqual(resp.json()['errors'][0]['error'], 'duplicate')
+        self.assertEqual(calculate_final_scores(self.cycle.id), {self.emp.id: 7.0})
+
+    def test_concurrent_duplicate_and_partial_body(self):
+        # another import inserts the self review between the duplicate query and bulk_create
+        real_filter = Review.all_objects.filter
+        calls = []
+
+        def stale_filter(*args, **kwargs):
+            calls.append(kwargs)
+            return real_filter(*args, **kwargs).none() if len(calls) == 1 else real_filter(*args, **kwargs)
+        Review.objects.create(employee=self.emp, reviewer=self.emp, cycle=self.cycle, review_type='self')
+        items = [self._item('self', self.emp), self._item('peer', self.peer)]
+        with mock.patch.object(Review.all_objects, 'filter', side_effect=stale_filter):
+            result = bulk_import.import_reviews(items)
+        self.assertEqual(len(result['created']), 1)
+        self.assertEqual(result['errors'], [{'item': items[0], 'error': 'duplicate'}])
+
+        # a body that breaks off part way still reports the reviews imported before it
+        body = json.dumps([self._item('manager', self.peer), self._item('peer', self.emp)])[:-1] + ', {"employee": '
+        resp = self.client.post('/reviews/bulk-import?mode=stream&batch_size=1', data=body, content_type='application/json')
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual(len(resp.json()['created']), 2)
+        self.assertIn('Malformed import body', resp.json()['detail'])
+
+    def test_incremental_json_parser(self):
+        items = [{'n': i, 'text': 'x' * i} for i in range(50)] + [123, 4.5]
+        with mock.patch.object(bulk_import, 'READ_SIZE', 7):
+            self.assertEqual(list(bulk_import.iter_json_items(BytesIO(json.dumps(items).encode()))), items)
+        self.assertEqual(list(bulk_import.iter_json_items(BytesIO(b'{"reviews": [{"a": 1}]}'))), [{'a': 1}])
+
+    def test_async_job(self):
+        items = [self._item('self', self.emp), self._item('self', self.emp)]
+        with tempfile.TemporaryDirectory() as tmp, self.settings(BULK_IMPORT_UPLOAD_DIR=tmp):
+            with self.captureOnCommitCallbacks(execute=False) as callbacks:
+                resp = self.client.post('/reviews/bulk-import?mode=async', data=json.dumps(items), content_type='application/json')
+            self.assertEqual(resp.status_code, 202)
+            self.assertEqual(resp.json()['status'], 'queued')
+            self.assertEqual(len(callbacks), 1)
+            jobs.run_import_job(resp.json()['id'])
+            self.assertEqual(os.listdir(tmp), [])
+        job = self.client.get(resp['Location']).json()
+        self.assertEqual((job['status'], job['processed'], job['created_count'], job['error_count']), ('completed', 2, 1, 1))
+        self.assertEqual(job['errors'][0]['error'], 'duplicate')
+
+    def test_recover_stale_jobs(self):
+        with tempfile.TemporaryDirectory() as tmp, self.settings(BULK_IMPORT_UPLOAD_DIR=tmp):
+            with self.captureOnCommitCallbacks(execute=False):
+                lost = jobs.submit_import(BytesIO(b'[]'), 'application/json')
+                live = jobs.submit_import(BytesIO(b'[]'), 'application/json')
+            orphan = os.path.join(tmp, 'gone.upload')
+            open(orphan, 'w').close()
+            hour_ago = timezone.now() - timedelta(hours=1)
+            ImportJob.objects.filter(id=lost.id).update(status='running', updated_at=hour_ago)
+            for path in (lost.upload_path, orphan):
+                os.utime(path, (hour_ago.timestamp(), hour_ago.timestamp()))
+            out = StringIO()
+            call_command('recover_import_jobs', '--older-than', '30', stdout=out)
+            self.assertIn('Failed 1 stale jobs, removed 2 uploads', out.getvalue())
+            self.assertEqual(os.listdir(tmp), [os.path.basename(live.upload_path)])
+            self.assertEqual(ImportJob.objects.get(id=lost.id).status, 'failed')
+            # a late worker does not revive it
+            jobs.run_import_job(lost.id)
+            self.assertEqual(ImportJob.objects.get(id=lost.id).status, 'failed')
+            jobs.run_import_job(live.id)
+            self.assertEqual(ImportJob.objects.get(id=live.id).status, 'completed')
+
+class TrendEndpointTests(TestCase):
+    def setUp(self):
+        self.emps = [Employee.objects.create(name=f'E{i}', email=f'e{i}@example.com', department='Eng') for i in range(3)]
+        self.cycles = [ReviewCycle.objects.create(name=f'2024 Q{q}', start_date=f'2024-{3 * q - 2:02d}-01', end_date=f'2024-{3 * q:02d}-28') for q in range(1, 5)]
+        for ci, cycle in enumerate(self.cycles):
+            for ei, e in enumerate(self.emps):
+                r = Review.objects.create(employee=e, reviewer=e, cycle=cycle, review_type='manager', status='submitted')
+                Score.objects.create(review=r, criteria='technical', score=ci + ei)
+
+    def test_single_trend(self):
+        resp = self.client.get(f'/employees/{self.emps[1].id}/performance-trend?cycles=2')
+        self.assertEqual(resp.json(), {'employee_id': self.emps[1].id, 'trend': [
+            {'cycle': '2024 Q3', 'final_score': 3.0}, {'cycle': '2024 Q4', 'final_score': 4.0}]})
+        self.assertEqual(self.client.get(f'/employees/{self.emps[1].id}/performance-trend?cycles=0').status_code, 400)
+
+    def test_batch_trend_constant_queries(self):
+        ids = ','.join(str(e.id) for e in self.emps)
+        with self.assertNumQueries(3):
+            resp = self.client.get(f'/employees/performance-trend?employee_ids={ids}&cycles=4')
+        results = resp.json()['results']
+        self.assertEqual([r['employee_id'] for r in results], [e.id for e in self.emps])
+        self.assertEqual([t['final_score'] for t in results[2]['trend']], [2.0, 3.0, 4.0, 5.0])
+        for r in results:
+            self.assertEqual(r['trend'], get_performance_trend(r['employee_id'], 4))
+
+class QueryCountTests(TestCase):
+    """Listing endpoints must issue the same number of queries however long the history is."""
+
+    def setUp(self):
+        self.emp = Employee.objects.create(name='A', email='a@example.com', department='Eng')
+
+    def _add_history(self, n):
+        start = ReviewCycle.objects.count()
+        for i in range(start, start + n):
+            cycle = ReviewCycle.objects.create(name=f'C{i}', start_date=f'{2000 + i}-01-01', end_date=f'{2000 + i}-12-31')
+            r = Review.objects.create(employee=self.emp, reviewer=self.emp, cycle=cycle, review_type='self')
+            Score.objects.create(review=r, criteria='technical', score=7)
+            Score.objects.create(review=r, criteria='goals', score=8)
+
+    def assertStableQueryCount(self, url, sizes=(1, 5, 20)):
+        counts = []
+        for n in sizes:
+            self._add_history(n)
+            with CaptureQueriesContext(connection) as ctx:
+                resp = self.client.get(url)
+            self.assertEqual(resp.status_code, 200)
+            counts.append(len(ctx.captured_queries))
+        self.assertEqual(len(set(counts)), 1, f'query count grows with history: {counts}')
+        return counts[0]
+
+    def test_employee_reviews(self):
+        self.assertEqual(self.assertStableQueryCount(f'/employees/{self.emp.id}/reviews'), 3)
+
+    def test_get_review(self):
+        self._add_history(1)
+        review = Review.objects.get()
+        with self.assertNumQueries(2):
+            data = self.client.get(f'/reviews/{review.id}').json()
+        self.assertEqual(len(data['scores']), 2)
+
+    def test_review_keyset_pagination_and_projection(self):
+        self._add_history(7)
+        url = f'/employees/{self.emp.id}/reviews?page_size=3&fields=id,status,cycle'
+        seen = []
+        while url:
+            with self.assertNumQueries(2):
+                body = self.client.get(url).json()
+            for item in body['results']:
+                self.assertEqual(set(item), {'id', 'status', 'cycle'})
+            seen.extend(item['id'] for item in body['results'])
+            url = body['next']
+        expected = list(Review.objects.order_by('-cycle__start_date', '-id').values_list('id', flat=True))
+        self.assertEqual(seen, expected)
+        self.assertEqual(self.client.get(f'/employees/{self.emp.id}/reviews?fields=nope').status_code, 400)
+        # cursor values of the wrong type are rejected, not passed to the ORM
+        for values in (['2024-01-01', 'abc'], ['2024-01-01', [1]], ['not a date', 1]):
+            cursor = base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+            resp = self.client.get(f'/employees/{self.emp.id}/reviews?cursor={cursor}')
+            self.assertEqual(resp.status_code, 400, values)
+            self.assertEqual(resp.json(), {'cursor': 'invalid cursor'})
+
+    def test_goal_keyset_pagination(self):
+        cycle = ReviewCycle.objects.create(name='C', start_date='2024-01-01', end_date='2024-12-31')
+        goals = [Goal.objects.create(employee=self.emp, cycle=cycle, description=f'g{i}') for i in range(5)]
+        Goal.objects.filter(id__in=[goals[1].id, goals[2].id]).update(created_at=goals[0].created_at)
+        Goal.objects.filter(id=goals[4].id).update(created_at=None)
+        url = f'/employees/{self.emp.id}/goals?page_size=2'
+        seen = []
+        while url:
+            body = self.client.get(url).json()
+            seen.extend(item['id'] for item in body['results'])
+            url = body['next']
+        self.assertEqual(sorted(seen), sorted(g.id for g in goals))
+        self.assertEqual(seen[-1], goals[4].id)
+
+    def test_employee_profile(self):
+        boss = Employee.objects.create(name='B', email='b@example.com', department='Eng', role='lead')
+        Employee.objects.filter(id=self.emp.id).update(manager=boss)
+        self.assertStableQueryCount(f'/employees/{self.emp.id}/profile')
+        cycle = ReviewCycle.objects.order_by('-start_date').first()
+        Goal.objects.create(employee=self.emp, cycle=cycle, description='g', status='completed', progress=100)
+        data = self.client.get(f'/employees/{self.emp.id}/profile?cycles=2').json()
+        self.assertEqual(data['manager']['name'], 'B')
+        self.assertEqual(len(data['reviews']), Review.objects.count())
+        self.assertEqual(len(data['goals']), 1)
+        self.assertEqual(data['trend'], get_performance_trend(self.emp.id, 2))
+        self.assertEqual(data['goal_achievement'], calculate_goal_achievement(self.emp.id, cycle.id))
+        self.assertEqual(self.client.get('/employees/999/profile').status_code, 404)
+
+class HierarchyTests(TestCase):
+    def setUp(self):
+        # ceo -> vp -> (lead -> dev), ceo -> other
+        self.ceo = Employee.objects.create(name='CEO', email='ceo@example.com', department='Exec')
+        self.vp = Employee.objects.create(name='VP', email='vp@example.com', department='Eng', manager=self.ceo)
+        self.lead = Employee.objects.create(name='Lead', email='lead@example.com', department='Eng', manager=self.vp)
+        self.dev = Employee.objects.create(name='Dev', email='dev@example.com', department='Eng', manager=self.lead)
+        self.other = Employee.objects.create(name='Other', email='other@example.com', department='Sales', manager=self.ceo)
+
+    def _subtree(self, manager):
+        return set(Employee.objects.subtree(manager.id).values_list('name', flat=True))
+
+    def test_paths_and_subtree(self):
+        self.dev.refresh_from_db()
+        self.assertEqual((self.dev.path, self.dev.depth), (f'/{self.ceo.id}/{self.vp.id}/{self.lead.id}/{self.dev.id}/', 3))
+        with self.assertNumQueries(1):
+            self.assertEqual(self._subtree(self.vp), {'Lead', 'Dev'})
+        self.assertEqual(self._subtree(self.ceo), {'VP', 'Lead', 'Dev', 'Other'})
+
+    def test_move_subtree(self):
+        self.lead.manager = self.other
+        with self.assertNumQueries(3):
+            self.lead.save()
+        self.assertEqual(self._subtree(self.vp), set())
+        self.assertEqual(self._subtree(self.other), {'Lead', 'Dev'})
+        self.dev.refresh_from_db()
+        self.assertEqual(self.dev.depth, 3)
+        self.ceo.manager = self.dev
+        with self.assertRaises(ValueError):
+            self.ceo.save()
+
+    def test_hard_delete_and_rebuild(self):
+        self.vp.delete()
+        self.assertEqual(self._subtree(self.ceo), {'Other'})
+        self.dev.refresh_from_db()
+        self.assertEqual((self.dev.path, self.dev.depth), (f'/{self.lead.id}/{self.dev.id}/', 1))
+
+        Employee.objects.filter(id=self.lead.id).update(manager=self.other)
+        out = StringIO()
+        call_command('rebuild_hierarchy', stdout=out)
+        self.assertIn('Updated 2 employee paths', out.getvalue())
+        self.assertEqual(self._subtree(self.ceo), {'Other', 'Lead', 'Dev'})
+
+    def test_org_summary(self):
+        cycle = ReviewCycle.objects.create(name='C', start_date='2024-01-01', end_date='2024-12-31')
+        for emp, score in ((self.lead, 6), (self.dev, 8), (self.other, 2)):
+            r = Review.objects.create(employee=emp, reviewer=self.ceo, cycle=cycle, review_type='manager', status='submitted')
+            Score.objects.create(review=r, criteria='technical', score=score)
+        Goal.objects.create(employee=self.dev, cycle=cycle, description='g', status='completed', progress=100)
+        self.dev.soft_delete()
+        with self.assertNumQueries(5):
+            data = self.client.get(f'/employees/{self.vp.id}/org-summary').json()
+        self.assertEqual((data['headcount'], data['levels']), (1, 1))
+        self.assertEqual(data['scores'], {'count': 1, 'mean': 6.0, 'min': 6.0, 'max': 6.0})
+        self.assertEqual(data['goals']['total_goals'], 0)
+        self.assertEqual(self.client.get(f'/employees/{self.ceo.id}/org-summary').json()['scores']['count'], 2)
+        self.assertEqual(self.client.get('/employees/999/org-summary').status_code, 404)
+
+class CycleExportTests(TestCase):
+    def setUp(self):
+        self.cycle = ReviewCycle.objects.create(name='C', start_date='2024-01-01', end_date='2024-12-31')
+        self.emps = [Employee.objects.create(name=f'E{i}', email=f'e{i}@example.com', department='Eng') for i in range(7)]
+        for i, e in enumerate(self.emps[:6]):
+            r = Review.objects.create(employee=e, reviewer=e, cycle=self.cycle, review_type='manager', status='submitted')
+            Score.objects.create(review=r, criteria='technical', score=[7, 7, 7, 7, 7, 1][i])
+        Goal.objects.create(employee=self.emps[0], cycle=self.cycle, description='g', status='completed', progress=100)
+
+    def test_csv_stream(self):
+        resp = self.client.get(f'/cycles/{self.cycle.id}/export')
+        self.assertEqual(resp['Content-Type'], 'text/csv')
+        self.assertTrue(resp.streaming)
+        rows = list(csv.DictReader(line.decode() for line in resp.streaming_content))
+        self.assertEqual([int(r['employee_id']) for r in rows], [e.id for e in self.emps])
+        self.assertEqual(rows[0]['final_score'], '7.0')
+        self.assertEqual(rows[0]['weighted_goal_score'], '10.0')
+        self.assertEqual(rows[6]['final_score'], '')
+        self.assertEqual([r['is_outlier'] for r in rows].count('True'), 1)
+        self.assertEqual(rows[5]['is_outlier'], 'True')
+
+    def test_ndjson_command_in_chunks(self):
+        out = StringIO()
+        # outliers (cycle + employees + scores) + iterator + 2 queries per chunk of 3
+        with self.assertNumQueries(3 + 1 + 3 * 2):
+            call_command('export_cycle_results', self.cycle.id, '--format', 'ndjson', '--chunk-size', '3', stdout=out)
+        rows = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual(len(rows), 7)
+        self.assertEqual(rows[0]['final_score'], calculate_final_score(self.emps[0].id, self.cycle.id))
+        self.assertEqual(self.client.get(f'/cycles/{self.cycle.id}/export?output=xml').status_code, 400)
+
+class CycleSnapshotTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.settings_override = override_settings(PERFORMANCE_SNAPSHOT_DIR=tmp.name)
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+
+        self.cycle = ReviewCycle.objects.create(name='C', start_date='2024-01-01', end_date='2024-12-31')
+        self.emps = [Employee.objects.create(name=f'E{i}', email=f'e{i}@example.com', department=d) for i, d in enumerate('AABB')]
+        for e, rtype, score in ((self.emps[0], 'manager', 8), (self.emps[0], 'peer', 6), (self.emps[1], 'self', 5), (self.emps[2], 'manager', 9)):
+            r = Review.objects.create(employee=e, reviewer=e, cycle=self.cycle, review_type=rtype, status='submitted')
+            Score.objects.create(review=r, criteria='technical', score=score)
+        Goal.objects.create(employee=self.emps[1], cycle=self.cycle, description='g', status='completed', progress=150)
+        Goal.objects.create(employee=self.emps[3], cycle=self.cycle, description='g', progress=30)
+
+    def _results(self):
+        ids = [e.id for e in self.emps]
+        return (
+            calculate_final_scores(self.cycle.id),
+            calculate_final_scores(self.cycle.id, Employee.objects.filter(department='A').values('id')),
+            calculate_component_scores(self.cycle.id, ids),
+            calculate_goal_achievements.uncached(self.cycle.id, employee_ids=ids),
+            calculate_goal_achievements.uncached(self.cycle.id, department='B'),
+        )
+
+    def test_close_writes_snapshot_used_by_services(self):
+        live = self._results()
+        self.cycle.status = 'closed'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.cycle.save()
+        snapshot = snapshots.load(self.cycle.id)
+        self.assertEqual(len(snapshot), 4)
+        with CaptureQueriesContext(connection) as ctx:
+            from_snapshot = self._results()
+        self.assertEqual(from_snapshot, live)
+        touched = ' '.join(q['sql'] for q in ctx.captured_queries)
+        for table in ('performance_review', 'performance_score', 'performance_goal'):
+            self.assertNotIn(table, touched)
+
+        # writes to the cycle drop the snapshot, reads go back to the tables
+        Goal.objects.create(employee=self.emps[0], cycle=self.cycle, description='late', progress=10)
+        self.assertIsNone(snapshots.load(self.cycle.id))
+        self.assertEqual(calculate_goal_achievements.uncached(self.cycle.id, employee_ids=[self.emps[0].id])[self.emps[0].id]['total_goals'], 1)
+
+    def test_snapshot_command(self):
+        ReviewCycle.objects.filter(id=self.cycle.id).update(status='closed')
+        out = StringIO()
+        call_command('snapshot_cycles', stdout=out)
+        self.assertIn('C: 4 rows', out.getvalue())
+        self.assertEqual(snapshots.load(self.cycle.id).meta['departments'], ['A', 'B'])
+        call_command('snapshot_cycles', '--discard', stdout=out)
+        self.assertIsNone(snapshots.load(self.cycle.id))
+
+class DatasetTests(TestCase):
+    def test_generate_dataset(self):
+        counts = generate_dataset(employees=40, cycles=2, peers=2, goals=2, users=3, seed=7)
+        self.assertEqual(counts['employees'], 40)
+        self.assertEqual(counts['cycles'], 2)
+        self.assertEqual(counts['goals'], 40 * 2 * 2)
+        self.assertEqual(Review.objects.count(), counts['reviews'])
+        self.assertEqual(Score.objects.count(), counts['reviews'] * 4)
+        self.assertEqual(User.objects.count(), 3)
+        self.assertEqual(set(Review.objects.values_list('review_type', flat=True)), {'self', 'manager', 'peer'})
+        self.assertEqual(list(ReviewCycle.objects.order_by('start_date').values_list('status', flat=True)), ['closed', 'active'])
+        # stored paths agree with the manager chain, departments are inherited from the heads
+        for emp in Employee.objects.select_related('manager'):
+            expected = f'{emp.manager.path}{emp.id}/' if emp.manager else f'/{emp.id}/'
+            self.assertEqual(emp.path, expected)
+            if emp.manager and emp.manager.manager_id:
+                self.assertEqual(emp.department, emp.manager.department)
+        ceo = Employee.objects.get(manager__isnull=True)
+        self.assertEqual(Employee.objects.subtree(ceo.id).count(), 39)
+        self.assertTrue(EmployeeCycleScore.objects.exists())
+        with self.assertRaises(ValueError):
+            generate_dataset(employees=5)
+
+        # new rows after the explicit ids get fresh keys
+        Employee.objects.create(name='New', email='new@example.com', department='Eng')
+
+        result = bench_services(samples=5, cycles=2)
+        self.assertEqual(result['employees_sampled'], 5)
+        self.assertEqual(result['company_employees'], 41)
+        result = bench_endpoints(samples=5)
+        self.assertEqual(sum(v for k, v in result.items() if k.endswith('_errors')), 0)
+        self.assertLessEqual(result['profile_queries_max'], 9)
+
+    def test_ids_start_after_soft_deleted_rows(self):
+        Employee.objects.create(name='A', email='a@example.com', department='Eng')
+        last = Employee.objects.create(name='B', email='b@example.com', department='Eng')
+        cycle = ReviewCycle.objects.create(name='C', start_date='2021-01-01', end_date='2021-03-31')
+        Review.objects.create(employee=last, reviewer=last, cycle=cycle, review_type='self')
+        last.soft_delete()
+        generate_dataset(employees=20, cycles=1)
+        self.assertEqual(Employee.objects.order_by('id').values_list('id', flat=True)[1], last.id + 1)
+
+class SoftDeleteTests(TestCase):
+    def setUp(self):
+        self.boss = Employee.objects.create(name='Boss', email='boss@example.com', department='Eng')
+        self.emp = Employee.objects.create(name='A', email='a@example.com', department='Eng', manager=self.boss)
+        self.cycle = ReviewCycle.objects.create(name='2024 Q4', start_date='2024-10-01', end_date='2024-12-31')
+        self.review = Review.objects.create(employee=self.emp, reviewer=self.boss, cycle=self.cycle, review_type='manager', status='submitted')
+        Score.objects.create(review=self.review, criteria='technical', score=7)
+        self.given = Review.objects.create(employee=self.boss, reviewer=self.emp, cycle=self.cycle, review_type='peer', status='submitted')
+        Goal.objects.create(employee=self.emp, cycle=self.cycle, description='g', progress=50)
+
+    def test_cascading_soft_delete(self):
+        self.emp.soft_delete()
+        self.assertFalse(Employee.objects.filter(id=self.emp.id).exists())
+        self.assertTrue(Employee.all_objects.get(id=self.emp.id).is_deleted)
+        # the employee's reviews and goals are tombstoned, reviews they gave are not
+        self.assertEqual(list(Review.objects.values_list('id', flat=True)), [self.given.id])
+        self.assertEqual(Review.all_objects.dead().get().id, self.review.id)
+        self.assertFalse(Goal.objects.exists())
+        self.assertEqual(Goal.all_objects.count(), 1)
+        # the default manager still sees tombstones (uniqueness validation, related managers)
+        self.assertEqual(Employee._default_manager.count(), 2)
+        self.assertEqual(self.emp.reviews.count(), 1)
+        self.assertEqual(self.client.get(f'/employees/{self.emp.id}/goals').status_code, 404)
+        self.assertEqual(self.client.get(f'/reviews/{self.review.id}').status_code, 404)
+
+        Employee.objects.filter(id=self.boss.id).delete()
+        self.assertFalse(Review.objects.exists())
+
+    def test_failed_cascade_rolls_back(self):
+        def fail(**kwargs):
+            raise RuntimeError('receiver failed')
+        soft_deleted.connect(fail, sender=Employee)
+        self.addCleanup(soft_deleted.disconnect, fail, sender=Employee)
+        with self.assertRaises(RuntimeError):
+            self.emp.soft_delete()
+        self.assertTrue(Employee.objects.filter(id=self.emp.id).exists())
+        self.assertEqual(Review.objects.count(), 2)
+        self.assertEqual(Goal.objects.count(), 1)
+
+    def test_partial_indexes(self):
+        with connection.cursor() as cursor:
+            names = set(connection.introspection.get_constraints(cursor, Review._meta.db_table))
+            names |= set(connection.introspection.get_constraints(cursor, Goal._meta.db_table))
+            names |= set(connection.introspection.get_constraints(cursor, Employee._meta.db_table))
+        for name in ('review_alive_emp_cycle_idx', 'review_alive_cycle_emp_idx', 'goal_alive_cycle_emp_idx',
+                     'goal_alive_emp_created_idx', 'employee_alive_dept_idx', 'employee_alive_manager_idx'):
+            self.assertIn(name, names)
+
+    def test_purge_command(self):
+        self.emp.soft_delete()
+        out = StringIO()
+        call_command('purge_soft_deleted', stdout=out)
+        self.assertIn('employee: purged 0', out.getvalue())
+        for model in (Employee, Review, Goal):
+            model.all_objects.dead().update(updated_at=timezone.now() - timedelta(days=31))
+        out = StringIO()
+        call_command('purge_soft_deleted', '--dry-run', stdout=out)
+        self.assertIn('review: 1 tombstones', out.getvalue())
+        call_command('purge_soft_deleted', '--batch-size', '1', stdout=StringIO())
+        self.assertFalse(Employee.all_objects.filter(id=self.emp.id).exists())
+        self.assertEqual(Review.all_objects.get().id, self.given.id)
+        self.assertIsNone(Review.all_objects.get().reviewer_id)
+        self.assertFalse(Score.objects.exists())
+        self.assertFalse(Goal.all_objects.exists())
+
+    def test_purge_skips_receivers_and_live_dependents(self):
+        self.emp.soft_delete()
+        # deleted before the cascade existed: its review stays live
+        Employee.all_objects.filter(id=self.boss.id).update(is_deleted=True)
+        for model in (Employee, Review, Goal):
+            model.all_objects.dead().update(updated_at=timezone.now() - timedelta(days=31))
+        for criteria in ('communication', 'leadership', 'goals'):
+            Score.objects.create(review=self.review, criteria=criteria, score=6)
+        # raw deletes: no per-row post_delete receivers, so the query count does not grow with the rows
+        with CaptureQueriesContext(connection) as queries, self.settings(PERFORMANCE_CACHE={'ENABLED': True, 'ALIAS': 'performance'}):
+            call_command('purge_soft_deleted', '--model', 'review', '--model', 'goal', stdout=StringIO())
+        self.assertLessEqual(len(queries), 16)
+        self.assertFalse(Score.objects.exists())
+        call_command('purge_soft_deleted', stdout=StringIO())
+        self.assertFalse(Employee.all_objects.filter(id=self.emp.id).exists())
+        self.assertTrue(Employee.all_objects.filter(id=self.boss.id).exists())
+        self.assertEqual(Review.objects.get().id, self.given.id)
+
+class AuditTests(TransactionTestCase):
+    def setUp(self):
+        self.emp = Employee.objects.create(name='A', email='a@example.com', department='Eng')
+        self.cycle = ReviewCycle.objects.create(name='2024 Q4', start_date='2024-10-01', end_date='2024-12-31')
+        self.review = Review.objects.create(employee=self.emp, reviewer=self.emp, cycle=self.cycle, review_type='self')
+        for criteria in ('technical', 'communication', 'leadership', 'goals'):
+            Score.objects.create(review=self.review, criteria=criteria, score=7)
+        Goal.objects.create(employee=self.emp, cycle=self.cycle, description='g', progress=50)
+
+    def entries(self, **filters):
+        return list(AuditLog.objects.filter(**filters).order_by('id'))
+
+    def test_changes_are_logged_per_request_batch(self):
+        self.assertEqual(len(self.entries(action='create')), 7)
+        user = User.objects.create(employee=self.emp, username='u1', role='employee')
+        user.set_password('secret')
+        user.save()
+        token = self.client.post('/auth/login', {'username': 'u1', 'password': 'secret'}, content_type='application/json').json()['token']
+        # real transactions (BEGIN / COMMIT) and an uncached token: still within the view's query budget
+        with CaptureQueriesContext(connection) as queries:
+            resp = self.client.put(f'/reviews/{self.review.id}/submit', HTTP_AUTHORIZATION=f'Token {token}')
+        self.assertEqual(resp.status_code, 200)
+        # one INSERT for the request's entries
+        self.assertEqual(sum('INSERT INTO "performance_auditlog"' in q['sql'] for q in queries.captured_queries), 1)
+        entry, = self.entries(action='update', target_table='performance_review')
+        self.assertEqual(entry.actor_user_id, user.id)
+        self.assertEqual(entry.target_id, self.review.id)
+        self.assertEqual(json.loads(entry.old_value), {'status': 'draft', 'submitted_date': None})
+        self.assertEqual(json.loads(entry.new_value)['status'], 'submitted')
+
+        # unchanged saves and rolled back changes leave no entry
+        review = Review.objects.get(id=self.review.id)
+        review.save()
+        try:
+            with transaction.atomic():
+                review.status = 'draft'
+                review.save()
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        self.assertEqual(len(self.entries(action='update')), 1)
+
+    def test_soft_delete_and_bulk_import(self):
+        self.emp.soft_delete()
+        tables = sorted(e.target_table for e in self.entries(action='soft_delete'))
+        self.assertEqual(tables, ['performance_employee', 'performance_goal', 'performance_review'])
+
+        other = Employee.objects.create(name='B', email='b@example.com', department='Eng')
+        result = bulk_import.import_reviews([{'employee': other.id, 'cycle': self.cycle.id, 'review_type': 'self',
+                                              'scores': [{'criteria': 'technical', 'score': 8}]}])
+        entry = AuditLog.objects.get(action='create', target_table='performance_review', target_id=result['created'][0])
+        self.assertEqual(json.loads(entry.new_value)['scores'], [{'criteria': 'technical', 'score': 8}])
+
+    def test_bounded_flusher_applies_backpressure(self):
+        with override_settings(PERFORMANCE_AUDIT={'BACKGROUND': False, 'QUEUE_SIZE': 2, 'BATCH_SIZE': 2}):
+            flusher = audit.AuditFlusher()
+            flusher.submit([AuditLog(action='test', target_table='t', target_id=i) for i in range(5)])
+            self.assertEqual(flusher.flush(), 0)
+        self.assertEqual(AuditLog.objects.filter(action='test').count(), 5)
+
+    def test_loaded_values_only_kept_while_enabled(self):
+        self.assertEqual(Review.objects.get(id=self.review.id)._loaded_values['status'], 'draft')
+        with override_settings(PERFORMANCE_AUDIT={'ENABLED': False}):
+            self.assertFalse(hasattr(Review.objects.get(id=self.review.id), '_loaded_values'))
+
+    def test_failed_background_write_is_retried(self):
+        with override_settings(PERFORMANCE_AUDIT={'BACKGROUND': False, 'FLUSH_INTERVAL': 0, 'RETRIES': 1}):
+            flusher = audit.AuditFlusher()
+            flusher._ensure_started()
+            write, failures = audit._write, []
+
+            def flaky_write(entries):
+                if failures:
+                    raise failures.pop()
+                if any(e.target_id == 99 for e in entries):
+                    raise IntegrityError('bad entry')
+                write(entries)
+
+            def enqueue(*target_ids):
+                for i in target_ids:
+                    flusher._queue.put(AuditLog(action='test', target_table='t', target_id=i))
+            with mock.patch.object(audit, '_write', side_effect=flaky_write):
+                # transient error: retried in place
+                enqueue(0, 1, 2)
+                failures.append(OperationalError('database is locked'))
+                with self.assertLogs('performance.audit', 'WARNING'):
+                    self.assertEqual(flusher._flush_next(), 3)
+                # permanent error: not retried, only the bad entry is dropped
+                enqueue(3, 99, 4)
+                with self.assertLogs('performance.audit', 'ERROR') as logs:
+                    self.assertEqual(flusher._flush_next(), 2)
+                self.assertIn('audit entry dropped: test t #99', logs.output[-1])
+                # still failing after RETRIES: written one by one
+                enqueue(5)
+                failures.extend([OperationalError('database is locked')] * 2)
+                with self.assertLogs('performance.audit', 'WARNING'):
+                    self.assertEqual(flusher._flush_next(), 1)
+        self.assertEqual(sorted(AuditLog.objects.filter(action='test').values_list('target_id', flat=True)), [0, 1, 2, 3, 4, 5])
+
+class AuditArchiveTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.settings_override = override_settings(PERFORMANCE_AUDIT_ARCHIVE={'DIR': tmp.name, 'RETENTION_DAYS': 30, 'BATCH_SIZE': 2})
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+        jan, feb = datetime(2024, 1, 10, tzinfo=dt_timezone.utc), datetime(2024, 2, 10, tzinfo=dt_timezone.utc)
+        for when, target_id in ((jan, 1), (jan + timedelta(days=1), 2), (jan + timedelta(days=2), 1), (feb, 1), (feb, 3)):
+            AuditLog.objects.create(action='update', target_table='performance_review', target_id=target_id, new_value='{}', created_at=when)
+        self.live = AuditLog.objects.create(action='update', target_table='performance_review', target_id=1)
+        # legacy row without a timestamp
+        AuditLog.objects.create(action='update', target_table='performance_review', target_id=1, created_at=None)
+
+    def history(self, **kwargs):
+        return [(r['id'], r['archived']) for r in audit_archive.search(**kwargs)]
+
+    def test_archive_and_search(self):
+        expected = self.history(target_table='performance_review', target_id=1)
+        out = StringIO()
+        call_command('archive_audit_log', stdout=out)
+        self.assertIn('Archived 5 rows', out.getvalue())
+        self.assertEqual(list(AuditLog.objects.filter(created_at__isnull=False).values_list('id', flat=True)), [self.live.id])
+        self.assertEqual(audit_archive.months(), ['2024-01', '2024-02'])
+
+        # same entries, newest first, now mostly served from the archive
+        history = self.history(target_table='performance_review', target_id=1)
+        self.assertEqual([i for i, _ in history], [i for i, _ in expected])
+        self.assertEqual([a for _, a in history], [False, True, True, True])
+        self.assertEqual(len(self.history(target_table='performance_review', target_id=3)), 1)
+        self.assertEqual(len(self.history(limit=2)), 2)
+        self.assertEqual(len(self.history(since=datetime(2024, 1, 11, tzinfo=dt_timezone.utc),
+                                          until=datetime(2024, 2, 1, tzinfo=dt_timezone.utc))), 2)
+
+        # rows archived twice (interrupted run) are returned once and dropped by compaction
+        row = audit_archive.search(target_id=3)[0]
+        audit_archive._append('2024-02', [{k: row[k] for k in audit_archive.FIELDS}])
+        self.assertEqual(len(self.history(target_id=3)), 1)
+        self.assertEqual(audit_archive.compact('2024-02'), 2)
+        self.assertEqual(len(self.history(limit=None)), 6)
+
+        # HR only: the entries hold old / new values with names and emails
+        path = '/internal/audit?target_table=performance_review&target_id=1&limit=2'
+        self.assertEqual(self.client.get(path).status_code, 401)
+        for role in ('employee', 'hr'):
+            user = User.objects.create(username=role, role=role)
+            AuthToken.objects.create(user=user, token=role, expires_at=timezone.now() + timedelta(hours=1))
+        self.assertEqual(self.client.get(path, HTTP_AUTHORIZATION='Token employee').status_code, 403)
+        resp = self.client.get(path, HTTP_AUTHORIZATION='Token hr')
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual([r['id'] for r in resp.json()['results']], [i for i, _ in expected[:2]])
+        self.assertEqual(self.client.get('/internal/audit?since=yesterday', HTTP_AUTHORIZATION='Token hr').status_code, 400)
+
+    def test_archive_after_torn_index_line(self):
+        # an interrupted run left half an index line without a newline
+        _, index_path = audit_archive._paths('2024-01')
+        os.makedirs(os.path.dirname(index_path), exist_ok=True)
+        with open(index_path, 'w') as f:
+            f.write('{"offset": 0, "len')
+        self.assertEqual(audit_archive.archive(), 5)
+        self.assertEqual(len(audit_archive._index('2024-01')), 2)
+        self.assertEqual(len(self.history(limit=None)), 6)
+
+class DepartmentSummaryTests(TestCase):
+    def setUp(self):
+        self.cycle = ReviewCycle.objects.create(name='2024 Q4', start_date='2024-10-01', end_date='2024-12-31')
+        self.emps = [Employee.objects.create(name=f'E{i}', email=f'e{i}@example.com', department='Eng') for i in range(4)]
+        Employee.objects.create(name='S', email='s@example.com', department='Sales')
+        for i, e in enumerate(self.emps[:3]):
+            r = Review.objects.create(employee=e, reviewer=e, cycle=self.cycle, review_type='manager', status='submitted')
+            Score.objects.create(review=r, criteria='technical', score=5 + i)
+        Review.objects.create(employee=self.emps[3], reviewer=self.emps[3], cycle=self.cycle, review_type='manager')
+        Goal.objects.create(employee=self.emps[0], cycle=self.cycle, description='a', status='completed', progress=120)
+        Goal.objects.create(employee=self.emps[1], cycle=self.cycle, description='b', progress=40)
+
+    def test_summary(self):
+        with self.assertNumQueries(5):
+            data = self.client.get(f'/departments/Eng/summary?cycle_id={self.cycle.id}').json()
+        self.assertEqual(data['total_employees'], 4)
+        self.assertEqual(data['scores']['count'], 3)
+        self.assertEqual((data['scores']['mean'], data['scores']['median']), (6.0, 6.0))
+        self.assertEqual([b['count'] for b in data['scores']['histogram']][5:8], [1, 1, 1])
+        self.assertEqual(data['review_completion']['manager'], {'total': 4, 'submitted': 3, 'completion_rate': 0.75})
+        self.assertEqual(data['review_completion']['peer']['total'], 0)
+        self.assertEqual(data['goals']['total_goals'], 2)
+        self.assertEqual(data['goals']['avg_progress'], 0.7)
+        self.assertEqual(data['goals']['weighted_goal_score'], round((0.7 * 0.5 + 0.3 * 0.7) * 10, 2))
+        self.assertEqual(self.client.get('/departments/Eng/summary?cycle_id=999').status_code, 404)
+
+class ProfilingTests(TestCase):
+    def setUp(self):
+        view_metrics.reset()
+        self.emp = Employee.objects.create(name='A', email='a@example.com', department='Eng')
+        cycle = ReviewCycle.objects.create(name='C', start_date='2024-01-01', end_date='2024-12-31')
+        Review.objects.create(employee=self.emp, reviewer=self.emp, cycle=cycle, review_type='self')
+
+    def test_profiles_and_metrics(self):
+        with profile_requests() as profiles:
+            for _ in range(3):
+                self.client.get(f'/employees/{self.emp.id}/reviews')
+        profile = profiles[0]
+        self.assertEqual((profile.view, profile.queries, profile.budget), ('performance.views.employee_reviews', 3, 4))
+        self.assertEqual(len(profile.slowest_queries), 3)
+        self.assertGreater(profile.render_time, 0)
+
+        # slowest SQL and latencies are internal: HR only
+        self.assertEqual(self.client.get('/internal/metrics').status_code, 401)
+        data = self.client.get('/internal/metrics', **hr_auth()).json()['performance.views.employee_reviews']
+        self.assertEqual((data['requests'], data['query_budget'], data['over_budget']), (3, 4, 0))
+        self.assertEqual(data['queries']['buckets']['<=3'], 3)
+        self.assertEqual(sum(data['latency_ms']['buckets'].values()), 3)
+
+    def test_budget_exceeded(self):
+        # the suite runs with RAISE_ON_BUDGET (performance.test_runner)
+        with mock.patch.object(views.employee_reviews, 'query_budget', 2):
+            with self.assertLogs('performance.profiling', 'WARNING'), self.assertRaises(QueryBudgetExceeded):
+                self.client.get(f'/employees/{self.emp.id}/reviews')
+            with override_settings(PERFORMANCE_PROFILING={'RAISE_ON_BUDGET': False}), self.assertLogs('performance.profiling', 'WARNING') as logs:
+                self.assertEqual(self.client.get(f'/employees/{self.emp.id}/reviews').status_code, 200)
+        self.assertIn('ran 3 queries (budget 2)', logs.output[0])
+        self.assertEqual(view_metrics.as_dict()['performance.views.employee_reviews']['over_budget'], 2)
+
+    def test_transaction_control_is_not_counted(self):
+        profile = RequestProfile()
+        for sql in ('BEGIN', 'SAVEPOINT "s1"', 'RELEASE SAVEPOINT "s1"', 'COMMIT', 'SELECT 1'):
+            profile.add_query(sql, 0.001)
+        self.assertEqual(profile.queries, 1)
+        self.assertAlmostEqual(profile.db_time, 0.005)
+
+@override_settings(PERFORMANCE_CACHE={'ENABLED': True, 'ALIAS': 'performance', 'TIMEOUT': 300})
+class ServiceCacheTests(TestCase):
+    def setUp(self):
+        caches['performance'].clear()
+        perf_cache.stats.reset()
+        self.emp = Employee.objects.create(name='A', email='a@example.com', department='Eng')
+        self.other = Employee.objects.create(name='B', email='b@example.com', department='Eng')
+        self.cycle = ReviewCycle.objects.create(name='2024 Q4', start_date='2024-10-01', end_date='2024-12-31')
+        self.review = Review.objects.create(employee=self.emp, reviewer=self.emp, cycle=self.cycle, review_type='manager', status='submitted')
+        Score.objects.create(review=self.review, criteria='technical', score=6)
+
+    def test_hit_and_targeted_invalidation(self):
+        self.assertEqual(calculate_final_score(self.emp.id, self.cycle.id), 6.0)
+        calculate_final_score(self.other.id, self.cycle.id)
+        with self.assertNumQueries(0):
+            self.assertEqual(calculate_final_score(self.emp.id, self.cycle.id), 6.0)
+        self.assertEqual(perf_cache.stats.as_dict()['hits'], 1)
+
+        Score.objects.create(review=self.review, criteria='goals', score=8)
+        with self.assertNumQueries(0):
+            calculate_final_score(self.other.id, self.cycle.id)  # unrelated employee stays cached
+        self.assertEqual(calculate_final_score(self.emp.id, self.cycle.id), 7.0)
+
+        summary = summarize_department('Eng')
+        Review.objects.filter(id=self.review.id).delete()
+        self.assertEqual(calculate_final_score(self.emp.id, self.cycle.id), None)
+        self.assertNotEqual(summarize_department('Eng'), summary)
+        self.assertEqual(self.client.get('/internal/cache-stats').status_code, 401)
+        self.assertGreater(self.client.get('/internal/cache-stats', **hr_auth()).json()['invalidations'], 0)
+
+    def test_default_follows_backend(self):
+        with self.settings(PERFORMANCE_CACHE={'ALIAS': 'performance'}):
+            self.assertFalse(perf_cache._config()['ENABLED'])  # per-process LocMemCache
+        with self.settings(PERFORMANCE_CACHE={'ALIAS': 'shared'},
+                           CACHES={'shared': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': tempfile.gettempdir()}}):
+            self.assertTrue(perf_cache._config()['ENABLED'])
+
+    def test_invalidated_again_on_commit(self):
+        self.assertEqual(calculate_final_score(self.emp.id, self.cycle.id), 6.0)
+        key = perf_cache._scope_key(('employee', self.emp.id))
+        with self.captureOnCommitCallbacks(execute=True):
+            Score.objects.create(review=self.review, criteria='goals', score=8)
+            # other requests could still cache pre-commit data under this generation
+            generation = caches['performance'].get(key)
+        self.assertNotEqual(caches['performance'].get(key), generation)
+
+class TokenAuthTests(TestCase):
+    def setUp(self):
+        token_cache.clear()
+        self.user = User(username='u1', role='employee')
+        self.user.set_password('secret')
+        self.user.save()
+        self.token = self.client.post('/auth/login', {'username': 'u1', 'password': 'secret'}).json()['token']
+
+    def _authenticate(self, token):
+        request = APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'Token {token}')
+        return AuthTokenAuthentication().authenticate(request)
+
+    def test_cached_lookup_and_logout(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(self._authenticate(self.token)[0].id, self.user.id)
+        with self.assertNumQueries(0):
+            self._authenticate(self.token)
+        self.client.post('/auth/logout', HTTP_AUTHORIZATION=f'Token {self.token}')
+        with self.assertRaises(AuthenticationFailed):
+            self._authenticate(self.token)
+
+    def test_expiry_and_sweep(self):
+        AuthToken.objects.filter(token=self.token).update(expires_at=timezone.now() - timedelta(minutes=1))
+        with self.assertRaises(AuthenticationFailed):
+            self._authenticate(self.token)
+        AuthToken.objects.create(user=self.user, token='live', expires_at=timezone.now() + timedelta(hours=1))
+        call_command('sweep_auth_tokens', '--batch-size', '1', stdout=StringIO())
+        self.assertEqual(list(AuthToken.objects.values_list('token', flat=True)), ['live'])
+
+@override_settings(PASSWORD_HASH_ITERATIONS=1000)
+class LoginPipelineTests(TestCase):
+    def setUp(self):
+        self.user = User(username='u1', role='employee')
+        with self.settings(PASSWORD_HASH_ITERATIONS=2000):
+            self.user.set_password('secret')
+        self.user.save()
+
+    def test_rehash_on_login(self):
+        self.assertEqual(self.client.post('/auth/login', {'username': 'u1', 'password': 'nope'}).status_code, 401)
+        self.assertIn('$2000$', User.objects.get().password_hash)
+        self.assertEqual(self.client.post('/auth/login', {'username': 'u1', 'password': 'secret'}).status_code, 200)
+        self.assertIn('$1000$', User.objects.get().password_hash)
+
+    async def test_async_login(self):
+        client = AsyncClient()
+        resp = await client.post('/auth/login', {'username': 'u1', 'password': 'secret'}, content_type='application/json')
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json()['role'], 'employee')
+        self.assertTrue(await AuthToken.objects.filter(token=resp.json()['token']).aexists())
+        self.assertIn('$1000$', (await User.objects.aget()).password_hash)
+        resp = await client.post('/auth/login', {'username': 'u1', 'password': 'bad'}, content_type='application/json')
+        self.assertEqual(resp.status_code, 401)
+        resp = await client.post('/auth/login', {'username': 'nobody', 'password': 'bad'}, content_type='application/json')
+        self.assertEqual(resp.status_code, 404)
+
+@override_settings(PERFORMANCE_ASYNC_PARALLEL_QUERIES=False)
+class AsyncViewTests(TestCase):
+    def setUp(self):
+        self.emp = Employee.objects.create(name='A', email='a@example.com', department='Eng')
+        self.cycle = ReviewCycle.objects.create(name='2024 Q4', start_date='2024-10-01', end_date='2024-12-31')
+        self.review = Review.objects.create(employee=self.emp, reviewer=self.emp, cycle=self.cycle, review_type='manager', status='submitted')
+        Score.objects.create(review=self.review, criteria='technical', score=7)
+        Goal.objects.create(employee=self.emp, cycle=self.cycle, description='g', progress=50)
+
+    async def test_async_matches_sync(self):
+        client = AsyncClient()
+        for path in (f'/reviews/{self.review.id}', f'/employees/{self.emp.id}/reviews', f'/employees/{self.emp.id}/reviews?page_size=1&fields=id,scores',
+                     f'/employees/{self.emp.id}/goals', f'/employees/{self.emp.id}/performance-trend?cycles=2', '/departments/Eng/summary'):
+            async_resp = await client.get(path)
+            sync_resp = await sync_to_async(self.client.get)(path)
+            self.assertEqual(async_resp.status_code, 200, path)
+            self.assertEqual(async_resp.json(), sync_resp.json(), path)
+            self.assertNotIn('Allow', async_resp.headers)  # served by async_views, not DRF
+        self.assertEqual((await client.get('/employees/999/reviews')).status_code, 404)
+        self.assertEqual((await client.get(f'/employees/{self.emp.id}/reviews?fields=bad')).status_code, 400)
+
+    async def test_async_views_authenticate(self):
+        client = AsyncClient()
+        path = f'/reviews/{self.review.id}'
+        for token in ('bogus', 'expired'):
+            if token == 'expired':
+                user = await User.objects.acreate(username='u1', role='employee')
+                await AuthToken.objects.acreate(user=user, token=token, expires_at=timezone.now() - timedelta(minutes=1))
+            resp = await client.get(path, headers={'Authorization': f'Token {token}'})
+            self.assertEqual(resp.status_code, 401, token)
+            self.assertEqual(resp.headers['WWW-Authenticate'], 'Token')
+            self.assertEqual((await sync_to_async(self.client.get)(path, HTTP_AUTHORIZATION=f'Token {token}')).status_code, 401)
+        await AuthToken.objects.acreate(user=user, token='live', expires_at=timezone.now() + timedelta(hours=1))
+        self.assertEqual((await client.get(path, headers={'Authorization': 'Token live'})).status_code, 200)
+
+@override_settings(PERFORMANCE_ASYNC_PARALLEL_QUERIES=True)
+class AsyncParallelQueryTests(TransactionTestCase):
+    # the production default: callables run on their own worker thread and DB connection
+    def setUp(self):
+        self.emp = Employee.objects.create(name='A', email='a@example.com', department='Eng')
+        cycle = ReviewCycle.objects.create(name='2024 Q4', start_date='2024-10-01', end_date='2024-12-31')
+        review = Review.objects.create(employee=self.emp, reviewer=self.emp, cycle=cycle, review_type='manager', status='submitted')
+        Score.objects.create(review=review, criteria='technical', score=7)
+
+    async def test_parallel_queries_close_their_connections(self):
+        closed = []
+        real = async_views.connection
+
+        class Spy:
+            def __getattr__(self, name):
+                return getattr(real, name)
+
+            def close(self):
+                closed.append(threading.get_ident())
+                real.close()
+        client = AsyncClient()
+        with mock.patch.object(async_views, 'connection', Spy()):
+            for path in (f'/employees/{self.emp.id}/reviews', f'/employees/{self.emp.id}/performance-trend?cycles=1'):
+                async_resp = await client.get(path)
+                self.assertEqual(async_resp.status_code, 200, path)
+                self.assertEqual(async_resp.json(), (await sync_to_async(self.client.get)(path)).json(), path)
+        # one worker thread per callable, each closing the connection it opened
+        self.assertEqual(len(closed), 2)
+        self.assertNotIn(threading.get_ident(), closed)
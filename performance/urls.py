@@ -7,10 +7,18 @@ urlpatterns = [
     path('auth/logout', views.logout),
     path('reviews', views.create_review), 
     path('reviews/bulk-import', views.reviews_bulk_import),
+    path('reviews/bulk-import/<uuid:job_id>', views.bulk_import_job),
     path('reviews/<int:id>', views.get_review),
     path('reviews/<int:id>/submit', views.submit_review),
     path('employees/<int:id>/reviews', views.employee_reviews),
-    path('employees/<int:id>/performance-trend', views.get_performance_trend), 
+    path('employees/performance-trend', views.performance_trends),
+    path('employees/<int:id>/performance-trend', views.performance_trend),
     path('employees/<int:id>/goals', views.employee_goals),
+    path('employees/<int:id>/profile', views.employee_profile),
+    path('employees/<int:id>/org-summary', views.org_summary),
     path('departments/<str:dept>/summary', views.department_summary),
+    path('cycles/<int:id>/export', views.cycle_export),
+    path('internal/cache-stats', views.cache_stats),
+    path('internal/metrics', views.metrics),
+    path('internal/audit', views.audit_search),
 ]
@@ -4,38 +4,48 @@ from rest_framework.response import Response
 from rest_framework import status
 from django.shortcuts import get_object_or_404
 from django.db import transaction
-from .models import Employee, Review, Score, Goal, ReviewCycle, User
-from .serializers import ReviewSerializer, EmployeeSerializer, GoalSerializer
+from django.db.models import Prefetch
+from .models import Employee, Review, Score, Goal, ReviewCycle, User, ImportJob
+from .serializers import ReviewSerializer, EmployeeSerializer, GoalSerializer, ImportJobSerializer
 from .auth_models import AuthToken
+from .authentication import get_token_from_request, token_cache, verify_password, issue_token
+from .rollups import refresh_employee_scores
 from django.utils import timezone
-import uuid
+from django.utils.dateparse import parse_datetime
+import io
 from .services import *
-from django.http import JsonResponse
+from . import audit_archive, bulk_import, exports, jobs
+from . import cache as perf_cache
+from .pagination import KeysetPagination
+from .permissions import IsHR
+from .profiling import query_budget, metrics as view_metrics
+from django.http import JsonResponse, StreamingHttpResponse
 
 def home(request):
     return JsonResponse({"message": "Welcome to TechCorp Performance Management API"})
 
 
+@query_budget(4)
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def login(request):
     username = request.data.get('username')
     password = request.data.get('password')
     user = get_object_or_404(User, username=username)
-    # verify password - if using Django's hasher:
-    from django.contrib.auth.hashers import check_password
-    if not check_password(password, user.password_hash):
+    # verify password with the configured hasher; outdated hashes are upgraded transparently
+    if not verify_password(user, password):
         return Response({'detail':'Invalid credentials'}, status=status.HTTP_401_UNAUTHORIZED)
-    token = str(uuid.uuid4())
-    AuthToken.objects.create(user=user, token=token)
-    return Response({'token': token, 'role': user.role})
+    token, expires_at = issue_token(user)
+    return Response({'token': token, 'role': user.role, 'expires_at': expires_at})
 
+@query_budget(2)
 @api_view(['POST'])
 def logout(request):
-    token = request.headers.get('Authorization')
+    token = get_token_from_request(request)
     if not token:
         return Response({'detail':'No token provided'}, status=status.HTTP_400_BAD_REQUEST)
     AuthToken.objects.filter(token=token).delete()
+    token_cache.delete(token)
     return Response({'detail':'logged out'})
 
 
@@ -49,7 +59,7 @@ def create_review(request):
         reviewer = serializer.validated_data['reviewer']
         cycle = serializer.validated_data['cycle']
         review_type = serializer.validated_data['review_type']
-        exists = Review.objects.filter(employee=employee, reviewer=reviewer, cycle=cycle, review_type=review_type, is_deleted=False).exists()
+        exists = Review.objects.filter(employee=employee, reviewer=reviewer, cycle=cycle, review_type=review_type).exists()
         if exists:
             return Response({'detail':'Duplicate review exists'}, status=status.HTTP_400_BAD_REQUEST)
         review = serializer.save()
@@ -57,9 +67,10 @@ def create_review(request):
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 # Submit completed review
+@query_budget(9)
 @api_view(['PUT'])
 def submit_review(request, id):
-    review = get_object_or_404(Review, id=id, is_deleted=False)
+    review = get_object_or_404(Review.objects, id=id)
     if review.status == 'submitted':
         return Response({'detail':'Already submitted'}, status=status.HTTP_400_BAD_REQUEST)
     # Validate scores exist and have all four criteria
@@ -71,40 +82,174 @@ def submit_review(request, id):
     review.status = 'submitted'
     review.submitted_date = timezone.now()
     review.save()
-    # log audit (could be implemented via signal)
+    refresh_employee_scores([(review.employee_id, review.cycle_id)])
+    # the status change is audited by performance.audit (post_save) and written with the request's batch
     return Response({'detail':'submitted'})
 
 # Get review details
+@query_budget(3)
 @api_view(['GET'])
 def get_review(request, id):
-    review = get_object_or_404(Review, id=id, is_deleted=False)
+    review = get_object_or_404(ReviewSerializer.setup_eager_loading(Review.objects), id=id)
     return Response(ReviewSerializer(review).data)
 
 # Get employee's review history
+# ?fields=id,status,cycle projects the response; ?page_size / ?cursor switch to keyset pagination
+@query_budget(4)
 @api_view(['GET'])
 def employee_reviews(request, id):
-    employee = get_object_or_404(Employee, id=id, is_deleted=False)
-    reviews = Review.objects.filter(employee=employee, is_deleted=False).order_by('-cycle__start_date')
-    return Response(ReviewSerializer(reviews, many=True).data)
+    employee = get_object_or_404(Employee.objects, id=id)
+    fields = ReviewSerializer.parse_fields(request.query_params.get('fields'))
+    reviews = ReviewSerializer.setup_eager_loading(
+        Review.objects.filter(employee=employee).order_by('-cycle__start_date', '-id'), fields
+    )
+    return _list_response(request, reviews, ReviewSerializer, fields, ('-cycle__start_date', '-id'))
 
-# Employee goals
+def _list_response(request, queryset, serializer_class, fields, ordering):
+    if KeysetPagination.is_requested(request):
+        paginator = KeysetPagination(ordering)
+        page = paginator.paginate_queryset(queryset, request)
+        return paginator.get_paginated_response(serializer_class(page, many=True, fields=fields).data)
+    return Response(serializer_class(queryset, many=True, fields=fields).data)
+
+def _num_cycles(request):
+    # ?cycles=N for trend endpoints, capped to keep responses bounded
+    value = request.query_params.get('cycles', 3)
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        return None
+    return value if 1 <= value <= MAX_TREND_CYCLES else None
+
+MAX_TREND_CYCLES = 50
+
+# Employee performance trend over the last ?cycles=N cycles
+@query_budget(4)
+@api_view(['GET'])
+def performance_trend(request, id):
+    employee = get_object_or_404(Employee.objects, id=id)
+    num_cycles = _num_cycles(request)
+    if num_cycles is None:
+        return Response({'detail': f'cycles must be an integer between 1 and {MAX_TREND_CYCLES}'}, status=status.HTTP_400_BAD_REQUEST)
+    return Response({'employee_id': employee.id, 'trend': get_performance_trend(employee.id, num_cycles)})
+
+# Batch trends: ?employee_ids=1,2,3&cycles=N
+@query_budget(4)
+@api_view(['GET'])
+def performance_trends(request):
+    num_cycles = _num_cycles(request)
+    if num_cycles is None:
+        return Response({'detail': f'cycles must be an integer between 1 and {MAX_TREND_CYCLES}'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        employee_ids = [int(v) for v in request.query_params.get('employee_ids', '').split(',') if v.strip()]
+    except ValueError:
+        return Response({'detail':'employee_ids must be a comma separated list of ids'}, status=status.HTTP_400_BAD_REQUEST)
+    employee_ids = list(Employee.objects.filter(id__in=employee_ids).order_by('id').values_list('id', flat=True))
+    trends = get_performance_trends(employee_ids, num_cycles)
+    return Response({'results': [{'employee_id': eid, 'trend': trends[eid]} for eid in employee_ids]})
+
+# Employee goals (same ?fields / ?page_size / ?cursor parameters as employee_reviews)
+@query_budget(3)
 @api_view(['GET'])
 def employee_goals(request, id):
-    employee = get_object_or_404(Employee, id=id, is_deleted=False)
-    goals = Goal.objects.filter(employee=employee, is_deleted=False).order_by('-created_at')
-    return Response(GoalSerializer(goals, many=True).data)
+    employee = get_object_or_404(Employee.objects, id=id)
+    fields = GoalSerializer.parse_fields(request.query_params.get('fields'))
+    goals = GoalSerializer.setup_eager_loading(
+        Goal.objects.filter(employee=employee).order_by('-created_at', '-id'), fields
+    )
+    return _list_response(request, goals, GoalSerializer, fields, ('-created_at', '-id'))
+
+# Employee profile page in one request: employee + manager, reviews, goals, ?cycles=N trend and
+# goal achievement for the current (latest) cycle, with a fixed number of queries
+@query_budget(9)
+@api_view(['GET'])
+def employee_profile(request, id):
+    num_cycles = _num_cycles(request)
+    if num_cycles is None:
+        return Response({'detail': f'cycles must be an integer between 1 and {MAX_TREND_CYCLES}'}, status=status.HTTP_400_BAD_REQUEST)
+    employees = Employee.objects.select_related('manager').prefetch_related(
+        Prefetch('reviews', to_attr='profile_reviews', queryset=ReviewSerializer.setup_eager_loading(
+            Review.objects.order_by('-cycle__start_date', '-id'))),
+        Prefetch('goals', to_attr='profile_goals', queryset=GoalSerializer.setup_eager_loading(
+            Goal.objects.order_by('-created_at', '-id'))),
+    )
+    employee = get_object_or_404(employees, id=id)
+    manager = employee.manager if employee.manager and not employee.manager.is_deleted else None
+    cycle = ReviewCycle.objects.order_by('-start_date').first()
+    return Response({
+        'employee': EmployeeSerializer(employee).data,
+        'manager': {'id': manager.id, 'name': manager.name, 'email': manager.email, 'role': manager.role} if manager else None,
+        'reviews': ReviewSerializer(employee.profile_reviews, many=True).data,
+        'goals': GoalSerializer(employee.profile_goals, many=True).data,
+        'trend': get_performance_trend(employee.id, num_cycles),
+        'current_cycle': {'id': cycle.id, 'name': cycle.name} if cycle else None,
+        'goal_achievement': calculate_goal_achievement(employee.id, cycle.id) if cycle else None,
+    })
 
-# Department summary (simple)
+# Department summary: headcount, score distribution, review completion and goal stats for ?cycle_id (default latest)
+@query_budget(6)
 @api_view(['GET'])
 def department_summary(request, dept):
-    from django.db.models import Avg
-    employees = Employee.objects.filter(department=dept, is_deleted=False)
-    total = employees.count()
-    return Response({'department': dept, 'total_employees': total})
+    cycle_id = request.query_params.get('cycle_id')
+    if cycle_id is not None and not cycle_id.isdigit():
+        return Response({'detail':'cycle_id must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+    cycle_id = int(cycle_id) if cycle_id is not None else None
+
+    summary = summarize_department(dept, cycle_id)
+    if summary is None:
+        return Response({'detail':'Cycle not found'}, status=status.HTTP_404_NOT_FOUND)
+    return Response(summary)
+
+# Org rollup for everyone below a manager: headcount, final scores and goal stats for ?cycle_id (default latest)
+@query_budget(6)
+@api_view(['GET'])
+def org_summary(request, id):
+    cycle_id = request.query_params.get('cycle_id')
+    if cycle_id is not None and not cycle_id.isdigit():
+        return Response({'detail':'cycle_id must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+    cycle_id = int(cycle_id) if cycle_id is not None else None
+
+    summary = summarize_org(id, cycle_id)
+    if summary is None:
+        return Response({'detail':'Not found'}, status=status.HTTP_404_NOT_FOUND)
+    return Response(summary)
+
+# Cycle results export for every active employee (optionally ?department=), streamed as ?output=csv (default) or ndjson
+@api_view(['GET'])
+def cycle_export(request, id):
+    cycle = get_object_or_404(ReviewCycle, id=id)
+    fmt = request.query_params.get('output', 'csv')
+    if fmt not in exports.FORMATS:
+        return Response({'detail': f"output must be one of: {', '.join(exports.FORMATS)}"}, status=status.HTTP_400_BAD_REQUEST)
+    response = StreamingHttpResponse(
+        exports.export_cycle_results(cycle.id, fmt, department=request.query_params.get('department')),
+        content_type=exports.FORMATS[fmt],
+    )
+    response['Content-Disposition'] = f'attachment; filename="cycle-{cycle.id}-results.{fmt}"'
+    return response
 
 # Bulk import reviews (JSON)
+# ?mode=stream (or an application/x-ndjson body) switches to the chunked importer in performance.bulk_import,
+# ?mode=async stores the body and runs the chunked importer as a background job
 @api_view(['POST'])
 def reviews_bulk_import(request):
+    ndjson = request.content_type.startswith('application/x-ndjson')
+    mode = request.query_params.get('mode')
+    if ndjson or mode in ('stream', 'async'):
+        try:
+            batch_size = int(request.query_params.get('batch_size') or bulk_import.default_batch_size())
+        except ValueError:
+            return Response({'detail':'batch_size must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        stream = request.stream or io.BytesIO()
+        if mode == 'async':
+            job = jobs.submit_import(stream, request.content_type, batch_size=max(1, batch_size))
+            return Response(ImportJobSerializer(job).data, status=status.HTTP_202_ACCEPTED,
+                            headers={'Location': f'/reviews/bulk-import/{job.id}'})
+        items = bulk_import.iter_ndjson(stream) if ndjson else bulk_import.iter_json_items(stream)
+        result = bulk_import.import_reviews(items, batch_size=max(1, batch_size))
+        # a malformed body still reports what was imported before the parse error
+        return Response(result, status=status.HTTP_400_BAD_REQUEST if 'detail' in result else status.HTTP_200_OK)
+
     data = request.data
     reviews = data.get('reviews', [])
     created = []
@@ -118,7 +263,7 @@ def reviews_bulk_import(request):
                     reviewer = serializer.validated_data['reviewer']
                     cycle = serializer.validated_data['cycle']
                     review_type = serializer.validated_data['review_type']
-                    if Review.objects.filter(employee=employee, reviewer=reviewer, cycle=cycle, review_type=review_type, is_deleted=False).exists():
+                    if Review.objects.filter(employee=employee, reviewer=reviewer, cycle=cycle, review_type=review_type).exists():
                         errors.append({'item': r, 'error':'duplicate'})
                         continue
                     review = serializer.save()
@@ -128,3 +273,45 @@ def reviews_bulk_import(request):
         else:
             errors.append({'item': r, 'error': serializer.errors})
     return Response({'created': created, 'errors': errors})
+
+# Bulk import job progress
+@query_budget(2)
+@api_view(['GET'])
+def bulk_import_job(request, job_id):
+    job = get_object_or_404(ImportJob, id=job_id)
+    return Response(ImportJobSerializer(job).data)
+
+# Score service cache counters
+@query_budget(2)
+@api_view(['GET'])
+@permission_classes([IsHR])
+def cache_stats(request):
+    return Response(perf_cache.stats.as_dict())
+
+# Audit trail search over the live AuditLog table and the compressed archives (performance.audit_archive); HR only
+@query_budget(2)
+@api_view(['GET'])
+@permission_classes([IsHR])
+def audit_search(request):
+    params = request.query_params
+    try:
+        target_id = int(params['target_id']) if params.get('target_id') else None
+        limit = min(int(params.get('limit', 100)), 1000)
+        bounds = {k: parse_datetime(params[k]) if params.get(k) else None for k in ('since', 'until')}
+    except ValueError:
+        return Response({'detail':'target_id and limit must be integers, since / until ISO datetimes'}, status=status.HTTP_400_BAD_REQUEST)
+    if any(params.get(k) and v is None for k, v in bounds.items()):
+        return Response({'detail':'since / until must be ISO datetimes'}, status=status.HTTP_400_BAD_REQUEST)
+    bounds = {k: v if v is None or timezone.is_aware(v) else timezone.make_aware(v) for k, v in bounds.items()}
+    results = audit_archive.search(
+        target_table=params.get('target_table') or None, target_id=target_id, action=params.get('action') or None,
+        limit=max(1, limit), **bounds,
+    )
+    return Response({'results': results})
+
+# Per-view query count / latency / render time histograms and slowest statements (performance.profiling)
+@query_budget(2)
+@api_view(['GET'])
+@permission_classes([IsHR])
+def metrics(request):
+    return Response(view_metrics.as_dict())
@@ -3,6 +3,10 @@ ASGI config for techcorp_performance project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Requests served through this entry point are routed to settings.ASGI_URLCONF by
+performance.middleware.AsgiUrlconfMiddleware, so async views (e.g. the login view, which
+verifies passwords on a thread pool) take precedence over their sync DRF counterparts.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
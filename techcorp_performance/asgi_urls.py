@@ -0,0 +1,19 @@
+"""
+URL configuration used for requests served by the ASGI application (asgi.py).
+
+performance.middleware.AsgiUrlconfMiddleware switches ASGI requests to this module:
+async implementations are matched first, everything else falls through to the regular
+(WSGI) URLconf.
+"""
+from django.urls import path, include
+from performance import async_views
+
+urlpatterns = [
+    path('auth/login', async_views.login),
+    path('reviews/<int:id>', async_views.get_review),
+    path('employees/<int:id>/reviews', async_views.employee_reviews),
+    path('employees/<int:id>/performance-trend', async_views.performance_trend),
+    path('employees/<int:id>/goals', async_views.employee_goals),
+    path('departments/<str:dept>/summary', async_views.department_summary),
+    path('', include('techcorp_performance.urls')),
+]
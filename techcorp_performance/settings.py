@@ -42,6 +42,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # first, so it sees every query of the request (see performance.profiling)
+    'performance.middleware.QueryProfilingMiddleware',
+    # audit entries of the request are written in one batch when it ends (see performance.audit)
+    'performance.middleware.AuditMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -49,9 +53,14 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'performance.middleware.AsgiUrlconfMiddleware',
 ]
 
 ROOT_URLCONF = 'techcorp_performance.urls'
+# requests served by asgi.py use this URLconf (async views first, see performance.middleware)
+ASGI_URLCONF = 'techcorp_performance.asgi_urls'
+# async views run independent queries of one request on separate threads/connections
+PERFORMANCE_ASYNC_PARALLEL_QUERIES = True
 
 TEMPLATES = [
     {
@@ -85,6 +94,20 @@ DATABASES = {
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
+# ConfigurablePBKDF2PasswordHasher takes its work factor from PASSWORD_HASH_ITERATIONS (None = Django's
+# default). Stored hashes are rehashed to the first hasher's settings on successful login.
+PASSWORD_HASHERS = [
+    'performance.hashers.ConfigurablePBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+PASSWORD_HASH_ITERATIONS = None
+# threads verifying passwords for the ASGI login view (None = one per CPU)
+PASSWORD_HASH_WORKERS = None
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -129,13 +152,99 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework.authentication.TokenAuthentication',
+        'performance.authentication.AuthTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'performance.profiling.ProfiledJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+}
+
+# Per-request query / latency profiling (performance.profiling), served on /internal/metrics.
+# SLOWEST: statements kept per request; RAISE_ON_BUDGET: fail requests over their @query_budget
+# instead of only logging a warning (enabled by the test suite)
+PERFORMANCE_PROFILING = {
+    'ENABLED': True,
+    'SLOWEST': 5,
+    'RAISE_ON_BUDGET': False,
+}
+TEST_RUNNER = 'performance.test_runner.QueryBudgetTestRunner'
+
+# Audit trail of Employee / Review / Score / Goal changes (performance.audit). Entries are written
+# with bulk_create per request; outside requests a background thread flushes a bounded queue
+# (QUEUE_SIZE entries) every FLUSH_INTERVAL seconds. BATCH_SIZE: entries per INSERT;
+# RETRIES: extra attempts for a batch failing with an OperationalError (e.g. database is locked)
+PERFORMANCE_AUDIT = {
+    'ENABLED': True,
+    'BATCH_SIZE': 500,
+    'QUEUE_SIZE': 10000,
+    'FLUSH_INTERVAL': 1.0,
+    'RETRIES': 3,
+    'BACKGROUND': True,
+}
+
+# AuditLog retention (performance.audit_archive, `manage.py archive_audit_log`): rows older than
+# RETENTION_DAYS move to gzip NDJSON files per month under DIR, BATCH_SIZE rows per move / delete
+PERFORMANCE_AUDIT_ARCHIVE = {
+    'DIR': os.path.join(BASE_DIR, 'var', 'audit-archive'),
+    'RETENTION_DAYS': 90,
+    'BATCH_SIZE': 1000,
 }
 
 from datetime import timedelta
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(hours=8),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
-}
\ No newline at end of file
+}
+
+# performance.auth_models.AuthToken: lifetime of tokens issued by auth/login and the
+# in-process token lookup cache used by AuthTokenAuthentication (entries, seconds)
+AUTH_TOKEN_LIFETIME = timedelta(hours=8)
+AUTH_TOKEN_CACHE_SIZE = 10000
+AUTH_TOKEN_CACHE_TTL = 60
+
+# Serve final scores (trend, outliers, summaries) from the materialized EmployeeCycleScore
+# rollup table and component scores from the per-review ReviewScoreRollup sums.
+# Run `manage.py rebuild_score_rollups` once before enabling.
+PERFORMANCE_READ_ROLLUPS = False
+
+# Columnar snapshots of closed review cycles (performance.snapshots), read memory-mapped
+# by the score services instead of aggregating Review / Score / Goal rows
+PERFORMANCE_SNAPSHOT_DIR = os.path.join(BASE_DIR, 'var', 'snapshots')
+
+# Rows per chunk for the streaming review import (reviews/bulk-import?mode=stream)
+BULK_IMPORT_BATCH_SIZE = 1000
+
+# Background bulk import jobs (reviews/bulk-import?mode=async): worker threads per process
+# and where uploads are kept until their job finishes
+BULK_IMPORT_WORKERS = 2
+BULK_IMPORT_UPLOAD_DIR = os.path.join(BASE_DIR, 'var', 'imports')
+
+# Keyset pagination for review / goal listings (opt-in via ?page_size or ?cursor)
+PERFORMANCE_PAGE_SIZE = 50
+PERFORMANCE_MAX_PAGE_SIZE = 500
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Score service cache (performance.cache). LocMemCache is per process, so the score cache stays
+    # off with it (PERFORMANCE_CACHE['ENABLED'] = None); use a shared backend to turn it on, e.g.
+    #   'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': '/var/tmp/techcorp_cache'
+    #   'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'performance_cache'
+    'performance': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'performance',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+}
+
+# Read-through cache over the score services; entries are invalidated by model signals.
+# ENABLED: None = only with a shared (not LocMem / Dummy) backend; True forces it on, which is
+# only safe with a single worker process
+PERFORMANCE_CACHE = {
+    'ENABLED': None,
+    'ALIAS': 'performance',
+    'TIMEOUT': 300,
+}